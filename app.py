@@ -13,8 +13,6 @@ from chalicelib.api import (
     challenge_api,
     game_api,
 )
-from chalicelib.lambda_func import mixpanel_migration, slack
-from chalicelib.lambda_func.fcm import default_fcm, live_schedule_fcm
 
 server_env = os.getenv('SERVER_ENV')
 app = Chalice(app_name=f'fiva-{server_env}')
@@ -29,9 +27,18 @@ app.register_blueprint(challenge_api.challenge_api_module)
 app.register_blueprint(game_api.game_api_module)
 
 # Lambda Func
-app.register_blueprint(live_schedule_fcm.live_schedule_fcm_module)
-app.register_blueprint(default_fcm.default_fcm_module)
+# Each of these runs as its own Lambda whose handler imports the blueprint module directly, and only the API Lambda
+# imports app.py. Inside a deployed Lambda they are skipped, so API cold starts don't import them.
+if not os.getenv('AWS_LAMBDA_FUNCTION_NAME'):
+    from chalicelib.lambda_func import user_public_profile
+    from chalicelib.lambda_func.fcm import default_fcm, live_schedule_fcm
 
-if server_env == 'prod':
-    app.register_blueprint(mixpanel_migration.mixpanel_migration_module)
-    app.register_blueprint(slack.fiva_slack_module)
+    app.register_blueprint(live_schedule_fcm.live_schedule_fcm_module)
+    app.register_blueprint(default_fcm.default_fcm_module)
+    app.register_blueprint(user_public_profile.user_public_profile_module)
+
+    if server_env == 'prod':
+        from chalicelib.lambda_func import mixpanel_migration, slack
+
+        app.register_blueprint(mixpanel_migration.mixpanel_migration_module)
+        app.register_blueprint(slack.fiva_slack_module)
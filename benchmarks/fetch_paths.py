@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chalicelib.db.fetch import FetchEngine  # noqa: E402
+
+
+class SleepingRef:
+    def __init__(self, latency: float, path: str = '') -> None:
+        self.latency = latency
+        self.path = path
+
+    def child(self, path: str) -> 'SleepingRef':
+        return SleepingRef(self.latency, f'{self.path}/{path}')
+
+    def get(self) -> dict:
+        time.sleep(self.latency)
+        return {'path': self.path}
+
+
+def legacy_async_fetch_paths(root_ref, path_list):
+    def fetch_data(path):
+        return root_ref.child(path).get()
+
+    async def fetch_all_data():
+        loop = asyncio.get_event_loop()
+        with ThreadPoolExecutor() as executor:
+            tasks = [loop.run_in_executor(executor, fetch_data, path) for path in path_list]
+            results = await asyncio.gather(*tasks)
+            return dict(zip(path_list, results))
+
+    return asyncio.run(fetch_all_data())
+
+
+def measure(func, repeat: int) -> tuple[float, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare the persistent fetch engine with the legacy fetch.')
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    root_ref = SleepingRef(args.latency_ms / 1000)
+    engine = FetchEngine(max_workers=args.workers)
+
+    print(f'latency={args.latency_ms}ms repeat={args.repeat} workers={args.workers}')
+    print(f'{"paths":>6} {"legacy p50":>12} {"legacy max":>12} {"engine p50":>12} {"engine max":>12}')
+    for path_count in (3, 10, 50):
+        paths = [f'node_{index}' for index in range(path_count)]
+
+        legacy_p50, legacy_max = measure(lambda: legacy_async_fetch_paths(root_ref, paths), args.repeat)
+        engine_p50, engine_max = measure(lambda: engine.fetch(root_ref, paths), args.repeat)
+
+        print(
+            f'{path_count:>6} {legacy_p50:>10.2f}ms {legacy_max:>10.2f}ms '
+            f'{engine_p50:>10.2f}ms {engine_max:>10.2f}ms'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,390 @@
+import argparse
+import json
+import os
+import random
+import sys
+
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chalicelib.constants.common import (  # noqa: E402
+    ACTION,
+    ACTIVITY,
+    BIRTHDAY,
+    COINS,
+    COSTUME_LIST,
+    DELETED,
+    DEVICES,
+    DURATION_SEC,
+    END_TIME_UTC,
+    EVENT_TIME_UTC,
+    FILTER_TYPES,
+    FLOOR_COUNT,
+    FLOOR_KEY,
+    FLOOR_USER_COUNT,
+    FLOORS,
+    FREE,
+    FULL,
+    GAME_OVER_TIME_UTC,
+    GAME_OVER_TIMESTAMP,
+    GENDER_TYPE,
+    HALF,
+    HEIGHT,
+    JOIN_COUNT,
+    KCAL,
+    MAP_KEY,
+    NICKNAME,
+    OBJECTIVE_TYPE,
+    PAID,
+    PARTIAL_COMPLETED_TIME_UTC,
+    PERCENTAGE,
+    PHONE_NUMBER,
+    PREV_FLOOR,
+    REGISTERED_TIME_UTC,
+    SKI_GAME,
+    START_TIME_UTC,
+    TITLE,
+    TOKEN,
+    TOTAL_CALROIES_BURNED,
+    TOTAL_WORKOUT_TIME,
+    TYPE,
+    UPDATED_TIME_UTC,
+    VALUE,
+    WEIGHT,
+)
+from chalicelib.constants.db_ref_key import (  # noqa: E402
+    DB_ACTIVITY_COIN_LOGS_DATE_GROUPED,
+    DB_BETA_USER_CHALLENGE_MISSION_COMPLETED_DATA,
+    DB_BETA_USER_CHALLENGE_SUCCEEDED_DATA,
+    DB_BETA_USER_DATA,
+    DB_BETA_USER_EVENT_DATA,
+    DB_BETA_USER_FLOOR_DATA,
+    DB_BETA_USER_GAME_LOGS,
+    DB_CONTENT_INFO,
+    DB_DELETED_USER_DATA,
+    DB_GAME_LOGS_BY_TIME,
+    DB_GAME_WEEKLY_BEST,
+    DB_INAPP_CHALLENGE_BATCH_DATA,
+    DB_INAPP_CHALLENGE_MISSION_DATA,
+    DB_METHODS_OF_ACTIVITY_COIN_ACQUISITION,
+    DB_STAIR_CLIMBING_MAP_DATA,
+    DB_USER_PUBLIC_PROFILE,
+    DB_WORKOUT_RECORD_CHANGES_USER_DATE_GROUPED,
+)
+from chalicelib.core import (  # noqa: E402
+    format_utc_timestamp,
+    format_utc_timestamp_to_datetime,
+    get_week_key,
+    get_week_start,
+)
+from chalicelib.db.batch import PUSH_CHARS  # noqa: E402
+from chalicelib.db.game_log_index import build_indexed_game_log  # noqa: E402
+from chalicelib.db.public_profile import build_public_profile  # noqa: E402
+
+
+USER_COUNTS = {'1k': 1000, '10k': 10000, '100k': 100000, '1m': 1000000}
+
+MAP_COUNT = 5
+FLOORS_PER_MAP = 12
+GAMES = [SKI_GAME, 'ArmFlightGame']
+HISTORY_DAYS = 14
+CONTENT_COUNT = 40
+COIN_ACTIVITIES = ['Workout', 'Game', 'Stair']
+
+# Share of users that have data under each node, picked to match the shape of the production tree
+DELETED_RATE = 0.03
+SUBSCRIBED_RATE = 0.1
+FLOOR_DATA_RATE = 0.6
+GAME_PLAYER_RATE = 0.4
+DAILY_ACTIVE_RATE = 0.3
+CHALLENGE_PARTICIPANT_RATE = 0.2
+
+
+def _kst_timestamp(time_obj: datetime) -> str:
+    # Challenge batches are entered by hand in KST without seconds
+    return (time_obj + timedelta(hours=9)).strftime('%Y-%m-%d %I:%M%p')
+
+
+def _random_time(rng: random.Random, now: datetime, days: int) -> datetime:
+    return now - timedelta(seconds=rng.randint(0, days * 24 * 3600))
+
+
+def _push_keys(rng: random.Random, count: int) -> list[str]:
+    # Drawn from the seed instead of the clock, so the same seed always writes the same fixture
+    return sorted(''.join(rng.choice(PUSH_CHARS) for _ in range(20)) for _ in range(count))
+
+
+def generate_user(rng: random.Random, index: int, now: datetime) -> dict:
+    user = {
+        NICKNAME: f'user{index}' if rng.random() > 0.02 else '',
+        COSTUME_LIST: [f'costume{rng.randint(0, 30)}' for _ in range(rng.randint(1, 4))],
+        DEVICES: {f'device{device}': {TOKEN: f'fcm-token-{index}-{device}'} for device in range(rng.randint(1, 2))},
+        HEIGHT: rng.randint(150, 190),
+        WEIGHT: rng.randint(45, 100),
+        PHONE_NUMBER: f'010{rng.randint(10000000, 99999999)}',
+        JOIN_COUNT: rng.randint(0, 300),
+        TOTAL_WORKOUT_TIME: rng.randint(0, 500000),
+        TOTAL_CALROIES_BURNED: rng.randint(0, 100000),
+        BIRTHDAY: f'{rng.randint(60, 99):02d}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}',
+        GENDER_TYPE: rng.choice(['Male', 'Female']),
+        REGISTERED_TIME_UTC: format_utc_timestamp(_random_time(rng, now, 700)),
+    }
+
+    if rng.random() < SUBSCRIBED_RATE:
+        user['Subscription'] = {'ExpireDate': format_utc_timestamp(now + timedelta(days=rng.randint(-30, 30)))}
+    if rng.random() < SUBSCRIBED_RATE:
+        user['FreePassEndTimeUtc'] = format_utc_timestamp(now + timedelta(days=rng.randint(-30, 30)))
+    if rng.random() < DELETED_RATE:
+        user[DELETED] = True
+    return {key: value for key, value in user.items() if value != ''}
+
+
+def generate_stair_climbing_map() -> dict:
+    # Each map starts where the previous one ends, map0 is the tutorial
+    return {
+        f'map{map_index}': {
+            FLOORS: [
+                {'FloorName': f'{floor + 1}F', PERCENTAGE: 0, FLOOR_USER_COUNT: 0} for floor in range(FLOORS_PER_MAP)
+            ],
+            FLOOR_COUNT: FLOORS_PER_MAP,
+            PREV_FLOOR: {MAP_KEY: f'map{max(map_index - 1, 0)}', FLOOR_KEY: FLOORS_PER_MAP - 1 if map_index else 0},
+        }
+        for map_index in range(MAP_COUNT)
+    }
+
+
+def generate_content_info(rng: random.Random, now: datetime) -> dict:
+    vod_list = {
+        f'vod{index:03d}': {
+            DURATION_SEC: rng.choice([600, 900, 1200, 1800]),
+            KCAL: rng.randint(50, 300),
+            'Date': _kst_timestamp(_random_time(rng, now, 365)),
+            FILTER_TYPES: rng.sample(['FULL', 'UPPER', 'LOWER', 'CORE'], 1),
+            f'{TITLE}Text': f'VOD class {index}',
+        }
+        for index in range(CONTENT_COUNT)
+    }
+    live_list = {
+        f'live{index:03d}': {
+            DURATION_SEC: 1800,
+            KCAL: 200,
+            'Date': _kst_timestamp(now - timedelta(days=index)),
+            f'{TITLE}Text': f'Live class {index}',
+            'TeacherKey': f'teacher{index % 5}',
+            'IsStreaming': False,
+            'VodContentJoinKey': f'vod{index:03d}',
+        }
+        for index in range(CONTENT_COUNT // 4)
+    }
+    return {'VodList': vod_list, 'LiveList': live_list}
+
+
+def generate_methods_of_coin_acquisition() -> dict:
+    methods = {activity: {'ValuePer': 1, 'DailyMaxValue': 10} for activity in COIN_ACTIVITIES}
+    return {
+        FREE: methods,
+        PAID: {activity: {'ValuePer': 2, 'DailyMaxValue': 20} for activity in methods},
+    }
+
+
+def generate_floor_data(rng: random.Random, now: datetime) -> dict:
+    updated_time = _random_time(rng, now, 6)
+    floor_data = {
+        MAP_KEY: f'map{rng.randint(0, MAP_COUNT - 1)}',
+        FLOOR_KEY: rng.randint(0, FLOORS_PER_MAP - 1),
+        UPDATED_TIME_UTC: format_utc_timestamp(updated_time),
+    }
+    if rng.random() < 0.3:
+        floor_data[PARTIAL_COMPLETED_TIME_UTC] = format_utc_timestamp(
+            updated_time + timedelta(hours=rng.randint(1, 24))
+        )
+    return floor_data
+
+
+def generate_game_logs(rng: random.Random, now: datetime) -> dict:
+    return {
+        game: {
+            push_key: {
+                FULL: rng.randint(0, 40),
+                HALF: rng.randint(0, 10),
+                GAME_OVER_TIME_UTC: format_utc_timestamp(_random_time(rng, now, HISTORY_DAYS)),
+            }
+            for push_key in _push_keys(rng, rng.randint(1, 20))
+        }
+        for game in GAMES
+        if rng.random() < 0.7
+    }
+
+
+def generate_weekly_best(game_logs_by_user: dict, now: datetime) -> dict:
+    # What the game log ingest route would have kept for the current week
+    week_start = get_week_start(now)
+    weekly_best = {}
+    for user_key, game_logs in game_logs_by_user.items():
+        for game, logs in game_logs.items():
+            weekly_logs = [
+                log for log in logs.values() if format_utc_timestamp_to_datetime(log[GAME_OVER_TIME_UTC]) >= week_start
+            ]
+            if weekly_logs:
+                weekly_best.setdefault(game, {})[user_key] = max(
+                    weekly_logs,
+                    key=lambda log: (
+                        log[FULL] + (log[HALF] * 0.5),
+                        format_utc_timestamp_to_datetime(log[GAME_OVER_TIME_UTC]),
+                    ),
+                )
+    return {game: {get_week_key(week_start): users} for game, users in weekly_best.items()}
+
+
+def generate_game_log_index(game_logs_by_user: dict, now: datetime) -> dict:
+    # What backfill_game_log_index leaves behind for the current week
+    week_start = get_week_start(now)
+    game_log_index = {}
+    for user_key, game_logs in game_logs_by_user.items():
+        for game, logs in game_logs.items():
+            for push_key, log in logs.items():
+                if format_utc_timestamp_to_datetime(log[GAME_OVER_TIME_UTC]) >= week_start:
+                    indexed_log = build_indexed_game_log(user_key, log)
+                    log[GAME_OVER_TIMESTAMP] = indexed_log[GAME_OVER_TIMESTAMP]
+                    game_log_index.setdefault(game, {})[push_key] = indexed_log
+    return game_log_index
+
+
+def generate_challenges(now: datetime) -> tuple[dict, dict]:
+    # One finished, one running and one upcoming batch, the way challenges are scheduled month by month
+    batches, missions = {}, {}
+    for batch_index, month_offset in enumerate((-1, 0, 1), start=1):
+        year, month = divmod(now.year * 12 + now.month - 1 + month_offset, 12)
+        start_time = datetime(year, month + 1, 1, tzinfo=timezone.utc)
+        challenge_key = f'{start_time.year}-{start_time.month:02d}-challenge'
+
+        batches[challenge_key] = {
+            'BatchIndex': batch_index,
+            'Month': start_time.month,
+            'Threshold': 1200,
+            START_TIME_UTC: _kst_timestamp(start_time),
+            END_TIME_UTC: _kst_timestamp(start_time + timedelta(days=28)),
+            'ApplicationStartTimeUtc': _kst_timestamp(start_time - timedelta(days=14)),
+            'ApplicationDueTimeUtc': _kst_timestamp(start_time - timedelta(days=1)),
+        }
+        missions[challenge_key] = {
+            f'mission{mission}': {
+                f'{ACTIVITY}{TYPE}': 'Game',
+                f'Sub{TYPE}': SKI_GAME,
+                ACTION: {OBJECTIVE_TYPE: 'PlayScore', VALUE: {'Score': 20 + mission * 5}},
+                START_TIME_UTC: format_utc_timestamp(start_time + timedelta(days=7 * mission)),
+                END_TIME_UTC: format_utc_timestamp(start_time + timedelta(days=7 * (mission + 1))),
+                'Rewards': [{TYPE: 'Coin', VALUE: 10}],
+                'Popup': {'Title': f'Mission {mission} cleared'},
+            }
+            for mission in range(4)
+        }
+    return batches, missions
+
+
+def generate_dataset(user_count: int, seed: int = 0, now: datetime = None) -> dict:
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+
+    user_keys = [f'user{index:07d}' for index in range(user_count)]
+    users = {user_key: generate_user(rng, index, now) for index, user_key in enumerate(user_keys)}
+    challenge_batches, challenge_missions = generate_challenges(now)
+
+    data = {
+        DB_BETA_USER_DATA: users,
+        DB_USER_PUBLIC_PROFILE: {
+            user_key: {key: value for key, value in build_public_profile(user).items() if value is not None}
+            for user_key, user in users.items()
+        },
+        DB_DELETED_USER_DATA: {
+            user_key: {key: value for key, value in user.items() if key != DELETED}
+            for user_key, user in users.items()
+            if user.get(DELETED)
+        },
+        DB_STAIR_CLIMBING_MAP_DATA: generate_stair_climbing_map(),
+        DB_CONTENT_INFO: generate_content_info(rng, now),
+        DB_METHODS_OF_ACTIVITY_COIN_ACQUISITION: generate_methods_of_coin_acquisition(),
+        DB_BETA_USER_FLOOR_DATA: {
+            user_key: generate_floor_data(rng, now) for user_key in user_keys if rng.random() < FLOOR_DATA_RATE
+        },
+        DB_BETA_USER_GAME_LOGS: {},
+        DB_ACTIVITY_COIN_LOGS_DATE_GROUPED: {},
+        DB_WORKOUT_RECORD_CHANGES_USER_DATE_GROUPED: {},
+        DB_INAPP_CHALLENGE_BATCH_DATA: challenge_batches,
+        DB_INAPP_CHALLENGE_MISSION_DATA: challenge_missions,
+        DB_BETA_USER_EVENT_DATA: {},
+        DB_BETA_USER_CHALLENGE_SUCCEEDED_DATA: {},
+        DB_BETA_USER_CHALLENGE_MISSION_COMPLETED_DATA: {},
+    }
+
+    for user_key in user_keys:
+        if rng.random() < GAME_PLAYER_RATE:
+            game_logs = generate_game_logs(rng, now)
+            if game_logs:
+                data[DB_BETA_USER_GAME_LOGS][user_key] = game_logs
+    data[DB_GAME_WEEKLY_BEST] = generate_weekly_best(data[DB_BETA_USER_GAME_LOGS], now)
+    data[DB_GAME_LOGS_BY_TIME] = generate_game_log_index(data[DB_BETA_USER_GAME_LOGS], now)
+
+    for day in range(HISTORY_DAYS):
+        date_key = (now - timedelta(days=day)).strftime('%Y-%m-%d')
+        for user_key in user_keys:
+            if rng.random() >= DAILY_ACTIVE_RATE:
+                continue
+
+            coin_logs = data[DB_ACTIVITY_COIN_LOGS_DATE_GROUPED].setdefault(date_key, {})
+            coin_logs[user_key] = {
+                push_key: {ACTIVITY: rng.choice(COIN_ACTIVITIES), COINS: rng.randint(1, 10)}
+                for push_key in _push_keys(rng, rng.randint(1, 3))
+            }
+
+            workout_records = data[DB_WORKOUT_RECORD_CHANGES_USER_DATE_GROUPED].setdefault(user_key, {})
+            workout_records[date_key] = {
+                push_key: {
+                    DURATION_SEC: rng.randint(60, 1800),
+                    KCAL: round(rng.uniform(10, 300), 1),
+                    EVENT_TIME_UTC: format_utc_timestamp(now - timedelta(days=day)),
+                }
+                for push_key in _push_keys(rng, rng.randint(1, 2))
+            }
+
+    for challenge_key in challenge_batches:
+        participants = [user_key for user_key in user_keys if rng.random() < CHALLENGE_PARTICIPANT_RATE]
+        if not participants:
+            continue
+
+        data[DB_BETA_USER_EVENT_DATA][challenge_key] = participants
+        data[DB_BETA_USER_CHALLENGE_SUCCEEDED_DATA][challenge_key] = [
+            user_key for user_key in participants if rng.random() < 0.4
+        ]
+        for user_key in participants:
+            if rng.random() < 0.5:
+                completed = data[DB_BETA_USER_CHALLENGE_MISSION_COMPLETED_DATA].setdefault(user_key, {})
+                completed[challenge_key] = {'mission0': {EVENT_TIME_UTC: format_utc_timestamp(now)}}
+
+    # RTDB drops empty nodes, so the fixture does too
+    return {key: value for key, value in data.items() if value}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Write a synthetic RTDB fixture for the local database backend.')
+    parser.add_argument('size', choices=USER_COUNTS, help='Number of users in the fixture')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Defaults to benchmarks/fixtures/fiva-<size>.json')
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'fixtures', f'fiva-{args.size}.json'
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    with open(output, 'w') as f:
+        json.dump(
+            generate_dataset(USER_COUNTS[args.size], seed=args.seed), f, ensure_ascii=False, separators=(',', ':')
+        )
+
+    print(f'{output}: {os.path.getsize(output) / 1e6:.1f}MB, {USER_COUNTS[args.size]} users')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from collections import Counter
+from contextlib import contextmanager
+from copy import deepcopy
+from typing import Any, Iterator, Optional
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Everything runs against the in-process database, never Firebase, and Slack posts are skipped in dev.
+# Imported before chalicelib, so the settings are in place when the engine is created.
+os.environ['RTDB_BACKEND'] = 'local'
+os.environ['LOCAL_RTDB_FIXTURE'] = ''
+os.environ.setdefault('SERVER_ENV', 'dev')
+os.environ.setdefault('METRICS_ENABLED', 'false')
+os.environ.setdefault('RTDB_READ_BUDGET_BYTES', '0')
+os.environ.setdefault('RTDB_WRITE_BUDGET_BYTES', '0')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-2')
+
+import requests  # noqa: E402
+
+from chalice import Chalice  # noqa: E402
+from chalice.test import Client  # noqa: E402
+
+from chalicelib import api_setup  # noqa: E402
+from chalicelib.api.activity_coin_api import activity_coin_api_module  # noqa: E402
+from chalicelib.api.challenge_api import challenge_api_module  # noqa: E402
+from chalicelib.api.fcm_api import fcm_api_module  # noqa: E402
+from chalicelib.api.game_api import game_api_module  # noqa: E402
+from chalicelib.api.stair_climbing_api import stair_climbing_api_module  # noqa: E402
+from chalicelib.api.workout_logs_api import workout_logs_api_module  # noqa: E402
+from chalicelib.db import local  # noqa: E402
+from chalicelib.db.cache import config_cache  # noqa: E402
+
+
+def load_dataset(dataset: dict[str, Any], latency_ms: float = 0) -> None:
+    # Jobs and routes write back what they compute, so every run starts from its own copy of the tree
+    local.local_database.data = deepcopy(dataset)
+    local.local_database.latency_ms = latency_ms
+    local.local_database.reset_stats()
+    config_cache.invalidate()
+
+
+def disable_cloudwatch_logging() -> None:
+    # Requests are still logged, the records just never leave the process
+    api_setup._log_handler = logging.NullHandler()
+    logging.getLogger().addHandler(api_setup._log_handler)
+
+
+class OfflineSchedulerClient:
+    # Answers the EventBridge Scheduler calls manage_event_bridge_schedule makes, after the simulated round trip
+    def __init__(self, latency_ms: float) -> None:
+        self.latency_ms = latency_ms
+        self.schedule_groups = []
+
+    def _round_trip(self) -> None:
+        time.sleep(self.latency_ms / 1000)
+
+    def list_schedule_groups(self, **kwargs) -> dict:
+        self._round_trip()
+        return {'ScheduleGroups': [{'Name': name} for name in self.schedule_groups]}
+
+    def create_schedule_group(self, Name: str, **kwargs) -> dict:
+        self._round_trip()
+        self.schedule_groups.append(Name)
+        return {}
+
+    def __getattr__(self, name: str) -> Any:
+        # get_schedule, create_schedule and update_schedule only need to succeed
+        def call(**kwargs) -> dict:
+            self._round_trip()
+            return {}
+
+        return call
+
+
+@contextmanager
+def offline_dependencies(latency_ms: float = 0) -> Iterator[None]:
+    # Mixpanel, the profile batch upload and EventBridge are still counted by record_call, but never leave the machine
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b'1'
+
+    with mock.patch('mixpanel.Consumer._write_request', return_value=True), mock.patch(
+        'requests.post', return_value=response
+    ), mock.patch('boto3.client', return_value=OfflineSchedulerClient(latency_ms)):
+        yield
+
+
+def create_app() -> Chalice:
+    app = Chalice(app_name='benchmark')
+    for module in (
+        workout_logs_api_module,
+        activity_coin_api_module,
+        stair_climbing_api_module,
+        challenge_api_module,
+        fcm_api_module,
+        game_api_module,
+    ):
+        app.register_blueprint(module)
+    return app
+
+
+def send_request(
+    client: Client,
+    method: str,
+    path: str,
+    body: Any = None,
+    planned_time: Optional[float] = None,
+    trace_allocations: bool = False,
+) -> dict[str, Any]:
+    # Latency runs from the planned start, so a request queued behind a slow one is charged for the wait
+    stats = local.local_database.stats
+    if trace_allocations:
+        tracemalloc.reset_peak()
+        allocated_before = tracemalloc.get_traced_memory()[0]
+
+    service_start = time.perf_counter()
+    response = client.http.request(
+        method,
+        path,
+        headers={'Content-Type': 'application/json'},
+        body=json.dumps(body).encode() if body is not None else b'',
+    )
+    finished_time = time.perf_counter()
+
+    new_stats = local.local_database.stats
+    sample = {
+        'StatusCode': response.status_code,
+        'LatencyMs': (finished_time - min(planned_time or service_start, service_start)) * 1000,
+        'ServiceMs': (finished_time - service_start) * 1000,
+        'RTDBCalls': new_stats['CallCount'] - stats['CallCount'],
+        'BytesRead': new_stats['BytesRead'] - stats['BytesRead'],
+        'BytesWritten': new_stats['BytesWritten'] - stats['BytesWritten'],
+    }
+    if trace_allocations:
+        sample['PeakAllocatedBytes'] = tracemalloc.get_traced_memory()[1] - allocated_before
+    return sample
+
+
+def _percentile(quantiles: list[float], percent: int) -> float:
+    return round(quantiles[percent - 1], 2)
+
+
+def summarize(samples: list[dict[str, Any]], trace_allocations: bool = False) -> dict[str, Any]:
+    latencies = sorted(sample['LatencyMs'] for sample in samples)
+    # quantiles needs two points, a route hit once reports that single latency everywhere
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+
+    summary = {
+        'Count': len(samples),
+        'StatusCodes': dict(Counter(str(sample['StatusCode']) for sample in samples)),
+        'P50Ms': _percentile(quantiles, 50),
+        'P95Ms': _percentile(quantiles, 95),
+        'P99Ms': _percentile(quantiles, 99),
+        'MaxMs': round(latencies[-1], 2),
+        'MeanServiceMs': round(statistics.mean(sample['ServiceMs'] for sample in samples), 2),
+        'RTDBCallsPerRequest': round(statistics.mean(sample['RTDBCalls'] for sample in samples), 2),
+        'BytesReadPerRequest': round(statistics.mean(sample['BytesRead'] for sample in samples)),
+        'BytesWrittenPerRequest': round(statistics.mean(sample['BytesWritten'] for sample in samples)),
+    }
+    if trace_allocations:
+        summary['PeakAllocatedKbPerRequest'] = round(
+            statistics.mean(sample['PeakAllocatedBytes'] for sample in samples) / 1024, 1
+        )
+    return summary
+
+
+def print_routes(routes: dict[str, dict[str, Any]], trace_allocations: bool = False) -> None:
+    for route_name, route in sorted(routes.items(), key=lambda item: -item[1]['P99Ms']):
+        print(
+            f'{route_name:<32} {route["Count"]:>6} {route["P50Ms"]:>9.1f} {route["P95Ms"]:>9.1f} {route["P99Ms"]:>9.1f}ms '
+            f'{route["RTDBCallsPerRequest"]:>6.1f} calls {route["BytesReadPerRequest"] / 1024:>9.1f}KB read '
+            + (f'{route["PeakAllocatedKbPerRequest"]:>9.1f}KB peak ' if trace_allocations else '')
+            + json.dumps(route['StatusCodes'])
+        )
@@ -0,0 +1,217 @@
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+from contextlib import redirect_stdout
+from typing import Any, Callable, Optional
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import disable_cloudwatch_logging, load_dataset, offline_dependencies  # noqa: E402
+
+from chalice import Chalice  # noqa: E402
+from chalice.test import Client  # noqa: E402
+
+from benchmarks.generate_fixture import USER_COUNTS, generate_dataset  # noqa: E402
+from chalicelib.api.challenge_api import challenge_api_module  # noqa: E402
+from chalicelib.api import game_api  # noqa: E402
+from chalicelib.api.game_api import GAME_MAP, FivaGameHandler, calculate_all_games_week_rank  # noqa: E402
+from chalicelib.api.stair_climbing_api import (  # noqa: E402
+    schedule_floor_data,
+    schedule_floor_down_alert,
+    schedule_stair_climbing_data,
+)
+from chalicelib.constants.db_ref_key import DB_BETA_USER_DATA  # noqa: E402
+from chalicelib.db import local  # noqa: E402
+from chalicelib.lambda_func.mixpanel_migration import schedule_user_profile_migration  # noqa: E402
+from chalicelib.metrics import RTDB, CallRecorder, current_recorder  # noqa: E402
+
+
+CHALLENGE_STATUS_REQUESTS = 50
+
+
+def _read_rss_kb(field: str) -> Optional[int]:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(f'{field}:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss() -> Optional[int]:
+    # Linux resets VmHWM to the current RSS on "5", so the next peak belongs to the run alone
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return None
+    return _read_rss_kb('VmRSS')
+
+
+def peak_rss_growth_mb(rss_before_kb: Optional[int]) -> Optional[float]:
+    peak_kb = _read_rss_kb('VmHWM')
+    if rss_before_kb is None or peak_kb is None:
+        return None
+    return round((peak_kb - rss_before_kb) / 1024, 1)
+
+
+def _job(handler: Any) -> Callable[[], Any]:
+    # Chalice keeps the decorated function on the event handler, job_set_up keeps the job itself under __wrapped__
+    job = handler.func.__wrapped__
+    return lambda: job({})
+
+
+def _game_rank() -> None:
+    # What schedule_game_rank runs, the job itself is only registered in prod
+    failures = calculate_all_games_week_rank(list(GAME_MAP.values()))
+    if failures:
+        raise RuntimeError(f'game ranking failed for {list(failures)}')
+
+
+def _game_rank_per_game() -> None:
+    for game_name in GAME_MAP.values():
+        FivaGameHandler(game_name).calculate_current_week_rank()
+
+
+def _game_rank_weekly_best() -> None:
+    with mock.patch.object(game_api, 'GAME_WEEKLY_BEST_RANKING', True):
+        _game_rank()
+
+
+def _game_rank_log_index() -> None:
+    with mock.patch.object(game_api, 'GAME_LOG_INDEX_RANKING', True):
+        _game_rank()
+
+
+def _challenge_status_client() -> Callable[[], Any]:
+    app = Chalice(app_name='benchmark')
+    app.register_blueprint(challenge_api_module)
+    client = Client(app)
+
+    def run() -> None:
+        user_keys = list(local.local_database.data.get(DB_BETA_USER_DATA, {}))
+        for user_key in random.Random(0).sample(user_keys, min(CHALLENGE_STATUS_REQUESTS, len(user_keys))):
+            response = client.http.get(f'/challenge/overall-status?UserId={user_key}')
+            if response.status_code != 200:
+                raise RuntimeError(f'challenge overall-status returned {response.status_code}')
+
+    return run
+
+
+BENCHMARKS = {
+    'game_rank': lambda: _game_rank,
+    'game_rank_per_game': lambda: _game_rank_per_game,
+    'game_rank_weekly_best': lambda: _game_rank_weekly_best,
+    'game_rank_log_index': lambda: _game_rank_log_index,
+    'floor_down_alert': lambda: _job(schedule_floor_down_alert),
+    'floor_data': lambda: _job(schedule_floor_data),
+    'stair_climbing_data': lambda: _job(schedule_stair_climbing_data),
+    'user_profile_migration': lambda: _job(schedule_user_profile_migration),
+    'challenge_status': _challenge_status_client,
+}
+
+
+def run_benchmark(name: str, dataset: dict, repeat: int, latency_ms: float = 0) -> dict[str, Any]:
+    run = BENCHMARKS[name]()
+
+    samples = []
+    for _ in range(repeat):
+        load_dataset(dataset, latency_ms)
+
+        # Jobs report their own failures with print, the tail of the output is kept in the report
+        output = io.StringIO()
+        recorder = CallRecorder()
+        recorder_token = current_recorder.set(recorder)
+        rss_before_kb = reset_peak_rss()
+        start = time.perf_counter()
+        try:
+            with redirect_stdout(output):
+                run()
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            peak_rss_growth = peak_rss_growth_mb(rss_before_kb)
+            current_recorder.reset(recorder_token)
+
+        calls = recorder.breakdown()
+        samples.append(
+            {
+                'DurationMs': round(duration_ms, 2),
+                'RTDBCalls': local.local_database.stats['CallCount'],
+                'BytesRead': local.local_database.stats['BytesRead'],
+                'BytesWritten': local.local_database.stats['BytesWritten'],
+                'ItemsScanned': recorder.items_scanned,
+                'ItemsChanged': recorder.items_changed,
+                # Peak RSS over the RSS before the run, the local database itself is already resident
+                'PeakRssGrowthMb': peak_rss_growth,
+                'Output': output.getvalue().splitlines()[-5:],
+                'ExternalCalls': {
+                    f'{dependency}.{operation}': group['Count']
+                    for (dependency, operation, _), group in calls.items()
+                    if dependency != RTDB
+                },
+            }
+        )
+
+    durations = [sample['DurationMs'] for sample in samples]
+    return {
+        **samples[-1],
+        'DurationMs': round(statistics.median(durations), 2),
+        'MinDurationMs': min(durations),
+        'MaxDurationMs': max(durations),
+        'Repeat': repeat,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Time the scheduled jobs and hot API paths against synthetic data.')
+    parser.add_argument('--sizes', nargs='+', choices=USER_COUNTS, default=['1k', '10k'])
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Simulated round trip per RTDB call')
+    parser.add_argument('--output', help='Write the report as JSON')
+    args = parser.parse_args()
+
+    # CloudWatch logging is replaced for the whole run, the API benchmark only measures the handler
+    disable_cloudwatch_logging()
+
+    results = []
+    with offline_dependencies(args.latency_ms):
+        for size in args.sizes:
+            dataset = local.LocalDatabase(generate_dataset(USER_COUNTS[size], seed=args.seed)).data
+
+            for name in args.benchmarks:
+                result = {'Benchmark': name, 'Size': size, 'Users': USER_COUNTS[size]}
+                result.update(run_benchmark(name, dataset, args.repeat, args.latency_ms))
+                results.append(result)
+
+                print(
+                    f'{size:>5} {name:<24} {result["DurationMs"]:>10.1f}ms {result["RTDBCalls"]:>7} calls '
+                    f'{result["BytesRead"] / 1e6:>8.2f}MB read {result["BytesWritten"] / 1e6:>8.2f}MB written '
+                    f'{result["ItemsScanned"]:>8} scanned {result["ItemsChanged"]:>7} changed '
+                    f'{result["PeakRssGrowthMb"] if result["PeakRssGrowthMb"] is not None else "-":>7}MB peak RSS growth'
+                )
+
+    report = {
+        'Python': platform.python_version(),
+        'Seed': args.seed,
+        'LatencyMs': args.latency_ms,
+        'Results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
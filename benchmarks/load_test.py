@@ -0,0 +1,249 @@
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from collections import defaultdict
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import (  # noqa: E402
+    create_app,
+    disable_cloudwatch_logging,
+    load_dataset,
+    offline_dependencies,
+    print_routes,
+    send_request,
+    summarize,
+)
+
+from chalice.test import Client  # noqa: E402
+
+from benchmarks.generate_fixture import COIN_ACTIVITIES, USER_COUNTS, generate_dataset  # noqa: E402
+from chalicelib.api.game_api import GAME_MAP  # noqa: E402
+from chalicelib.api.stair_climbing_api import TUTORIAL_MAP  # noqa: E402
+from chalicelib.constants.common import FLOOR_COUNT, FLOOR_KEY, MAP_KEY  # noqa: E402
+from chalicelib.constants.db_ref_key import (  # noqa: E402
+    DB_BETA_USER_DATA,
+    DB_BETA_USER_FLOOR_DATA,
+    DB_CONTENT_INFO,
+    DB_INAPP_CHALLENGE_BATCH_DATA,
+    DB_STAIR_CLIMBING_MAP_DATA,
+)
+from chalicelib.db import local  # noqa: E402
+
+
+# (method, path, JSON body), None when the sampled user has nothing to send on that route
+RequestSpec = Optional[tuple[str, str, Optional[dict[str, Any]]]]
+
+
+class TrafficModel:
+    # Builds requests from the current state of the local database, so sequences like stair climbing stay valid
+    def __init__(self, rng: random.Random) -> None:
+        self.rng = rng
+        self.now = datetime.now(timezone.utc)
+
+        data = local.local_database.data
+        self.user_keys = list(data.get(DB_BETA_USER_DATA, {}))
+        self.content_keys = list(data.get(DB_CONTENT_INFO, {}).get('VodList', {}))
+        self.challenge_keys = list(data.get(DB_INAPP_CHALLENGE_BATCH_DATA, {}))
+
+    def user_key(self) -> str:
+        return self.rng.choice(self.user_keys)
+
+    def workout_log(self) -> RequestSpec:
+        started_time = self.now - timedelta(minutes=self.rng.randint(5, 60 * 24))
+        body = {
+            'DatetimeKey': started_time.strftime('%Y-%m-%dT%I_%M_%S_%f%p'),
+            'ContentInfo': {'ContentType': 'VodList', 'ContentKey': self.rng.choice(self.content_keys)},
+            'LogInfo': {
+                'EventType': self.rng.choice(['InProgress', 'InProgress', 'InProgress', 'Completed']),
+                'DurationSec': self.rng.randint(30, 300),
+            },
+        }
+        return 'POST', f'/workout-logs?UserId={self.user_key()}', body
+
+    def activity_coin_acquisition(self) -> RequestSpec:
+        date_key = self.now.strftime('%Y-%m-%d')
+        activity = self.rng.choice(COIN_ACTIVITIES)
+        if self.rng.random() < 0.5:
+            return (
+                'GET',
+                f'/activity-coin/acquisition?UserId={self.user_key()}&DateKey={date_key}&Activity={activity}',
+                None,
+            )
+        body = {'DateKey': date_key, 'Activity': activity, 'Count': self.rng.randint(1, 3)}
+        return 'POST', f'/activity-coin/acquisition?UserId={self.user_key()}', body
+
+    def stair(self) -> RequestSpec:
+        data = local.local_database.data
+        stair_climbing_map = data[DB_STAIR_CLIMBING_MAP_DATA]
+        user_key = self.user_key()
+        user_floor_data = data.get(DB_BETA_USER_FLOOR_DATA, {}).get(user_key) or {FLOOR_KEY: 0, MAP_KEY: TUTORIAL_MAP}
+
+        # The route only accepts the floor right after the one the user is on
+        map_key, floor_key = user_floor_data[MAP_KEY], user_floor_data[FLOOR_KEY] + 1
+        if floor_key >= stair_climbing_map[map_key][FLOOR_COUNT]:
+            map_key, floor_key = f'map{int(map_key.replace("map", "")) + 1}', 0
+            if map_key not in stair_climbing_map:
+                return None
+        return 'POST', f'/stair?UserId={user_key}', {MAP_KEY: map_key, FLOOR_KEY: floor_key}
+
+    def challenge_overall_status(self) -> RequestSpec:
+        return 'GET', f'/challenge/overall-status?UserId={self.user_key()}', None
+
+    def challenge_user_record(self) -> RequestSpec:
+        return 'POST', f'/challenge/user-record?UserId={self.user_key()}', {'BatchKeys': self.challenge_keys}
+
+    def challenge_mission(self) -> RequestSpec:
+        body = {
+            'ActivityType': 'Game',
+            'SubType': 'SkiGame',
+            'Action': {'ObjectiveType': 'PlayScore', 'Value': {'Score': self.rng.randint(0, 60)}},
+        }
+        return 'POST', f'/challenge/mission?UserId={self.user_key()}', body
+
+    def fcm_act_remind(self) -> RequestSpec:
+        return (
+            'POST',
+            f'/fcm/act-remind?UserId={self.user_key()}',
+            {'Activity': self.rng.choice(['SkiGame', 'ArmFlightGame'])},
+        )
+
+    def game_log(self) -> RequestSpec:
+        body = {'Full': self.rng.randint(0, 40), 'Half': self.rng.randint(0, 10)}
+        return 'POST', f'/games/{self.rng.choice(list(GAME_MAP))}/logs?UserId={self.user_key()}', body
+
+    def game_user_rank(self) -> RequestSpec:
+        return 'GET', f'/games/{self.rng.choice(list(GAME_MAP))}/rank?UserId={self.user_key()}', None
+
+    def game_top_rank(self) -> RequestSpec:
+        return 'GET', f'/games/{self.rng.choice(list(GAME_MAP))}/top?limit=20', None
+
+    def game_rank(self) -> RequestSpec:
+        return 'PUT', f'/games/{self.rng.choice(list(GAME_MAP))}', None
+
+
+# Share of the traffic per route, roughly what the app sends during an evening peak
+ROUTE_MIX: dict[str, tuple[float, Callable[[TrafficModel], RequestSpec]]] = {
+    'POST /workout-logs': (40, TrafficModel.workout_log),
+    '/activity-coin/acquisition': (20, TrafficModel.activity_coin_acquisition),
+    'POST /stair': (10, TrafficModel.stair),
+    'GET /challenge/overall-status': (10, TrafficModel.challenge_overall_status),
+    'POST /challenge/user-record': (5, TrafficModel.challenge_user_record),
+    'POST /challenge/mission': (8, TrafficModel.challenge_mission),
+    'POST /fcm/act-remind': (6, TrafficModel.fcm_act_remind),
+    'POST /games/{game_name}/logs': (8, TrafficModel.game_log),
+    'GET /games/{game_name}/rank': (8, TrafficModel.game_user_rank),
+    'GET /games/{game_name}/top': (4, TrafficModel.game_top_rank),
+    'PUT /games/{game_name}': (1, TrafficModel.game_rank),
+}
+
+
+def run_load_test(
+    client: Client,
+    model: TrafficModel,
+    request_count: int,
+    rps: float,
+    warmup_count: int = 0,
+    trace_allocations: bool = False,
+) -> tuple[dict[str, list[dict[str, Any]]], float]:
+    route_names = list(ROUTE_MIX)
+    weights = [weight for weight, _ in ROUTE_MIX.values()]
+    samples = defaultdict(list)
+
+    if trace_allocations:
+        tracemalloc.start()
+
+    # Chalice serves one request at a time like a single Lambda container, so the schedule is open loop:
+    # every request has a planned start and the time spent waiting behind a slow one counts towards its latency.
+    interval = 1 / rps if rps else 0
+    start = time.perf_counter()
+    measured_start = None
+    for index in range(warmup_count + request_count):
+        route_name = model.rng.choices(route_names, weights)[0]
+        spec = ROUTE_MIX[route_name][1](model)
+        if spec is None:
+            continue
+        method, path, body = spec
+
+        # Without a target rate the next request goes out as soon as the previous one returns
+        planned_time = start + index * interval if interval else time.perf_counter()
+        delay = planned_time - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        if measured_start is None and index >= warmup_count:
+            measured_start = planned_time
+
+        sample = send_request(client, method, path, body, planned_time, trace_allocations)
+        if index < warmup_count:
+            continue
+        samples[route_name].append(sample)
+
+    elapsed_sec = time.perf_counter() - (measured_start or start)
+    if trace_allocations:
+        tracemalloc.stop()
+    return samples, elapsed_sec
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Replay a realistic request mix against the API routes.')
+    parser.add_argument('--size', choices=USER_COUNTS, default='1k')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--rps', type=float, default=20, help='Target request rate, 0 sends back to back')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Simulated round trip per RTDB call')
+    parser.add_argument('--trace-allocations', action='store_true', help='Record peak allocation per request')
+    parser.add_argument('--output', help='Write the report as JSON')
+    args = parser.parse_args()
+
+    disable_cloudwatch_logging()
+    load_dataset(local.LocalDatabase(generate_dataset(USER_COUNTS[args.size], seed=args.seed)).data, args.latency_ms)
+
+    # Handlers print their errors, the tail of the output is kept in the report
+    output = io.StringIO()
+    with offline_dependencies(args.latency_ms), redirect_stdout(output):
+        samples, elapsed_sec = run_load_test(
+            Client(create_app()),
+            TrafficModel(random.Random(args.seed)),
+            request_count=args.requests,
+            rps=args.rps,
+            warmup_count=args.warmup,
+            trace_allocations=args.trace_allocations,
+        )
+
+    routes = {
+        route_name: summarize(route_samples, args.trace_allocations) for route_name, route_samples in samples.items()
+    }
+    request_count = sum(route['Count'] for route in routes.values())
+    print_routes(routes, args.trace_allocations)
+    print(f'{request_count} requests in {elapsed_sec:.1f}s ({request_count / elapsed_sec:.1f} rps, target {args.rps})')
+
+    report = {
+        'Python': platform.python_version(),
+        'Size': args.size,
+        'Users': USER_COUNTS[args.size],
+        'Seed': args.seed,
+        'TargetRps': args.rps,
+        'AchievedRps': round(request_count / elapsed_sec, 2),
+        'LatencyMs': args.latency_ms,
+        'Routes': routes,
+        'Output': output.getvalue().splitlines()[-20:],
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+import argparse
+import ast
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import re
+import sys
+import time
+
+from collections import defaultdict
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator, Optional
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import (  # noqa: E402
+    create_app,
+    disable_cloudwatch_logging,
+    load_dataset,
+    offline_dependencies,
+    print_routes,
+    send_request,
+    summarize,
+)
+
+from chalice.test import Client  # noqa: E402
+
+from benchmarks.generate_fixture import USER_COUNTS, generate_dataset  # noqa: E402
+from chalicelib.db import local  # noqa: E402
+from chalicelib.profiling import PROFILE_TOP_N, report_profile  # noqa: E402
+
+
+# api_setup logs dicts through Formatter('[%(levelname)s] %(message)s'), so the record is the repr of a dict
+LOG_RECORD = re.compile(r'\[(?:INFO|WARNING|ERROR)\] (\{.*\})\s*$')
+# S3 exports and `aws logs tail` put the event time in front of the message
+LOG_LINE_TIME = re.compile(r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?Z?)\s')
+
+
+def _parse_line_time(line: str) -> Optional[int]:
+    match = LOG_LINE_TIME.match(line)
+    if not match:
+        return None
+    event_time = datetime.fromisoformat(match.group(1).replace('Z', '+00:00'))
+    if event_time.tzinfo is None:
+        event_time = event_time.replace(tzinfo=timezone.utc)
+    return int(event_time.timestamp() * 1000)
+
+
+def iter_log_events(file_path: str) -> Iterator[tuple[Optional[int], str]]:
+    # Accepts `aws logs filter-log-events` JSON, JSON lines of {timestamp, message} and plain text exports
+    with open(file_path) as f:
+        content = f.read()
+
+    try:
+        exported = json.loads(content)
+    except ValueError:
+        exported = None
+
+    if isinstance(exported, dict):
+        exported = exported.get('events', [])
+    if isinstance(exported, list):
+        for event in exported:
+            yield event.get('timestamp'), event.get('message', '')
+        return
+
+    for line in content.splitlines():
+        if line.startswith('{'):
+            try:
+                event = json.loads(line)
+            except ValueError:
+                event = None
+            if isinstance(event, dict) and 'message' in event:
+                yield event.get('timestamp'), event['message']
+                continue
+        yield _parse_line_time(line), line
+
+
+def parse_log_record(message: str) -> Optional[dict[str, Any]]:
+    match = LOG_RECORD.search(message)
+    if not match:
+        return None
+    try:
+        record = ast.literal_eval(match.group(1))
+    except (ValueError, SyntaxError):
+        return None
+    return record if isinstance(record, dict) else None
+
+
+def build_request(record: dict[str, Any], event_time_ms: Optional[int]) -> Optional[dict[str, Any]]:
+    # Only logging_request_info records carry the API Gateway context, responses and errors only echo parts of it
+    method = record.get('httpMethod')
+    path = record.get('path')
+    if not method or not path:
+        return None
+
+    # Requests to the execute-api endpoint keep the stage in the path, custom domains do not
+    stage = record.get('stage')
+    if stage and path.startswith(f'/{stage}/'):
+        path = path[len(stage) + 1 :]
+
+    query_params = record.get('queryParams') or {}
+    if query_params:
+        path = f'{path}?{urlencode(query_params)}'
+
+    body = record.get('requestBody')
+    return {
+        'Route': f'{method} {record.get("resourcePath", path)}',
+        'Method': method,
+        'Path': path,
+        'Body': body if body != '' else None,
+        'RequestId': record.get('requestId', ''),
+        'TimeMs': record.get('requestTimeEpoch') or event_time_ms,
+        # Bodies over LOG_BODY_MAX_BYTES were logged as a preview and cannot be sent again
+        'Truncated': isinstance(body, dict) and body.get('Truncated') is True,
+    }
+
+
+def _in_kst_window(time_ms: Optional[int], kst_window: Optional[tuple[int, int]]) -> bool:
+    if kst_window is None:
+        return True
+    if time_ms is None:
+        return False
+    kst_time = datetime.fromtimestamp(time_ms / 1000, timezone.utc) + timedelta(hours=9)
+    minute = kst_time.hour * 60 + kst_time.minute
+    start, end = kst_window
+    # A window like 22:00-01:00 runs past midnight
+    return start <= minute < end if start <= end else minute >= start or minute < end
+
+
+def load_requests(
+    file_paths: list[str], kst_window: Optional[tuple[int, int]] = None
+) -> tuple[list[dict[str, Any]], dict[str, int], dict[str, int]]:
+    replay_requests = []
+    original_status_codes = {}
+    skipped = defaultdict(int)
+
+    for file_path in file_paths:
+        for event_time_ms, message in iter_log_events(file_path):
+            record = parse_log_record(message)
+            if record is None:
+                continue
+
+            # Response and error records carry the status code the request got in production
+            if 'statusCode' in record and record.get('requestId'):
+                original_status_codes[record['requestId']] = record['statusCode']
+                continue
+
+            request = build_request(record, event_time_ms)
+            if request is None:
+                continue
+            if request['Truncated']:
+                skipped['TruncatedBody'] += 1
+            elif not _in_kst_window(request['TimeMs'], kst_window):
+                skipped['OutsideWindow'] += 1
+            else:
+                replay_requests.append(request)
+
+    # Records without a time keep their place in the file
+    replay_requests.sort(key=lambda request: request['TimeMs'] or 0)
+    return replay_requests, original_status_codes, dict(skipped)
+
+
+def replay(
+    client: Client, replay_requests: list[dict[str, Any]], speed: float, profile: Optional[cProfile.Profile] = None
+) -> tuple[list[dict[str, Any]], float]:
+    samples = []
+
+    first_time_ms = next((request['TimeMs'] for request in replay_requests if request['TimeMs']), None)
+    start = time.perf_counter()
+    for request in replay_requests:
+        # Gaps between requests shrink by the speed factor, a speed of 0 sends them back to back
+        if speed and first_time_ms and request['TimeMs']:
+            planned_time = start + (request['TimeMs'] - first_time_ms) / 1000 / speed
+        else:
+            planned_time = time.perf_counter()
+        delay = planned_time - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        # Only the requests themselves are profiled, not the time spent waiting for the next one
+        if profile:
+            profile.enable()
+        try:
+            sample = send_request(client, request['Method'], request['Path'], request['Body'], planned_time)
+        finally:
+            if profile:
+                profile.disable()
+
+        samples.append({**sample, 'Route': request['Route'], 'RequestId': request['RequestId']})
+
+    return samples, time.perf_counter() - start
+
+
+def _parse_kst_window(value: str) -> tuple[int, int]:
+    start, end = (datetime.strptime(part, '%H:%M') for part in value.split('-'))
+    return start.hour * 60 + start.minute, end.hour * 60 + end.minute
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Replay exported API request logs against the local app.')
+    parser.add_argument('log_files', nargs='+', help='CloudWatch exports of the API log group')
+    parser.add_argument('--fixture', help='RTDB export to serve, a synthetic dataset is generated otherwise')
+    parser.add_argument('--size', choices=USER_COUNTS, default='10k')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--speed', type=float, default=1, help='Speed-up factor over the logged pacing, 0 for none')
+    parser.add_argument('--kst-window', type=_parse_kst_window, help='Only replay requests in this KST time of day')
+    parser.add_argument('--limit', type=int, help='Replay at most this many requests')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Simulated round trip per RTDB call')
+    parser.add_argument('--no-profile', action='store_true', help='Skip cProfile, for timings without its overhead')
+    parser.add_argument('--profile-top', type=int, default=PROFILE_TOP_N)
+    parser.add_argument('--output', help='Write the report as JSON')
+    args = parser.parse_args()
+
+    replay_requests, original_status_codes, skipped = load_requests(args.log_files, args.kst_window)
+    replay_requests = replay_requests[: args.limit]
+    if not replay_requests:
+        raise SystemExit('No request records found in the logs')
+
+    if args.fixture:
+        dataset = local.LocalDatabase.from_fixture(args.fixture).data
+    else:
+        # Logged user IDs are not in a synthetic tree, so user routes mostly take their empty-data paths
+        dataset = generate_dataset(USER_COUNTS[args.size], seed=args.seed)
+
+    disable_cloudwatch_logging()
+    load_dataset(local.LocalDatabase(dataset).data, args.latency_ms)
+
+    profile = None if args.no_profile else cProfile.Profile()
+    output = io.StringIO()
+    with offline_dependencies(args.latency_ms), redirect_stdout(output):
+        samples, elapsed_sec = replay(Client(create_app()), replay_requests, args.speed, profile)
+
+    route_samples = defaultdict(list)
+    for sample in samples:
+        route_samples[sample['Route']].append(sample)
+
+    routes = {}
+    for route_name, samples_of_route in route_samples.items():
+        routes[route_name] = summarize(samples_of_route)
+        # A different status than production usually means the stand-in data is missing what the request needs
+        routes[route_name]['StatusMismatches'] = sum(
+            1
+            for sample in samples_of_route
+            if sample['RequestId'] in original_status_codes
+            and original_status_codes[sample['RequestId']] != sample['StatusCode']
+        )
+
+    print_routes(routes)
+    print(
+        f'{len(samples)} requests replayed in {elapsed_sec:.1f}s at x{args.speed} '
+        f'({len(samples) / elapsed_sec:.1f} rps), skipped {json.dumps(skipped)}'
+    )
+
+    stats_path = None
+    if profile:
+        stats_path = report_profile(profile, 'replay', top_n=args.profile_top)
+        # The cumulative view is led by Chalice dispatch, self time inside the app shows where the requests go
+        print('[PROFILE] replay, self time in chalicelib')
+        pstats.Stats(profile).sort_stats(pstats.SortKey.TIME).print_stats('chalicelib', args.profile_top)
+
+    report = {
+        'Python': platform.python_version(),
+        'LogFiles': args.log_files,
+        'Fixture': args.fixture,
+        'Size': None if args.fixture else args.size,
+        'Speed': args.speed,
+        'LatencyMs': args.latency_ms,
+        'Replayed': len(samples),
+        'Skipped': skipped,
+        'ElapsedSec': round(elapsed_sec, 2),
+        'ProfileStats': stats_path,
+        'Routes': routes,
+        'Output': output.getvalue().splitlines()[-20:],
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import functools
+import http.server
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chalicelib.db.stream import stream_children  # noqa: E402
+
+
+NODE = 'beta_user_game_logs'
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+
+def write_fixture(directory: str, user_count: int, logs_per_user: int) -> str:
+    path = os.path.join(directory, f'{NODE}.json')
+    with open(path, 'w') as f:
+        f.write('{')
+        for index in range(user_count):
+            logs = {
+                f'-log{log_index:05d}': {'Full': log_index, 'Half': 1, 'GameOverTimeUtc': '2024-08-01 10:00:00.000AM'}
+                for log_index in range(logs_per_user)
+            }
+            f.write(('' if index == 0 else ',') + json.dumps(f'user{index:07d}') + ':' + json.dumps({'SkiGame': logs}))
+        f.write('}')
+    return path
+
+
+def measure(func) -> tuple[int, float, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, elapsed, peak / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare a full JSON download with the streamed child reader.')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--logs-per-user', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        fixture_path = write_fixture(directory, args.users, args.logs_per_user)
+
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=directory))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+
+        try:
+            full_count, full_sec, full_mb = measure(lambda: len(requests.get(f'{base_url}/{NODE}.json').json()))
+            stream_count, stream_sec, stream_mb = measure(
+                lambda: sum(1 for _ in stream_children(NODE, base_url=base_url, access_token=''))
+            )
+        finally:
+            server.shutdown()
+
+        print(f'fixture: {os.path.getsize(fixture_path) / 1e6:.1f}MB, {args.users} children')
+        print(f'full download: {full_count} children, {full_sec:.2f}s, peak {full_mb:.1f}MB (traced)')
+        print(f'streamed read: {stream_count} children, {stream_sec:.2f}s, peak {stream_mb:.1f}MB (traced)')
+
+
+if __name__ == '__main__':
+    main()
@@ -27,8 +27,12 @@ from chalicelib.constants.db_ref_key import (
     DB_ACTIVITY_COIN_LOGS_DATE_GROUPED,
     DB_BETA_USER_ACTIVITY_COIN_LOGS,
     DB_BETA_USER_DATA,
+    DB_EXCHANGEABLE_GIFT_CATALOG,
     DB_METHODS_OF_ACTIVITY_COIN_ACQUISITION,
 )
+from chalicelib.db.batch import WriteBatch
+from chalicelib.db.cache import config_cache
+from chalicelib.metrics import KAKAO, record_call
 from chalicelib.validation import is_valid_phone_number
 
 
@@ -40,11 +44,12 @@ cors_config = CORSConfig(allow_origin='*')
 
 
 class ActivityCoinAPIHandler:
-    def __init__(self, root_ref: Reference, user_id: str, activity: str) -> None:
+    def __init__(self, root_ref: Reference, user_id: str, activity: str, write_batch: WriteBatch) -> None:
         self.acquisition_status = {ACQUISITION_FINISHED: False}
         self.root_ref = root_ref
         self.user_id = user_id
         self.activity = activity
+        self.write_batch = write_batch
 
         self.user_data_ref = root_ref.child(DB_BETA_USER_DATA)
         self.user_activity_coin_logs_ref = root_ref.child(DB_BETA_USER_ACTIVITY_COIN_LOGS).child(user_id)
@@ -83,19 +88,27 @@ class ActivityCoinAPIHandler:
             return activity_coin_data
 
     def logging_activity_coin_data(self, activity_coin_data: dict) -> None:
-        self.user_activity_coin_logs_ref.push().set(activity_coin_data)
+        self.write_batch.push(self.user_activity_coin_logs_ref.path, activity_coin_data)
 
 
 class ActivityCoinAcquisitionHandler(ActivityCoinAPIHandler):
-    def __init__(self, root_ref: Reference, user_id: str, date_key: str, activity: str, count: int = 0) -> None:
-        super().__init__(root_ref, user_id, activity)
+    def __init__(
+        self,
+        root_ref: Reference,
+        user_id: str,
+        date_key: str,
+        activity: str,
+        write_batch: WriteBatch,
+        count: int = 0,
+    ) -> None:
+        super().__init__(root_ref, user_id, activity, write_batch)
 
         self.count = count
         self.date_key = date_key
         self.user_profile = self.root_ref.child(DB_BETA_USER_DATA).child(self.user_id).get()
         self.sub = FREE if not check_subscribing_user(user_key=user_id, user_profile=self.user_profile) else PAID
-        self.methods_of_coin_acquisition = (
-            self.root_ref.child(DB_METHODS_OF_ACTIVITY_COIN_ACQUISITION).child(self.sub).get()
+        self.methods_of_coin_acquisition = config_cache.get(
+            self.root_ref, f'{DB_METHODS_OF_ACTIVITY_COIN_ACQUISITION}/{self.sub}'
         )
 
         if self.activity not in self.methods_of_coin_acquisition:
@@ -135,12 +148,12 @@ class ActivityCoinAcquisitionHandler(ActivityCoinAPIHandler):
         return coins
 
     def logging_activity_coin_acquisition_date_grouped_data(self, activity_coin_data: dict) -> None:
-        self.activity_coin_logs_date_grouped_ref.child(self.user_id).push().set(activity_coin_data)
+        self.write_batch.push(f'{self.activity_coin_logs_date_grouped_ref.path}/{self.user_id}', activity_coin_data)
 
 
 class ActivityCoinConsumptionHandler(ActivityCoinAPIHandler):
-    def __init__(self, root_ref: Reference, user_id: str, activity: str, coins: int) -> None:
-        super().__init__(root_ref, user_id, activity)
+    def __init__(self, root_ref: Reference, user_id: str, activity: str, coins: int, write_batch: WriteBatch) -> None:
+        super().__init__(root_ref, user_id, activity, write_batch)
 
         self.user_profile = self.root_ref.child(DB_BETA_USER_DATA).child(self.user_id).get()
         self.coins = -coins
@@ -156,7 +169,7 @@ class ActivityCoinConsumptionHandler(ActivityCoinAPIHandler):
 
         kakao_gift_api_key = os.getenv('KAKAO_GIFT_API_KEY')
 
-        gift_data = self.root_ref.child('exchangeable_gift_catalog').child(gift_id).get()
+        gift_data = config_cache.get(self.root_ref, f'{DB_EXCHANGEABLE_GIFT_CATALOG}/{gift_id}')
         if not gift_data:
             raise BadRequestError('The gift information does not exist.')
 
@@ -184,7 +197,8 @@ class ActivityCoinConsumptionHandler(ActivityCoinAPIHandler):
             'content-type': 'application/json',
         }
 
-        response = requests.post(url=KAKAO_GIFT_URL, json=payload, headers=headers)
+        with record_call(KAKAO, 'order'):
+            response = requests.post(url=KAKAO_GIFT_URL, json=payload, headers=headers)
         parsed_res = json.loads(response.text)
 
         if response.status_code == 200:
@@ -199,7 +213,7 @@ class ActivityCoinConsumptionHandler(ActivityCoinAPIHandler):
                 COINS: self.coins,
                 EVENT_TIME_UTC: format_utc_timestamp(),
             }
-            self.root_ref.child('beta_user_kakao_gift_logs').child(self.user_id).child(external_order_id).set(gift_info)
+            self.write_batch.set(f'beta_user_kakao_gift_logs/{self.user_id}/{external_order_id}', gift_info)
             result['GiftInfo'] = {
                 'ReserveTraceId': reserve_trace_id,
                 'ExternalOrderId': external_order_id,
@@ -230,7 +244,12 @@ def activity_coin_acquisition_api(request: Request, root_ref: Reference, handler
         count = request.json_body.get('Count') or 0
 
         activity_coin_api_handler = ActivityCoinAcquisitionHandler(
-            root_ref=root_ref, user_id=user_id, activity=activity, count=count, date_key=date_key
+            root_ref=root_ref,
+            user_id=user_id,
+            activity=activity,
+            count=count,
+            date_key=date_key,
+            write_batch=handler.write_batch,
         )
         remaining_coins = activity_coin_api_handler.get_remaining_coins()
 
@@ -255,7 +274,7 @@ def activity_coin_acquisition_api(request: Request, root_ref: Reference, handler
             raise BadRequestError('Missing category in the request')
 
         activity_coin_api_handler = ActivityCoinAcquisitionHandler(
-            root_ref=root_ref, user_id=user_id, activity=activity, date_key=date_key
+            root_ref=root_ref, user_id=user_id, activity=activity, date_key=date_key, write_batch=handler.write_batch
         )
         remaining_coins = activity_coin_api_handler.get_remaining_coins()
 
@@ -288,7 +307,7 @@ def activity_coin_consumption_api(request: Request, root_ref: Reference, handler
         raise BadRequestError('Missing coins in the request')
 
     activity_coin_api_handler = ActivityCoinConsumptionHandler(
-        root_ref=root_ref, user_id=user_id, activity=activity, coins=coins
+        root_ref=root_ref, user_id=user_id, activity=activity, coins=coins, write_batch=handler.write_batch
     )
     if not activity_coin_api_handler.has_enough_coins():
         raise BadRequestError('Not enough coins')
@@ -37,6 +37,9 @@ from chalicelib.core import (
     format_utc_timestamp,
     format_utc_timestamp_to_datetime,
 )
+from chalicelib.db.batch import WriteBatch
+from chalicelib.db.cache import config_cache
+from chalicelib.db.fetch import API_FETCH_TIMEOUT_SEC
 
 
 challenge_api_module = Blueprint(__name__)
@@ -60,7 +63,15 @@ class ChallengeHandler:
 
 
 class ChallengeMissionHandler(ChallengeHandler):
-    def __init__(self, user_id: str, root_ref: Reference, activity_type: str, sub_type: str, action: dict) -> Any:
+    def __init__(
+        self,
+        user_id: str,
+        root_ref: Reference,
+        activity_type: str,
+        sub_type: str,
+        action: dict,
+        write_batch: WriteBatch,
+    ) -> Any:
         super().__init__(user_id)
         self.now_utc = datetime.now().replace(tzinfo=timezone.utc)
 
@@ -71,6 +82,7 @@ class ChallengeMissionHandler(ChallengeHandler):
         self.activity_type = activity_type
         self.sub_type = sub_type
         self.action = action
+        self.write_batch = write_batch
 
         self._validate_action()
 
@@ -119,15 +131,19 @@ class ChallengeMissionHandler(ChallengeHandler):
         for reward in mission_info.get('Rewards', []):
             if reward[TYPE] == 'Coin':
                 ActivityCoinAPIHandler(
-                    root_ref=self.root_ref, user_id=self.user_id, activity='ChallengeMission'
+                    root_ref=self.root_ref,
+                    user_id=self.user_id,
+                    activity='ChallengeMission',
+                    write_batch=self.write_batch,
                 ).update_user_activity_coins(reward[VALUE])
 
             if reward[TYPE] == 'Item':
-                self.root_ref.child(DB_BETA_USER_ITEM_DATA).child(self.user_id).update(
-                    {reward[VALUE]: format_utc_timestamp()}
+                self.write_batch.update(
+                    f'{DB_BETA_USER_ITEM_DATA}/{self.user_id}', {reward[VALUE]: format_utc_timestamp()}
                 )
-                self.root_ref.child(DB_BETA_USER_DATA_CHANGE_LOG).child(self.user_id).push().set(
-                    create_change_log_data_set(ref_key='RewardItem', new_data=[reward[VALUE]])
+                self.write_batch.push(
+                    f'{DB_BETA_USER_DATA_CHANGE_LOG}/{self.user_id}',
+                    create_change_log_data_set(ref_key='RewardItem', new_data=[reward[VALUE]]),
                 )
 
     def update_user_challenge_mission_data(self, challenge_key: str, mission_key: str, mission_info: dict) -> None:
@@ -137,7 +153,7 @@ class ChallengeMissionHandler(ChallengeHandler):
             },
             f'{DB_BETA_USER_REWARD_POPUP}/{self.user_id}/{challenge_key}_{mission_key}': mission_info['Popup'],
         }
-        self.root_ref.update(updates)
+        self.write_batch.update('', updates)
 
 
 @challenge_api_module.route('/challenge/overall-status', methods=['GET'])
@@ -153,11 +169,11 @@ def challenge_overall_status_api(request: Request, root_ref: Reference, handler:
     else:
         year = str(year)
 
-    path_list = [DB_BETA_USER_EVENT_DATA, DB_BETA_USER_CHALLENGE_SUCCEEDED_DATA, DB_INAPP_CHALLENGE_BATCH_DATA]
-    data = async_fetch_paths(root_ref, path_list)
+    path_list = [DB_BETA_USER_EVENT_DATA, DB_BETA_USER_CHALLENGE_SUCCEEDED_DATA]
+    data = async_fetch_paths(root_ref, path_list, timeout=API_FETCH_TIMEOUT_SEC)
 
     user_event_data = data.get(DB_BETA_USER_EVENT_DATA, {})
-    inapp_challenge_data = data.get(DB_INAPP_CHALLENGE_BATCH_DATA, {})
+    inapp_challenge_data = config_cache.get(root_ref, DB_INAPP_CHALLENGE_BATCH_DATA) or {}
     user_challenge_succeeded_data = data.get(DB_BETA_USER_CHALLENGE_SUCCEEDED_DATA, {})  # User List
 
     challenge_handler = ChallengeHandler(user_id=user_id)
@@ -222,11 +238,10 @@ def challenge_user_record_api(request: Request, root_ref: Reference, handler: AP
     if not challenge_batch_list:
         raise BadRequestError('Missing challenge batch keys in the request')
 
-    path_list = [f'{DB_WORKOUT_RECORD_CHANGES_USER_DATE_GROUPED}/{user_id}', DB_INAPP_CHALLENGE_BATCH_DATA]
-    data = async_fetch_paths(root_ref, path_list)
-
-    user_workout_record_changes_date_grouped = data.get(f'{DB_WORKOUT_RECORD_CHANGES_USER_DATE_GROUPED}/{user_id}', {})
-    inapp_challenge_data = data.get(DB_INAPP_CHALLENGE_BATCH_DATA, {})
+    user_workout_record_changes_date_grouped = (
+        root_ref.child(DB_WORKOUT_RECORD_CHANGES_USER_DATE_GROUPED).child(user_id).get()
+    )
+    inapp_challenge_data = config_cache.get(root_ref, DB_INAPP_CHALLENGE_BATCH_DATA) or {}
 
     result = {}
     for challenge_batch_key in challenge_batch_list:
@@ -279,21 +294,21 @@ def challenge_mission_api(request: Request, root_ref: Reference, handler: APIHan
     if not activity_type or not sub_type or not isinstance(action, dict):
         raise BadRequestError('Invalid activity')
 
-    path_list = [
-        f'{DB_BETA_USER_CHALLENGE_MISSION_COMPLETED_DATA}/{user_id}',
-        DB_BETA_USER_EVENT_DATA,
-        DB_INAPP_CHALLENGE_BATCH_DATA,
-        DB_INAPP_CHALLENGE_MISSION_DATA,
-    ]
-    data = async_fetch_paths(root_ref, path_list)
+    path_list = [f'{DB_BETA_USER_CHALLENGE_MISSION_COMPLETED_DATA}/{user_id}', DB_BETA_USER_EVENT_DATA]
+    data = async_fetch_paths(root_ref, path_list, timeout=API_FETCH_TIMEOUT_SEC)
 
     user_event_data = data.get(DB_BETA_USER_EVENT_DATA, {})
     user_mission_data = data.get(f'{DB_BETA_USER_CHALLENGE_MISSION_COMPLETED_DATA}/{user_id}', {})
-    inapp_challenge_data = data.get(DB_INAPP_CHALLENGE_BATCH_DATA, {})
-    inapp_challenge_mission_data = data.get(DB_INAPP_CHALLENGE_MISSION_DATA, {})
+    inapp_challenge_data = config_cache.get(root_ref, DB_INAPP_CHALLENGE_BATCH_DATA) or {}
+    inapp_challenge_mission_data = config_cache.get(root_ref, DB_INAPP_CHALLENGE_MISSION_DATA) or {}
 
     challenge_mission_handler = ChallengeMissionHandler(
-        user_id=user_id, root_ref=root_ref, activity_type=activity_type, sub_type=sub_type, action=action
+        user_id=user_id,
+        root_ref=root_ref,
+        activity_type=activity_type,
+        sub_type=sub_type,
+        action=action,
+        write_batch=handler.write_batch,
     )
 
     current_challenge_keys = challenge_mission_handler.get_current_challenge_key_list(
@@ -33,6 +33,7 @@ from chalicelib.constants.common import (
 )
 from chalicelib.constants.db_ref_key import DB_CONTENT_INFO, DB_LIVE_SCHEDULE_INFO
 from chalicelib.core import create_activity_after_24_notification_schedule, format_unix_timestamp
+from chalicelib.db.cache import config_cache
 
 
 fcm_api_module = Blueprint(__name__)
@@ -54,7 +55,7 @@ class FcmAPIHandler:
         content_type = body[CONTENT_INFO][CONTENT_TYPE]
         content_key = body[CONTENT_INFO][CONTENT_KEY]
 
-        content = self.root_ref.child(DB_CONTENT_INFO).child(content_type).child(content_key).get()
+        content = config_cache.get(self.root_ref, f'{DB_CONTENT_INFO}/{content_type}/{content_key}')
         if not content:
             raise BadRequestError('Invalid content')
 
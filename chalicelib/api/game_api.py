@@ -1,6 +1,8 @@
 import os
 
-from datetime import datetime, time, timedelta, timezone
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Optional
+
 from firebase_admin.db import Reference
 
 from chalice import Blueprint, Rate
@@ -13,13 +15,17 @@ from chalicelib.core import (
     get_active_user_profile,
     format_utc_timestamp,
     format_utc_timestamp_to_datetime,
+    get_week_key,
+    get_week_start,
 )
 from chalicelib.constants.common import (
     COSTUME_LIST,
     FULL,
     GAME_OVER_TIME_UTC,
+    GAME_OVER_TIMESTAMP,
     HALF,
     NICKNAME,
+    PAGE_COUNT,
     RANK,
     SKI_GAME,
     UPDATED_TIME_UTC,
@@ -28,12 +34,33 @@ from chalicelib.constants.common import (
     WEEK_START_TIME_UTC,
 )
 from chalicelib.constants.db_ref_key import (
-    DB_BETA_USER_DATA,
     DB_BETA_USER_GAME_LOGS,
+    DB_GAME_LOGS_BY_TIME,
     DB_GAME_RANkING_CURRENT_WEEK,
+    DB_GAME_RANkING_CURRENT_WEEK_PAGES,
     DB_GAME_RANkING_LAST_WEEK,
+    DB_GAME_WEEKLY_BEST,
+    DB_USER_PUBLIC_PROFILE,
 )
 from chalicelib.db.engine import root_ref
+from chalicelib.db.game_log_index import (
+    backfill_game_log_index,
+    build_indexed_game_log,
+    fetch_game_logs_since,
+    prune_game_log_index,
+)
+from chalicelib.db.pagination import iter_child_pages
+from chalicelib.db.public_profile import project_user_public_profiles
+from chalicelib.job_setup import job_set_up
+from chalicelib.leaderboard import (
+    LEADERBOARD_HEAD_SIZE,
+    LEADERBOARD_PAGE_SIZE,
+    get_game_score,
+    join_ranking,
+    leaderboard_cache,
+    split_ranking,
+)
+from chalicelib.metrics import count_items, report_failure
 from chalicelib.slack_bot import post_slack_message
 
 
@@ -42,44 +69,109 @@ game_api_module = Blueprint(__name__)
 
 GAME_MAP = {'ski': SKI_GAME, 'arm-flight': 'ArmFlightGame'}
 
+# Rank from the weekly-best node kept by the ingest route instead of scanning every game log.
+GAME_WEEKLY_BEST_RANKING = os.getenv('GAME_WEEKLY_BEST_RANKING', 'false').lower() == 'true'
+
+# Rank from this week's slice of game_logs_by_time, read with one range query per game instead of every game log.
+# Turn on once the index is in the database rules.
+GAME_LOG_INDEX_RANKING = os.getenv('GAME_LOG_INDEX_RANKING', 'false').lower() == 'true'
+
+# Both rankings above only see plays sent through POST /games/{game_name}/logs. Until every client does, the
+# scheduled ranking first copies plays the app wrote straight to beta_user_game_logs into the index and the
+# weekly bests, which still scans every game log. Turn off once no client writes game logs directly.
+GAME_LOG_BACKFILL = os.getenv('GAME_LOG_BACKFILL', 'true').lower() == 'true'
+
+# Write the ranking as a top-K head plus pages instead of one node with every entry.
+# Turn on once the app reads UserCount and game_ranking_current_week_pages past the head.
+GAME_RANKING_PAGED = os.getenv('GAME_RANKING_PAGED', 'false').lower() == 'true'
+
+LEADERBOARD_TOP_DEFAULT = int(os.getenv('LEADERBOARD_TOP_DEFAULT', '10'))
+LEADERBOARD_TOP_MAX = int(os.getenv('LEADERBOARD_TOP_MAX', '100'))
+
+
+def is_better_game_log(log: dict, other_log: Optional[dict]) -> bool:
+    # A tie goes to the later play, as the weekly high score has always been picked
+    if not other_log:
+        return True
+    return (get_game_score(log), format_utc_timestamp_to_datetime(log[GAME_OVER_TIME_UTC])) > (
+        get_game_score(other_log),
+        format_utc_timestamp_to_datetime(other_log[GAME_OVER_TIME_UTC]),
+    )
+
 
 class FivaGameHandler:
-    def __init__(self, game_name) -> None:
+    def __init__(self, game_name, data: Optional[dict[str, Any]] = None) -> None:
         self.today = datetime.now()
         self.today_utc = datetime.now(tz=timezone.utc)
-        self.weekday = datetime.combine(self.today.date(), time.min, tzinfo=timezone.utc) - timedelta(
-            days=((self.today.weekday()) % 7), hours=9
-        )
+        self.weekday = get_week_start(self.today)
         self.target_game_name = game_name
 
-        data = async_fetch_paths(
-            root_ref,
-            [DB_BETA_USER_DATA, DB_BETA_USER_GAME_LOGS, f'{DB_GAME_RANkING_CURRENT_WEEK}/{self.target_game_name}'],
-        )
-        self.user_data = data[DB_BETA_USER_DATA]
-        self.game_logs = data[DB_BETA_USER_GAME_LOGS]
+        # A multi-game pass hands in what it fetched once for every game
+        if data is None:
+            data = async_fetch_paths(
+                root_ref, [DB_USER_PUBLIC_PROFILE, f'{DB_GAME_RANkING_CURRENT_WEEK}/{self.target_game_name}']
+            )
+        self.user_data = data[DB_USER_PUBLIC_PROFILE] or {}
         self.current_week_ranking_data = data[f'{DB_GAME_RANkING_CURRENT_WEEK}/{self.target_game_name}']
 
-    def calculate_current_week_rank(self):
+    def calculate_current_week_rank(self, high_score_data: Optional[list[dict]] = None, paged: bool = True):
         if self.current_week_ranking_data and self.weekday - format_utc_timestamp_to_datetime(
             self.current_week_ranking_data[WEEK_START_TIME_UTC]
         ) >= timedelta(days=7):
-            self._update_last_week_ranking_data(current_week_ranking_data=self.current_week_ranking_data)
+            pages = None
+            if self.current_week_ranking_data.get(PAGE_COUNT):
+                pages = root_ref.child(DB_GAME_RANkING_CURRENT_WEEK_PAGES).child(self.target_game_name).get()
+            self._update_last_week_ranking_data(
+                current_week_ranking_data=join_ranking(self.current_week_ranking_data, pages)
+            )
+            # The archived week is in game_ranking_last_week now, its weekly bests are not read again
+            root_ref.child(DB_GAME_WEEKLY_BEST).child(self.target_game_name).child(
+                self.current_week_ranking_data[WEEK_START_TIME_UTC].split(' ')[0]
+            ).delete()
+            prune_game_log_index(root_ref, self.target_game_name, before=self.weekday)
 
         ranking_data = {
             WEEK_START_TIME_UTC: format_utc_timestamp(self.weekday),
             UPDATED_TIME_UTC: format_utc_timestamp(self.today_utc),
         }
 
-        if not self.game_logs:
-            return ranking_data
+        # Without collected logs from a multi-game pass, this game collects its own
+        if high_score_data is None and GAME_WEEKLY_BEST_RANKING:
+            high_score_data = self._collect_weekly_best_logs()
+        elif high_score_data is None and GAME_LOG_INDEX_RANKING:
+            high_score_data = self._collect_indexed_logs()
+        elif high_score_data is None:
+            # Jobs page through the logs to bound memory, a request reads them in one round trip
+            game_logs_ref = root_ref.child(DB_BETA_USER_GAME_LOGS)
+            game_log_pages = iter_child_pages(game_logs_ref) if paged else filter(None, [game_logs_ref.get()])
+
+            has_game_logs = False
+            high_score_data = []
+            for game_logs in game_log_pages:
+                has_game_logs = True
+                high_score_data.extend(self._collect_high_score_logs(game_logs))
+
+            if not has_game_logs:
+                return ranking_data
+
+        high_score_data.sort(
+            key=lambda x: (-get_game_score(x), format_utc_timestamp_to_datetime(x[GAME_OVER_TIME_UTC]))
+        )
+        for index, log in enumerate(high_score_data):
+            log[RANK] = index + 1
 
+        ranking_data[USER_LIST] = high_score_data
+        self._update_current_week_ranking_data(ranking_data)
+
+    def _collect_high_score_logs(self, game_logs: dict) -> list[dict]:
         target_game_logs = {
             user_key: game_log[self.target_game_name]
-            for user_key, game_log in self.game_logs.items()
+            for user_key, game_log in game_logs.items()
             if game_log.get(self.target_game_name)
         }
 
+        self._load_missing_user_profiles(target_game_logs)
+
         high_score_data = []
         for user_key, target_game_log in target_game_logs.items():
             if not get_active_user_profile(user_key, self.user_data):
@@ -97,27 +189,69 @@ class FivaGameHandler:
             high_score_log = max(
                 weekly_logs,
                 key=lambda log: (
-                    log[FULL] + (log[HALF] * 0.5),
+                    get_game_score(log),
                     format_utc_timestamp_to_datetime(log[GAME_OVER_TIME_UTC]),
                 ),
             )
+            high_score_data.append(self._add_user_info(user_key, high_score_log))
 
-            high_score_log[USER_KEY] = user_key
-            high_score_log[NICKNAME] = self.user_data[user_key].get(NICKNAME)
-            high_score_log[COSTUME_LIST] = self.user_data[user_key].get(COSTUME_LIST)
-            high_score_data.append(high_score_log)
+        return high_score_data
 
-        high_score_data.sort(
-            key=lambda x: (-(x[FULL] + (x[HALF] * 0.5)), format_utc_timestamp_to_datetime(x[GAME_OVER_TIME_UTC]))
+    def _collect_weekly_best_logs(self) -> list[dict]:
+        weekly_best_logs = (
+            root_ref.child(DB_GAME_WEEKLY_BEST).child(self.target_game_name).child(get_week_key(self.weekday)).get()
+            or {}
         )
-        for index, log in enumerate(high_score_data):
-            log[RANK] = index + 1
-
-        ranking_data[USER_LIST] = high_score_data
-        self._update_current_week_ranking_data(ranking_data)
+        count_items(scanned=len(weekly_best_logs))
+        self._load_missing_user_profiles(weekly_best_logs)
+
+        return [
+            self._add_user_info(user_key, high_score_log)
+            for user_key, high_score_log in weekly_best_logs.items()
+            if get_active_user_profile(user_key, self.user_data)
+        ]
+
+    def _collect_indexed_logs(self) -> list[dict]:
+        weekly_logs = fetch_game_logs_since(root_ref, self.target_game_name, self.weekday)
+        count_items(scanned=len(weekly_logs))
+
+        high_score_logs = {}
+        for log in weekly_logs.values():
+            user_key = log.pop(USER_KEY)
+            if is_better_game_log(log, high_score_logs.get(user_key)):
+                high_score_logs[user_key] = log
+        self._load_missing_user_profiles(high_score_logs)
+
+        return [
+            self._add_user_info(user_key, high_score_log)
+            for user_key, high_score_log in high_score_logs.items()
+            if get_active_user_profile(user_key, self.user_data)
+        ]
+
+    def _load_missing_user_profiles(self, user_keys: Iterable[str]) -> None:
+        # Players who signed up since the last profile sync are projected from beta_user_data instead of dropped
+        missing_user_keys = [user_key for user_key in user_keys if user_key not in self.user_data]
+        if missing_user_keys:
+            self.user_data.update(project_user_public_profiles(root_ref, missing_user_keys))
+
+    def _add_user_info(self, user_key: str, high_score_log: dict) -> dict:
+        high_score_log[USER_KEY] = user_key
+        high_score_log[NICKNAME] = self.user_data[user_key].get(NICKNAME)
+        high_score_log[COSTUME_LIST] = self.user_data[user_key].get(COSTUME_LIST)
+        return high_score_log
 
     def _update_current_week_ranking_data(self, ranking_data: dict) -> None:
-        root_ref.child(DB_GAME_RANkING_CURRENT_WEEK).child(self.target_game_name).update(ranking_data)
+        # Unpaged, the head keeps every entry as before
+        head_size = LEADERBOARD_HEAD_SIZE if GAME_RANKING_PAGED else len(ranking_data[USER_LIST])
+        head, pages = split_ranking(ranking_data, head_size, LEADERBOARD_PAGE_SIZE)
+
+        # Head and pages go out in one multi-location update, so no run leaves a head next to another run's pages
+        updates = {
+            f'{DB_GAME_RANkING_CURRENT_WEEK}/{self.target_game_name}/{key}': value for key, value in head.items()
+        }
+        updates[f'{DB_GAME_RANkING_CURRENT_WEEK_PAGES}/{self.target_game_name}'] = pages or None
+        root_ref.update(updates)
+        leaderboard_cache.invalidate(self.target_game_name)
 
     def _update_last_week_ranking_data(self, current_week_ranking_data: dict) -> None:
         current_week_ranking_data[UPDATED_TIME_UTC] = format_utc_timestamp(self.today_utc)
@@ -127,29 +261,202 @@ class FivaGameHandler:
         )
 
 
+def calculate_all_games_week_rank(game_names: list[str]) -> dict[str, Exception]:
+    # Public profiles and every game's ranking are fetched once, and the game logs are scanned once for all games.
+    # A game that fails is dropped and reported, the others are still ranked and written.
+    data = async_fetch_paths(
+        root_ref, [DB_USER_PUBLIC_PROFILE, *(f'{DB_GAME_RANkING_CURRENT_WEEK}/{game_name}' for game_name in game_names)]
+    )
+    handlers = {game_name: FivaGameHandler(game_name, data) for game_name in game_names}
+    failures = {}
+
+    high_score_data = {game_name: None for game_name in game_names}
+    if not GAME_WEEKLY_BEST_RANKING and not GAME_LOG_INDEX_RANKING:
+        high_score_data = {game_name: [] for game_name in game_names}
+        for game_logs in iter_child_pages(root_ref.child(DB_BETA_USER_GAME_LOGS)):
+            for game_name, handler in list(handlers.items()):
+                try:
+                    high_score_data[game_name].extend(handler._collect_high_score_logs(game_logs))
+                except Exception as e:
+                    failures[game_name] = e
+                    del handlers[game_name]
+
+    for game_name, handler in handlers.items():
+        try:
+            handler.calculate_current_week_rank(high_score_data[game_name])
+        except Exception as e:
+            failures[game_name] = e
+
+    return failures
+
+
+class GameLogIngestHandler:
+    def __init__(self, root_ref: Reference, user_id: str, game_name: str, log: dict[str, Any]) -> None:
+        self.root_ref = root_ref
+        self.user_id = user_id
+        self.game_name = game_name
+        self.log = log
+
+        self.weekly_best_ref = (
+            root_ref.child(DB_GAME_WEEKLY_BEST)
+            .child(game_name)
+            .child(get_week_key(get_week_start(datetime.now())))
+            .child(user_id)
+        )
+
+    def update_weekly_best(self) -> tuple[dict, bool]:
+        new_record = {}
+
+        # Plays of one user can land together from several devices, so the best is compared and set atomically
+        def transaction_update(current_best):
+            new_record['NewRecord'] = is_better_game_log(self.log, current_best)
+            return self.log if new_record['NewRecord'] else current_best
+
+        weekly_best = self.weekly_best_ref.transaction(transaction_update)
+        return weekly_best, new_record['NewRecord']
+
+
+@game_api_module.route('/games/{game_name}/logs', methods=['POST'])
+@common_set_up(module=game_api_module)
+def game_log_ingest_api(request: Request, root_ref: Reference, handler: APIHandler, game_name: str) -> Response:
+    user_id = (request.query_params or {}).get('UserId')
+    if not user_id:
+        raise BadRequestError('Missing user ID in the request')
+
+    body = request.json_body
+    if not body:
+        raise BadRequestError('Missing body in the request')
+
+    if game_name not in GAME_MAP:
+        raise BadRequestError(f'Invalid game name: {game_name}')
+
+    for key in (FULL, HALF):
+        if not isinstance(body.get(key), int) or isinstance(body[key], bool) or body[key] < 0:
+            raise BadRequestError(f'Invalid {key} in the request')
+
+    # Only the validated scores are stored and the play is timed by the server, so a client can neither move it
+    # into another week nor plant fields like UserKey or Rank in the logs and rankings
+    game_log = {FULL: body[FULL], HALF: body[HALF], GAME_OVER_TIME_UTC: handler.timestamp}
+    indexed_game_log = build_indexed_game_log(user_id, game_log)
+    game_log[GAME_OVER_TIMESTAMP] = indexed_game_log[GAME_OVER_TIMESTAMP]
+
+    push_key = handler.write_batch.push(f'{DB_BETA_USER_GAME_LOGS}/{user_id}/{GAME_MAP[game_name]}', game_log)
+    handler.write_batch.set(f'{DB_GAME_LOGS_BY_TIME}/{GAME_MAP[game_name]}/{push_key}', indexed_game_log)
+    # The play is stored before it can become the weekly best, a failed write never leaves a best without its log
+    handler.write_batch.commit()
+
+    game_log_ingest_handler = GameLogIngestHandler(
+        root_ref=root_ref, user_id=user_id, game_name=GAME_MAP[game_name], log=game_log
+    )
+    weekly_best, new_record = game_log_ingest_handler.update_weekly_best()
+
+    return handler.response({'WeeklyBest': weekly_best, 'NewRecord': new_record}, 201)
+
+
+@game_api_module.route('/games/{game_name}/rank', methods=['GET'])
+@common_set_up(module=game_api_module)
+def game_user_rank_api(request: Request, root_ref: Reference, handler: APIHandler, game_name: str) -> Response:
+    user_id = (request.query_params or {}).get('UserId')
+    if not user_id:
+        raise BadRequestError('Missing user ID in the request')
+
+    if game_name not in GAME_MAP:
+        raise BadRequestError(f'Invalid game name: {game_name}')
+
+    leaderboard = leaderboard_cache.get(root_ref, GAME_MAP[game_name])
+
+    # Users without a play this week are not ranked and get a null rank
+    result = {
+        RANK: leaderboard.rank(user_id),
+        'UserCount': len(leaderboard),
+        'Log': leaderboard.entry(user_id),
+        WEEK_START_TIME_UTC: leaderboard.week_start_time_utc,
+        UPDATED_TIME_UTC: leaderboard.updated_time_utc,
+    }
+    return handler.response(result, 200)
+
+
+@game_api_module.route('/games/{game_name}/top', methods=['GET'])
+@common_set_up(module=game_api_module)
+def game_top_rank_api(request: Request, root_ref: Reference, handler: APIHandler, game_name: str) -> Response:
+    if game_name not in GAME_MAP:
+        raise BadRequestError(f'Invalid game name: {game_name}')
+
+    limit = (request.query_params or {}).get('limit', str(LEADERBOARD_TOP_DEFAULT))
+    if not limit.isdigit() or not 0 < int(limit) <= LEADERBOARD_TOP_MAX:
+        raise BadRequestError(f'limit must be between 1 and {LEADERBOARD_TOP_MAX}')
+
+    leaderboard = leaderboard_cache.get(root_ref, GAME_MAP[game_name])
+
+    result = {
+        USER_LIST: leaderboard.top(int(limit)),
+        'UserCount': len(leaderboard),
+        WEEK_START_TIME_UTC: leaderboard.week_start_time_utc,
+        UPDATED_TIME_UTC: leaderboard.updated_time_utc,
+    }
+    return handler.response(result, 200)
+
+
 @game_api_module.route('/games/{game_name}', methods=['PUT'])
 @common_set_up(module=game_api_module)
 def game_rank_api(request: Request, root_ref: Reference, handler: APIHandler, game_name: str) -> Response:
     if game_name not in GAME_MAP:
         raise BadRequestError(f'Invalid game name: {game_name}')
 
-    FivaGameHandler(GAME_MAP[game_name]).calculate_current_week_rank()
+    FivaGameHandler(GAME_MAP[game_name]).calculate_current_week_rank(paged=False)
 
     return handler.response('', 200)
 
 
+def backfill_current_week_game_logs() -> int:
+    indexed_logs = backfill_game_log_index(root_ref, since=get_week_start(datetime.now()))
+
+    # Only a user's best new play can raise the weekly best, and it goes through the ingest route's transaction
+    for game_name, logs in indexed_logs.items():
+        high_score_logs = {}
+        for log in logs:
+            if is_better_game_log(log, high_score_logs.get(log[USER_KEY])):
+                high_score_logs[log[USER_KEY]] = log
+
+        for user_key, log in high_score_logs.items():
+            game_log = {key: value for key, value in log.items() if key != USER_KEY}
+            GameLogIngestHandler(
+                root_ref=root_ref, user_id=user_key, game_name=game_name, log=game_log
+            ).update_weekly_best()
+
+    return sum(len(logs) for logs in indexed_logs.values())
+
+
+@game_api_module.lambda_function()
+@job_set_up(ledger=False)
+def backfill_current_week_game_log_index(event, context) -> dict:
+    indexed_log_count = backfill_current_week_game_logs()
+    return {'IndexedLogCount': indexed_log_count}
+
+
 if os.getenv('SERVER_ENV') == 'prod':
 
     @game_api_module.schedule(Rate(6, Rate.HOURS))
+    @job_set_up()
     def schedule_game_rank(event) -> None:
-        try:
-            for game_name in GAME_MAP.values():
-                FivaGameHandler(game_name).calculate_current_week_rank()
+        backfill_failures = {}
+        if GAME_LOG_BACKFILL and (GAME_WEEKLY_BEST_RANKING or GAME_LOG_INDEX_RANKING):
+            try:
+                backfill_current_week_game_logs()
+            except Exception as e:
+                backfill_failures = {'Game Log Backfill': e}
 
+        try:
+            failures = calculate_all_games_week_rank(list(GAME_MAP.values()))
         except Exception as e:
+            failures = {'Game': e}
+        failures.update(backfill_failures)
+
+        for game_name, e in failures.items():
             post_slack_message(
                 channel_id=os.getenv('SLACK_DEV_CHANNEL_ID'),
                 token=os.getenv('SLACK_TOKEN_SERVER'),
                 text=f'{game_name} Ranking Data Update Failed 🚨\n\nError Message:\n```ERROR: {e}```',
             )
             print(e)
+            report_failure(e)
@@ -6,7 +6,6 @@ from chalice import Blueprint, Rate
 from chalice import BadRequestError
 from chalice.app import Request, Response
 from firebase_admin.db import Reference
-from mixpanel import Mixpanel
 
 from chalicelib.api_setup import APIHandler, common_set_up
 from chalicelib.core import (
@@ -21,7 +20,6 @@ from chalicelib.constants.common import (
     COMPLETED_MAPS,
     COMPLETED_TIME_UTC,
     COSTUME_LIST,
-    # DEVICES,
     FLOOR_COUNT,
     FLOOR_KEY,
     FLOOR_USER_COUNT,
@@ -32,18 +30,24 @@ from chalicelib.constants.common import (
     ORDER,
     PERCENTAGE,
     PREV_FLOOR,
-    # TOKEN,
+    TOKENS,
     UPDATED_TIME_UTC,
     USER_LIST,
     PARTIAL_COMPLETED_TIME_UTC,
 )
 from chalicelib.constants.db_ref_key import (
-    DB_BETA_USER_DATA,
     DB_BETA_USER_DATA_CHANGE_LOG,
     DB_BETA_USER_FLOOR_DATA,
     DB_STAIR_CLIMBING_MAP_DATA,
 )
+from chalicelib.db.batch import generate_push_key
+from chalicelib.db.cache import config_cache
+from chalicelib.db.diff import update_tree_diff
 from chalicelib.db.engine import root_ref
+from chalicelib.db.pagination import iter_child_pages
+from chalicelib.db.public_profile import fetch_user_public_profiles
+from chalicelib.job_setup import job_set_up
+from chalicelib.metrics import MIXPANEL, record_call, report_failure
 
 # from chalicelib.firebase.core import send_fcm_multicast
 from chalicelib.slack_bot import post_slack_message
@@ -55,13 +59,15 @@ TUTORIAL_MAP = 'map0'
 
 MIXPANEL_PROJECT_TOKEN = os.getenv('MIXPANEL_PROJECT_TOKEN')
 
+RECENT_USER_COUNT = 4
+
 SCHEDULE_RATE = 1 if os.getenv('SERVER_ENV') == 'prod' else 24
 
 
 @stair_climbing_api_module.schedule('cron(0 0 * * ? *)')
+@job_set_up()
 def schedule_floor_down_alert(event) -> None:
     try:
-        user_data = root_ref.child(DB_BETA_USER_DATA).get()
         stair_climbing_map = root_ref.child(DB_STAIR_CLIMBING_MAP_DATA).get()
 
         max_floor_info = {}
@@ -69,51 +75,53 @@ def schedule_floor_down_alert(event) -> None:
             max_floor = len(map_info[FLOORS]) - 1
             max_floor_info[map_key] = max_floor
 
-        user_floor_data_ref = root_ref.child(DB_BETA_USER_FLOOR_DATA)
-        user_floor_data = user_floor_data_ref.get()
+        for user_floor_data in iter_child_pages(root_ref.child(DB_BETA_USER_FLOOR_DATA)):
+            alert_user_keys = []
 
-        copied_user_floor_data = deepcopy(user_floor_data)
+            for user_key, data in user_floor_data.items():
+                updated_time_utc = format_utc_timestamp_to_datetime(data[UPDATED_TIME_UTC])
+                last_completed_time = updated_time_utc
 
-        for user_key, data in user_floor_data.items():
-            updated_time_utc = format_utc_timestamp_to_datetime(data[UPDATED_TIME_UTC])
-            last_completed_time = updated_time_utc
+                if PARTIAL_COMPLETED_TIME_UTC in data:
+                    partial_completed_time_utc = format_utc_timestamp_to_datetime(data[PARTIAL_COMPLETED_TIME_UTC])
+                    if partial_completed_time_utc > updated_time_utc:
+                        last_completed_time = partial_completed_time_utc
 
-            if PARTIAL_COMPLETED_TIME_UTC in data:
-                partial_completed_time_utc = format_utc_timestamp_to_datetime(data[PARTIAL_COMPLETED_TIME_UTC])
-                if partial_completed_time_utc > updated_time_utc:
-                    last_completed_time = partial_completed_time_utc
-                    copied_user_floor_data[user_key][UPDATED_TIME_UTC] = format_utc_timestamp(
-                        partial_completed_time_utc
-                    )
+                current_time_utc = datetime.now(timezone.utc)
 
-            current_time_utc = datetime.now(timezone.utc)
+                data_map_key = data[MAP_KEY]
+                data_floor_key = data[FLOOR_KEY]
 
-            data_map_key = data[MAP_KEY]
-            data_floor_key = data[FLOOR_KEY]
+                if not data_floor_key or data_floor_key == max_floor_info[data_map_key] or data_map_key == TUTORIAL_MAP:
+                    continue
 
-            if not data_floor_key or data_floor_key == max_floor_info[data_map_key] or data_map_key == TUTORIAL_MAP:
-                continue
+                if 14 < last_completed_time.hour < 24:
+                    alert_time_utc = last_completed_time + timedelta(days=3)
+                else:
+                    alert_time_utc = last_completed_time + timedelta(days=2)
 
-            if 14 < last_completed_time.hour < 24:
-                alert_time_utc = last_completed_time + timedelta(days=3)
-            else:
-                alert_time_utc = last_completed_time + timedelta(days=2)
+                if alert_time_utc < current_time_utc:
+                    alert_user_keys.append(user_key)
 
-            if alert_time_utc < current_time_utc:
+            if not alert_user_keys:
+                continue
+
+            user_data = fetch_user_public_profiles(root_ref, alert_user_keys)
+            for user_key in alert_user_keys:
                 user_profile = get_active_user_profile(user_key, user_data)
-                if not user_profile or not isinstance(user_profile.get(DEVICES), dict):
+                if not user_profile:
                     continue
 
-                nickname = user_profile.get(NICKNAME, '')
-                devices = user_profile.get(DEVICES)
+                tokens = user_profile.get(TOKENS)
+                if not tokens:
+                    continue
 
-                tokens = [device[TOKEN] for device in devices.values() if device.get(TOKEN)]
+                nickname = user_profile.get(NICKNAME) or ''
 
                 title = f'{nickname}님 안돼...!!'
                 body = '내일이면 한 층 떨어져요.\n얼른 들어와서 지금 계단에서 stay 🥹'
 
-                if tokens:
-                    send_fcm_multicast(tokens=tokens, title=title, body=body)
+                send_fcm_multicast(tokens=tokens, title=title, body=body)
 
     except Exception as e:
         post_slack_message(
@@ -122,15 +130,19 @@ def schedule_floor_down_alert(event) -> None:
             text=f'User Floor Down Alert Failed 🚨\n\nError Message:\n```ERROR: {e}```',
         )
         print(e)
+        report_failure(e)
 
 
 @stair_climbing_api_module.schedule('cron(0 15 * * ? *)')
+@job_set_up()
 def schedule_floor_data(event) -> None:
     try:
+        # Only this job tracks events, so the API Lambda does not import mixpanel on cold start
+        from mixpanel import Mixpanel
+
         mp = Mixpanel(MIXPANEL_PROJECT_TOKEN)
 
         user_floor_data_ref = root_ref.child(DB_BETA_USER_FLOOR_DATA)
-        user_floor_data = user_floor_data_ref.get()
         stair_climbing_map = root_ref.child(DB_STAIR_CLIMBING_MAP_DATA).get()
 
         max_floor_info = {}
@@ -138,51 +150,53 @@ def schedule_floor_data(event) -> None:
             max_floor = len(map_info[FLOORS]) - 1
             max_floor_info[map_key] = max_floor
 
-        copied_user_floor_data = deepcopy(user_floor_data)
+        for user_floor_data in iter_child_pages(user_floor_data_ref):
+            copied_user_floor_data = deepcopy(user_floor_data)
 
-        for user_key, data in user_floor_data.items():
-            updated_time_utc = format_utc_timestamp_to_datetime(data[UPDATED_TIME_UTC])
-            last_completed_time = updated_time_utc
+            for user_key, data in user_floor_data.items():
+                updated_time_utc = format_utc_timestamp_to_datetime(data[UPDATED_TIME_UTC])
+                last_completed_time = updated_time_utc
 
-            if PARTIAL_COMPLETED_TIME_UTC in data:
-                partial_completed_time_utc = format_utc_timestamp_to_datetime(data[PARTIAL_COMPLETED_TIME_UTC])
-                if partial_completed_time_utc > updated_time_utc:
-                    last_completed_time = partial_completed_time_utc
-                    copied_user_floor_data[user_key][UPDATED_TIME_UTC] = format_utc_timestamp(
-                        partial_completed_time_utc
-                    )
+                if PARTIAL_COMPLETED_TIME_UTC in data:
+                    partial_completed_time_utc = format_utc_timestamp_to_datetime(data[PARTIAL_COMPLETED_TIME_UTC])
+                    if partial_completed_time_utc > updated_time_utc:
+                        last_completed_time = partial_completed_time_utc
+                        copied_user_floor_data[user_key][UPDATED_TIME_UTC] = format_utc_timestamp(
+                            partial_completed_time_utc
+                        )
 
-            limit_time_utc = last_completed_time + timedelta(days=3)
-            current_time_utc = datetime.now(timezone.utc)
+                limit_time_utc = last_completed_time + timedelta(days=3)
+                current_time_utc = datetime.now(timezone.utc)
 
-            data_map_key = data[MAP_KEY]
-            data_floor_key = data[FLOOR_KEY]
+                data_map_key = data[MAP_KEY]
+                data_floor_key = data[FLOOR_KEY]
 
-            if not data_floor_key or data_floor_key == max_floor_info[data_map_key] or data_map_key == TUTORIAL_MAP:
-                continue
+                if not data_floor_key or data_floor_key == max_floor_info[data_map_key] or data_map_key == TUTORIAL_MAP:
+                    continue
 
-            if current_time_utc > limit_time_utc:
-                if LAST_ACTIVITY_DATA not in data:
-                    copied_user_floor_data[user_key][LAST_ACTIVITY_DATA] = data
+                if current_time_utc > limit_time_utc:
+                    if LAST_ACTIVITY_DATA not in data:
+                        copied_user_floor_data[user_key][LAST_ACTIVITY_DATA] = data
 
-                after_floor_key = data_floor_key - 1
+                    after_floor_key = data_floor_key - 1
 
-                copied_user_floor_data[user_key][FLOOR_KEY] = after_floor_key
-                copied_user_floor_data[user_key][UPDATED_TIME_UTC] = format_utc_timestamp(limit_time_utc)
-                copied_user_floor_data[user_key][ANIMATION_PLAYED_DOWN] = False
-                copied_user_floor_data[user_key][ANIMATION_PLAYED_UP] = None
+                    copied_user_floor_data[user_key][FLOOR_KEY] = after_floor_key
+                    copied_user_floor_data[user_key][UPDATED_TIME_UTC] = format_utc_timestamp(limit_time_utc)
+                    copied_user_floor_data[user_key][ANIMATION_PLAYED_DOWN] = False
+                    copied_user_floor_data[user_key][ANIMATION_PLAYED_UP] = None
 
-                mp.track(
-                    distinct_id=user_key,
-                    event_name='FloorDown',
-                    properties={
-                        MAP_KEY: data_map_key,
-                        f'Before {FLOOR_KEY}': data_floor_key,
-                        f'After {FLOOR_KEY}': after_floor_key,
-                    },
-                )
+                    with record_call(MIXPANEL, 'track'):
+                        mp.track(
+                            distinct_id=user_key,
+                            event_name='FloorDown',
+                            properties={
+                                MAP_KEY: data_map_key,
+                                f'Before {FLOOR_KEY}': data_floor_key,
+                                f'After {FLOOR_KEY}': after_floor_key,
+                            },
+                        )
 
-        user_floor_data_ref.update(copied_user_floor_data)
+            update_tree_diff(user_floor_data_ref, user_floor_data, copied_user_floor_data)
 
     except Exception as e:
         post_slack_message(
@@ -191,14 +205,17 @@ def schedule_floor_data(event) -> None:
             text=f'User Floor Data Update Failed 🚨\n\nError Message:\n```ERROR: {e}```',
         )
         print(e)
+        report_failure(e)
 
 
 @stair_climbing_api_module.schedule(Rate(SCHEDULE_RATE, Rate.HOURS))
+@job_set_up()
 def schedule_stair_climbing_data(event) -> None:
     try:
         # Load stair climbing map data
         stair_climbing_map_ref = root_ref.child(DB_STAIR_CLIMBING_MAP_DATA)
         stair_climbing_map = stair_climbing_map_ref.get()
+        original_stair_climbing_map = deepcopy(stair_climbing_map)
 
         # mapping default data set
         stair_map_data = {
@@ -207,27 +224,44 @@ def schedule_stair_climbing_data(event) -> None:
             if map_key != TUTORIAL_MAP
         }
 
-        user_floor_data = root_ref.child(DB_BETA_USER_FLOOR_DATA).get()
-        total_climbing_user_count = len(user_floor_data)
+        total_climbing_user_count = 0
 
         # Collect user floor data and create floor_data_to_update
-        for user_key, data in user_floor_data.items():
-            map_key = data[MAP_KEY]
+        for user_floor_data in iter_child_pages(root_ref.child(DB_BETA_USER_FLOOR_DATA)):
+            total_climbing_user_count += len(user_floor_data)
 
-            if map_key == TUTORIAL_MAP:
-                continue
+            for user_key, data in user_floor_data.items():
+                map_key = data[MAP_KEY]
+
+                if map_key == TUTORIAL_MAP:
+                    continue
 
-            if map_key not in stair_map_data:
-                stair_map_data[map_key] = {}
+                if map_key not in stair_map_data:
+                    stair_map_data[map_key] = {}
 
-            floor = stair_map_data[map_key]
-            if data[FLOOR_KEY] not in floor:
-                floor[data[FLOOR_KEY]] = [{user_key: data[UPDATED_TIME_UTC]}]
-            else:
-                floor[data[FLOOR_KEY]].append({user_key: data[UPDATED_TIME_UTC]})
+                floor = stair_map_data[map_key]
+                if data[FLOOR_KEY] not in floor:
+                    floor[data[FLOOR_KEY]] = [{user_key: data[UPDATED_TIME_UTC]}]
+                else:
+                    floor[data[FLOOR_KEY]].append({user_key: data[UPDATED_TIME_UTC]})
+
+        for floor_data in stair_map_data.values():
+            for user_data_list in floor_data.values():
+                user_data_list.sort(key=lambda x: format_utc_timestamp_to_datetime(list(x.values())[0]), reverse=True)
+
+        # Only the most recent users of each floor are shown, so load just their profiles
+        user_profile_data = fetch_user_public_profiles(
+            root_ref,
+            [
+                user_key
+                for floor_data in stair_map_data.values()
+                for user_data_list in floor_data.values()
+                for recent_user in user_data_list[:RECENT_USER_COUNT]
+                for user_key in recent_user
+            ],
+        )
 
         climbing_user_count = 0
-        user_profile_data = root_ref.child(DB_BETA_USER_DATA).get()
 
         sorted_stair_map_data = dict(
             sorted(stair_map_data.items(), key=lambda x: int(x[0].replace('map', '')), reverse=True)
@@ -244,9 +278,6 @@ def schedule_stair_climbing_data(event) -> None:
                     current_floor_data[PERCENTAGE] = 0
                     current_floor_data[FLOOR_USER_COUNT] = 0
                 else:
-                    user_data_list.sort(
-                        key=lambda x: format_utc_timestamp_to_datetime(list(x.values())[0]), reverse=True
-                    )
                     floor_user_count = len(user_data_list)
                     current_floor_data[FLOOR_USER_COUNT] = floor_user_count
 
@@ -258,9 +289,11 @@ def schedule_stair_climbing_data(event) -> None:
 
                     recent_user_data = {}
                     for index, recent_user in enumerate(user_data_list):
-                        if len(recent_user_data) >= 4:
+                        if len(recent_user_data) >= RECENT_USER_COUNT:
                             break
                         for user_key in recent_user:
+                            if user_key not in user_profile_data:
+                                user_profile_data.update(fetch_user_public_profiles(root_ref, [user_key]))
                             user_profile = get_active_user_profile(user_key, user_profile_data)
 
                             if user_profile:
@@ -271,7 +304,8 @@ def schedule_stair_climbing_data(event) -> None:
                                 }
                     current_floor_data[USER_LIST] = recent_user_data
 
-        stair_climbing_map_ref.update(stair_climbing_map)
+        # Floor definitions never change here, so only the refreshed user lists and counts are uploaded
+        update_tree_diff(stair_climbing_map_ref, original_stair_climbing_map, stair_climbing_map)
 
     except Exception as e:
         post_slack_message(
@@ -280,6 +314,7 @@ def schedule_stair_climbing_data(event) -> None:
             text=f'Climbing Stair Data Update Failed 🚨\n\nError Message:\n```ERROR: {e}```',
         )
         print(e)
+        report_failure(e)
 
 
 @stair_climbing_api_module.route('/stair', methods=['POST'])
@@ -293,8 +328,7 @@ def climbing_stair_api(request: Request, root_ref: Reference, handler: APIHandle
     if not stair_floor_info:
         raise BadRequestError('Missing body in the request')
 
-    stair_climbing_map_ref = root_ref.child(DB_STAIR_CLIMBING_MAP_DATA)
-    stair_climbing_map = stair_climbing_map_ref.get()
+    stair_climbing_map = config_cache.get(root_ref, DB_STAIR_CLIMBING_MAP_DATA)
 
     map_key = stair_floor_info[MAP_KEY]
     if map_key not in stair_climbing_map:
@@ -325,21 +359,15 @@ def climbing_stair_api(request: Request, root_ref: Reference, handler: APIHandle
     }
 
     if floor_key == stair_climbing_map[map_key][FLOOR_COUNT] - 1:
-        next_floor_info[COMPLETED_MAPS] = {
-            map_key: {
-                user_floor_data_ref.child(COMPLETED_MAPS)
-                .child(map_key)
-                .push()
-                .key: {COMPLETED_TIME_UTC: handler.timestamp}
-            }
-        }
+        next_floor_info[COMPLETED_MAPS] = {map_key: {generate_push_key(): {COMPLETED_TIME_UTC: handler.timestamp}}}
 
     # Update user floor data
-    user_floor_data_ref.update(next_floor_info)
+    handler.write_batch.update(user_floor_data_ref.path, next_floor_info)
 
     # Update user data change log
-    root_ref.child(DB_BETA_USER_DATA_CHANGE_LOG).child(user_id).push().set(
-        create_change_log_data_set(ref_key=FLOORS, new_data=next_floor_info)
+    handler.write_batch.push(
+        f'{DB_BETA_USER_DATA_CHANGE_LOG}/{user_id}',
+        create_change_log_data_set(ref_key=FLOORS, new_data=next_floor_info),
     )
 
     return handler.response('', 201)
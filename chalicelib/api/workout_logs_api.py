@@ -37,6 +37,8 @@ from chalicelib.constants.db_ref_key import (
     DB_WORKOUT_RECORD_CHANGES_USER_DATE_GROUPED,
 )
 from chalicelib.core import create_change_log_data_set, format_kst_date_str, format_utc_date_str
+from chalicelib.db.batch import WriteBatch, generate_push_key
+from chalicelib.db.cache import config_cache
 
 
 workout_logs_api_module = Blueprint(__name__)
@@ -45,11 +47,14 @@ cors_config = CORSConfig(allow_origin=os.getenv('BASE_URL'))
 
 
 class WorkoutLogHandler:
-    def __init__(self, root_ref: Reference, user_id: str, body: dict[str, Any], timestamp: str):
+    def __init__(
+        self, root_ref: Reference, user_id: str, body: dict[str, Any], timestamp: str, write_batch: WriteBatch
+    ):
         self.root_ref = root_ref
         self.user_id = user_id
         self.body = body
         self.timestamp = timestamp
+        self.write_batch = write_batch
 
         self.user_workout_logs_ref = root_ref.child(DB_BETA_USER_WORKOUT_LOGS).child(user_id).child(body[DATETIME_KEY])
         self.user_workout_data_info = self.user_workout_logs_ref.get()
@@ -61,7 +66,7 @@ class WorkoutLogHandler:
         content_type = self.body[CONTENT_INFO][CONTENT_TYPE]
         content_key = self.body[CONTENT_INFO][CONTENT_KEY]
 
-        content = self.root_ref.child(DB_CONTENT_INFO).child(content_type).child(content_key).get()
+        content = config_cache.get(self.root_ref, f'{DB_CONTENT_INFO}/{content_type}/{content_key}')
         content_info = {
             CONTENT_TYPE: content_type,
             CONTENT_KEY: content_key,
@@ -91,11 +96,11 @@ class WorkoutLogHandler:
         return True
 
     def set_log(self) -> None:
-        self.user_workout_logs_ref.child(LOGS).push().set(self.body['LogInfo'])
+        self.write_batch.push(f'{self.user_workout_logs_ref.path}/{LOGS}', self.body['LogInfo'])
 
     def calculate_logs(self) -> dict[str, Any]:
         workout_logs = self.user_workout_data_info.get(LOGS, {})
-        workout_logs[self.user_workout_logs_ref.child(CALCULATED_LOGS).push().key] = self.body['LogInfo']
+        workout_logs[generate_push_key()] = self.body['LogInfo']
 
         content_duration = self.user_workout_data_info[CONTENT_INFO][DURATION_SEC]
         content_calories = self.user_workout_data_info[CONTENT_INFO][KCAL]
@@ -110,8 +115,8 @@ class WorkoutLogHandler:
         workout_calories = round((content_calories / content_duration) * workout_duration, 1)
         workout_succeeded = (calculated_duration + workout_duration) >= 0.7 * content_duration
 
-        self.user_workout_logs_ref.child(LOGS).delete()
-        self.user_workout_logs_ref.child(CALCULATED_LOGS).update(workout_logs)
+        self.write_batch.delete(f'{self.user_workout_logs_ref.path}/{LOGS}')
+        self.write_batch.update(f'{self.user_workout_logs_ref.path}/{CALCULATED_LOGS}', workout_logs)
 
         return {
             DURATION_SEC: workout_duration,
@@ -124,15 +129,12 @@ class WorkoutLogHandler:
 
     def update_user_workout_data(self, calculated_logs: dict[str, Any]) -> None:
         user_ref = self.root_ref.child(DB_BETA_USER_DATA).child(self.user_id)
-        user_data_change_log_ref = self.root_ref.child(DB_BETA_USER_DATA_CHANGE_LOG).child(self.user_id)
-        workout_record_changes_date_grouped_ref = (
-            self.root_ref.child(DB_WORKOUT_RECORD_CHANGES_DATE_GROUPED).child(format_utc_date_str()).child(self.user_id)
+        user_data_change_log_path = f'{DB_BETA_USER_DATA_CHANGE_LOG}/{self.user_id}'
+        workout_record_changes_date_grouped_path = (
+            f'{DB_WORKOUT_RECORD_CHANGES_DATE_GROUPED}/{format_utc_date_str()}/{self.user_id}'
         )
-
-        workout_record_changes_user_date_grouped_ref = (
-            self.root_ref.child(DB_WORKOUT_RECORD_CHANGES_USER_DATE_GROUPED)
-            .child(self.user_id)
-            .child(format_kst_date_str())
+        workout_record_changes_user_date_grouped_path = (
+            f'{DB_WORKOUT_RECORD_CHANGES_USER_DATE_GROUPED}/{self.user_id}/{format_kst_date_str()}'
         )
 
         user_data_info = user_ref.get()
@@ -149,16 +151,17 @@ class WorkoutLogHandler:
         if not calculated_logs[JOIN_COUNT_STATUS] and calculated_logs['workout_succeeded']:
             old_user_data[JOIN_COUNT] = user_data_info.get(JOIN_COUNT) or 0
             new_user_data[JOIN_COUNT] = old_user_data[JOIN_COUNT] + 1
-            self.user_workout_logs_ref.update({JOIN_COUNT_STATUS: True})
+            self.write_batch.update(self.user_workout_logs_ref.path, {JOIN_COUNT_STATUS: True})
 
-        user_ref.update(new_user_data)
+        self.write_batch.update(user_ref.path, new_user_data)
 
-        user_data_change_log_ref.push().set(
-            create_change_log_data_set(ref_key='WorkoutRecord', new_data=new_user_data, old_data=old_user_data)
+        self.write_batch.push(
+            user_data_change_log_path,
+            create_change_log_data_set(ref_key='WorkoutRecord', new_data=new_user_data, old_data=old_user_data),
         )
 
-        workout_record_changes_date_grouped_ref.push().set(calculated_logs)
-        workout_record_changes_user_date_grouped_ref.push().set(calculated_logs)
+        self.write_batch.push(workout_record_changes_date_grouped_path, calculated_logs)
+        self.write_batch.push(workout_record_changes_user_date_grouped_path, calculated_logs)
 
 
 @workout_logs_api_module.route('/workout-logs/init', methods=['POST'])
@@ -172,7 +175,9 @@ def workout_log_init_api(request: Request, root_ref: Reference, handler: APIHand
     if not body:
         raise BadRequestError('Missing body in the request')
 
-    workout_log_handler = WorkoutLogHandler(root_ref=root_ref, user_id=user_id, body=body, timestamp=handler.timestamp)
+    workout_log_handler = WorkoutLogHandler(
+        root_ref=root_ref, user_id=user_id, body=body, timestamp=handler.timestamp, write_batch=handler.write_batch
+    )
     content_info = workout_log_handler.get_content_info()
 
     initialization_res = workout_log_handler.initialize_workout_logs(content_info)
@@ -194,7 +199,9 @@ def workout_log_api(request: Request, root_ref: Reference, handler: APIHandler)
     if not body:
         raise BadRequestError('Missing body in the request')
 
-    workout_log_handler = WorkoutLogHandler(root_ref=root_ref, user_id=user_id, body=body, timestamp=handler.timestamp)
+    workout_log_handler = WorkoutLogHandler(
+        root_ref=root_ref, user_id=user_id, body=body, timestamp=handler.timestamp, write_batch=handler.write_batch
+    )
     content_info = workout_log_handler.get_content_info()
 
     workout_log_handler.initialize_workout_logs(content_info)
@@ -228,9 +235,16 @@ def workout_log_abnormal_check_api(request: Request, root_ref: Reference, handle
         if log_info.get(LOGS):
             body = {DATETIME_KEY: ref_key, 'LogInfo': {'EventType': 'AutoClosed', DURATION_SEC: 0}}
             workout_log_handler = WorkoutLogHandler(
-                root_ref=root_ref, user_id=user_id, body=body, timestamp=handler.timestamp
+                root_ref=root_ref,
+                user_id=user_id,
+                body=body,
+                timestamp=handler.timestamp,
+                write_batch=handler.write_batch,
             )
             calculated_logs = workout_log_handler.calculate_logs()
             workout_log_handler.update_user_workout_data(calculated_logs)
 
+            # The next log reads the user totals written here
+            handler.write_batch.commit()
+
     return handler.response('', 201)
@@ -1,15 +1,71 @@
 import functools
+import json
+import os
+import random
 
 import watchtower
 
 from logging import Formatter, getLogger, INFO, Logger
+from typing import Any, Optional
 
 from chalice import BadRequestError, NotFoundError
 from chalice import Blueprint
 from chalice.app import Request, Response
 
 from chalicelib.core import format_utc_timestamp
+from chalicelib.db.batch import WriteBatch
 from chalicelib.db.engine import root_ref
+from chalicelib.db.public_profile import get_public_profile_changes, sync_user_public_profile
+from chalicelib.db.request_ref import RequestReference
+from chalicelib.metrics import CallRecorder, current_recorder, emit_metrics
+from chalicelib.profiling import profiled, should_profile
+
+
+LOG_SEND_INTERVAL_SEC = int(os.getenv('LOG_SEND_INTERVAL_SEC', '10'))
+LOG_MAX_BATCH_COUNT = int(os.getenv('LOG_MAX_BATCH_COUNT', '1000'))
+LOG_BODY_MAX_BYTES = int(os.getenv('LOG_BODY_MAX_BYTES', str(8 * 1024)))
+LOG_BODY_PREVIEW_CHARS = int(os.getenv('LOG_BODY_PREVIEW_CHARS', '512'))
+LOG_BODY_SAMPLE_RATE = float(os.getenv('LOG_BODY_SAMPLE_RATE', '0'))
+
+_log_handler: Optional[watchtower.CloudWatchLogHandler] = None
+
+
+def get_log_handler() -> watchtower.CloudWatchLogHandler:
+    # One handler per container: it owns the boto3 client and the background queue that ships batches
+    global _log_handler
+
+    if _log_handler is None:
+        handler = watchtower.CloudWatchLogHandler(
+            send_interval=LOG_SEND_INTERVAL_SEC, max_batch_count=LOG_MAX_BATCH_COUNT
+        )
+        handler.setFormatter(Formatter('[%(levelname)s] %(message)s'))
+
+        logger = getLogger()
+        logger.setLevel(INFO)
+        logger.addHandler(handler)
+
+        _log_handler = handler
+
+    return _log_handler
+
+
+def flush_logs() -> None:
+    # Lambda freezes the container once the invocation returns, so whatever is still queued is sent now
+    if _log_handler is not None:
+        _log_handler.flush()
+
+
+def truncate_log_body(body: Any) -> Any:
+    # Large bodies such as full leaderboards are logged as a preview, except for a sampled share
+    if body is None or isinstance(body, (bool, int, float)):
+        return body
+
+    serialized = json.dumps(body, ensure_ascii=False, default=str)
+    body_bytes = len(serialized.encode())
+    if body_bytes <= LOG_BODY_MAX_BYTES or random.random() < LOG_BODY_SAMPLE_RATE:
+        return body
+
+    return {'Truncated': True, 'Bytes': body_bytes, 'Preview': serialized[:LOG_BODY_PREVIEW_CHARS]}
 
 
 class APIHandler:
@@ -17,24 +73,18 @@ class APIHandler:
         self.logger = self._create_logger()
         self.request = request
         self.timestamp = format_utc_timestamp()
+        self.root_ref = RequestReference(root_ref)
+        self.write_batch = WriteBatch(self.root_ref)
 
     def _create_logger(self) -> Logger:
-        logger = getLogger()
-        logger.setLevel(INFO)
-
-        handler = watchtower.CloudWatchLogHandler()
-        formatter = Formatter('[%(levelname)s] %(message)s')
-
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-
-        return logger
+        get_log_handler()
+        return getLogger()
 
     def logging_request_info(self) -> None:
         context = self.request.context
 
         if self.request._body:
-            context['requestBody'] = self.request.json_body
+            context['requestBody'] = truncate_log_body(self.request.json_body)
         if self.request.query_params:
             context['queryParams'] = dict(self.request.query_params)
 
@@ -43,7 +93,7 @@ class APIHandler:
     def response(self, body: dict, status_code: int) -> Response:
         context = self.request.context
         response_log_info = {
-            'body': body,
+            'body': truncate_log_body(body),
             'statusCode': status_code,
             'requestBody': context.get('requestBody', ''),
             'queryParams': context.get('queryParams', ''),
@@ -91,23 +141,40 @@ def common_set_up(module: Blueprint):
     def decorator(func):
         @functools.wraps(func)
         def wrapper(**kwargs):
-            try:
-                request = module.current_request
+            recorder = CallRecorder()
+            recorder_token = current_recorder.set(recorder)
+            request = module.current_request
+            function_name = f'{request.method} {request.context.get("resourcePath", "")}'
+            response = None
 
+            try:
                 handler = APIHandler(request)
                 handler.logging_request_info()
 
                 uri_params = request.uri_params or {}
                 kwargs.update(uri_params)
 
-                return func(request=request, root_ref=root_ref, handler=handler, **kwargs)
+                with profiled(function_name, should_profile(request)):
+                    response = func(request=request, root_ref=handler.root_ref, handler=handler, **kwargs)
+                    committed_updates = handler.write_batch.commit() or {}
+
+                    # A route that changed a nickname, costume, deletion or device refreshes that user's projection
+                    for user_id in get_public_profile_changes(committed_updates):
+                        sync_user_public_profile(handler.root_ref, user_id)
 
             except BadRequestError as e:
-                return handler.error(e, 400)
+                response = handler.error(e, 400)
             except NotFoundError as e:
-                return handler.error(e, 404)
+                response = handler.error(e, 404)
             except Exception as e:
-                return handler.error(e, 500)
+                response = handler.error(e, 500)
+            finally:
+                status_code = response.status_code if isinstance(response, Response) else 200 if response else 500
+                emit_metrics(recorder, function_name, status_code)
+                current_recorder.reset(recorder_token)
+                flush_logs()
+
+            return response
 
         return wrapper
 
@@ -2,6 +2,7 @@
 COMPLETED_TIME_UTC = 'CompletedTimeUtc'
 EVENT_TIME_UTC = 'EventTimeUtc'
 GAME_OVER_TIME_UTC = 'GameOverTimeUtc'
+GAME_OVER_TIMESTAMP = 'GameOverTimestamp'
 PARTIAL_COMPLETED_TIME_UTC = 'PartialCompletedTimeUtc'
 UPDATED_TIME_UTC = 'UpdatedTimeUtc'
 WEEK_START_TIME_UTC = 'WeekStartTimeUtc'
@@ -60,6 +61,8 @@ MY_GROUP_LIST = 'MyGroupList'
 NICKNAME = 'Nickname'
 OBJECTIVE_TYPE = 'ObjectiveType'
 ORDER = 'Order'
+PAGE_COUNT = 'PageCount'
+PAGE_SIZE = 'PageSize'
 PAID = 'Paid'
 PERCENTAGE = 'Percentage'
 PHONE_NUMBER = 'PhoneNumber'
@@ -73,10 +76,12 @@ REWARD_KEY = 'RewardKey'
 SET = 'Set'
 SKI_GAME = 'SkiGame'
 TITLE = 'Title'
+TOKENS = 'Tokens'
 TOTAL_CALROIES_BURNED = 'TotalCalroiesBurned'
 TOTAL_WORKOUT_TIME = 'TotalWorkoutTime'
 TYPE = 'Type'
 TYPE_TEXT = 'TypeText'
+USER_COUNT = 'UserCount'
 USER_KEY = 'UserKey'
 USER_LIST = 'UserList'
 VALUE = 'Value'
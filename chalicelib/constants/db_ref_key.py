@@ -49,6 +49,9 @@ DB_BETA_USER_REWARD_POPUP = 'beta_user_reward_popup'
 # beta_user_workout_logs'
 DB_BETA_USER_WORKOUT_LOGS = 'beta_user_workout_logs'
 
+# config_version
+DB_CONFIG_VERSION = 'config_version'
+
 # content_feedback
 DB_CONTENT_FEEDBACK = 'content_feedback'
 
@@ -58,12 +61,27 @@ DB_CONTENT_INFO = 'content_info'
 # deleted_user_data
 DB_DELETED_USER_DATA = 'deleted_user_data'
 
+# exchangeable_gift_catalog
+DB_EXCHANGEABLE_GIFT_CATALOG = 'exchangeable_gift_catalog'
+
+# game_logs_by_time
+DB_GAME_LOGS_BY_TIME = 'game_logs_by_time'
+
 # game_ranking_current_week
 DB_GAME_RANkING_CURRENT_WEEK = 'game_ranking_current_week'
 
+# game_ranking_current_week_pages
+DB_GAME_RANkING_CURRENT_WEEK_PAGES = 'game_ranking_current_week_pages'
+
 # game_ranking_last_week
 DB_GAME_RANkING_LAST_WEEK = 'game_ranking_last_week'
 
+# game_weekly_best
+DB_GAME_WEEKLY_BEST = 'game_weekly_best'
+
+# job_run_ledger
+DB_JOB_RUN_LEDGER = 'job_run_ledger'
+
 # live_schedule_info
 DB_LIVE_SCHEDULE_INFO = 'live_schedule_info'
 
@@ -85,6 +103,9 @@ DB_REWARD_LOGS = 'reward_logs'
 # stair_climbing_map_data
 DB_STAIR_CLIMBING_MAP_DATA = 'stair_climbing_map_data'
 
+# user_public_profile
+DB_USER_PUBLIC_PROFILE = 'user_public_profile'
+
 # workout_record_changes_date_grouped
 DB_WORKOUT_RECORD_CHANGES_DATE_GROUPED = 'workout_record_changes_date_grouped'
 
@@ -1,13 +1,12 @@
-import asyncio
-import boto3
 import json
 import os
 
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, time, timedelta, timezone
 from typing import Any, Optional, Union
 
 from chalicelib.constants.common import DELETED, DEVICES, FREE, PAID, UPDATED_TIME_UTC
+from chalicelib.db.fetch import fetch_engine
+from chalicelib.metrics import EVENT_BRIDGE, record_call
 from chalicelib.slack_bot import post_slack_message
 
 
@@ -59,6 +58,18 @@ def format_kst_timestamp_to_datetime(str_obj: str) -> datetime:
     return formatted_time
 
 
+def get_week_start(today: datetime) -> datetime:
+    # Monday 00:00 KST, expressed in UTC
+    return datetime.combine(today.date(), time.min, tzinfo=timezone.utc) - timedelta(
+        days=((today.weekday()) % 7), hours=9
+    )
+
+
+def get_week_key(week_start: datetime) -> str:
+    # Same date key game_ranking_last_week is stored under
+    return format_utc_timestamp(week_start).split(' ')[0]
+
+
 def format_unix_timestamp(time_obj: datetime = None) -> float:
     if not time_obj:
         time_obj = datetime.now(timezone.utc)
@@ -89,11 +100,13 @@ def manage_event_bridge_schedule(
 ) -> None:
     try:
         group_name = f'{group_name}-{SERVER_ENV}'
-        response = client.list_schedule_groups(MaxResults=100)['ScheduleGroups']
+        with record_call(EVENT_BRIDGE, 'list_schedule_groups'):
+            response = client.list_schedule_groups(MaxResults=100)['ScheduleGroups']
         schedule_groups = [schedule_group.get('Name') for schedule_group in response]
 
         if group_name not in schedule_groups:
-            client.create_schedule_group(Name=group_name)
+            with record_call(EVENT_BRIDGE, 'create_schedule_group'):
+                client.create_schedule_group(Name=group_name)
 
         expression_time_str = f'at({expression_time.strftime("%Y-%m-%dT%H:%M:%S")})'
         schedule_info = {
@@ -113,9 +126,11 @@ def manage_event_bridge_schedule(
         }
 
         if operation == 'create':
-            client.create_schedule(**schedule_info)
+            with record_call(EVENT_BRIDGE, 'create_schedule'):
+                client.create_schedule(**schedule_info)
         elif operation == 'update':
-            client.update_schedule(**schedule_info)
+            with record_call(EVENT_BRIDGE, 'update_schedule'):
+                client.update_schedule(**schedule_info)
 
     except Exception as e:
         post_slack_message(
@@ -167,11 +182,15 @@ def check_subscribing_user(user_key: str, user_profile: dict[str, Any]) -> bool:
 def create_activity_after_24_notification_schedule(user_id: str, payload=dict) -> None:
     expression_time = datetime.now() + timedelta(hours=23, minutes=30)
     group_name = 'ActivityAfter24NotificationGroup'
+
+    import boto3
+
     client = boto3.client('scheduler')
     schedule_name = f'ActivityAfter24-{user_id}'
 
     try:
-        client.get_schedule(GroupName=f'{group_name}-{SERVER_ENV}', Name=schedule_name)
+        with record_call(EVENT_BRIDGE, 'get_schedule'):
+            client.get_schedule(GroupName=f'{group_name}-{SERVER_ENV}', Name=schedule_name)
     except client.exceptions.ResourceNotFoundException:
         return manage_event_bridge_schedule(
             client=client,
@@ -194,17 +213,7 @@ def create_activity_after_24_notification_schedule(user_id: str, payload=dict) -
     )
 
 
-def async_fetch_paths(root_ref, path_list):
-    def fetch_data(path):
-        return root_ref.child(path).get()
-
-    async def fetch_all_data():
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as executor:
-            paths = path_list
-
-            tasks = [loop.run_in_executor(executor, fetch_data, path) for path in paths]
-            results = await asyncio.gather(*tasks)
-            return dict(zip(paths, results))
-
-    return asyncio.run(fetch_all_data())
+def async_fetch_paths(root_ref, path_list, timeout: Optional[float] = None) -> dict:
+    result = fetch_engine.fetch(root_ref, path_list, timeout=timeout)
+    result.raise_for_errors()
+    return result
@@ -0,0 +1,115 @@
+import random
+import threading
+import time
+
+from typing import Any, Optional
+
+from chalicelib.metrics import count_items
+
+
+PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+
+_push_key_lock = threading.Lock()
+_last_push_time = 0
+_last_random_chars = [0] * 12
+
+
+def generate_push_key() -> str:
+    # Same layout as the Firebase client push ids: 8 chars of timestamp followed by 12 random chars,
+    # incremented instead of re-rolled within the same millisecond so keys stay ordered.
+    global _last_push_time
+
+    with _push_key_lock:
+        now = int(time.time() * 1000)
+        duplicate_time = now == _last_push_time
+        _last_push_time = now
+
+        time_chars = []
+        for _ in range(8):
+            time_chars.append(PUSH_CHARS[now % 64])
+            now //= 64
+
+        if not duplicate_time:
+            for i in range(12):
+                _last_random_chars[i] = random.randrange(64)
+        else:
+            i = 11
+            while i >= 0 and _last_random_chars[i] == 63:
+                _last_random_chars[i] = 0
+                i -= 1
+            if i >= 0:
+                _last_random_chars[i] += 1
+
+        return ''.join(reversed(time_chars)) + ''.join(PUSH_CHARS[char] for char in _last_random_chars)
+
+
+def _normalize_path(path: str) -> str:
+    return '/'.join(segment for segment in path.split('/') if segment)
+
+
+def _join_path(path: str, child: str) -> str:
+    return _normalize_path(f'{path}/{child}')
+
+
+class WriteBatch:
+    # Collects the writes of a request and sends them as a single atomic multi-location update.
+    def __init__(self, root_ref: Any) -> None:
+        self.root_ref = root_ref
+        self._updates: dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._updates)
+
+    @property
+    def pending_updates(self) -> dict[str, Any]:
+        return dict(self._updates)
+
+    def set(self, path: str, value: Any) -> None:
+        path = _normalize_path(path)
+
+        for pending_path in list(self._updates):
+            if path.startswith(f'{pending_path}/'):
+                self._merge_into(pending_path, path[len(pending_path) + 1 :], value)
+                return
+            if pending_path == path or pending_path.startswith(f'{path}/'):
+                del self._updates[pending_path]
+
+        self._updates[path] = value
+
+    def update(self, path: str, value: dict[str, Any]) -> None:
+        for key, child_value in value.items():
+            self.set(_join_path(path, key), child_value)
+
+    def push(self, path: str, value: Any) -> str:
+        key = generate_push_key()
+        self.set(_join_path(path, key), value)
+        return key
+
+    def delete(self, path: str) -> None:
+        self.set(path, None)
+
+    def commit(self) -> Optional[dict[str, Any]]:
+        if not self._updates:
+            return None
+
+        updates, self._updates = self._updates, {}
+        self.root_ref.update(updates)
+        count_items(changed=len(updates))
+        return updates
+
+    def discard(self) -> None:
+        self._updates = {}
+
+    def _merge_into(self, pending_path: str, relative_path: str, value: Any) -> None:
+        # Copies each level on the way down so values handed to set() by the caller are never mutated.
+        segments = relative_path.split('/')
+
+        pending_value = self._updates[pending_path]
+        node = dict(pending_value) if isinstance(pending_value, dict) else {}
+        self._updates[pending_path] = node
+
+        for segment in segments[:-1]:
+            child = node.get(segment)
+            node[segment] = dict(child) if isinstance(child, dict) else {}
+            node = node[segment]
+        node[segments[-1]] = value
@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+
+from typing import Any
+
+from cachetools import TTLCache
+
+from chalicelib.constants.db_ref_key import DB_CONFIG_VERSION
+
+
+CONFIG_CACHE_TTL_SEC = int(os.getenv('CONFIG_CACHE_TTL_SEC', '600'))
+CONFIG_CACHE_MAX_SIZE = int(os.getenv('CONFIG_CACHE_MAX_SIZE', '256'))
+CONFIG_VERSION_CHECK_SEC = int(os.getenv('CONFIG_VERSION_CHECK_SEC', '30'))
+
+
+class ConfigCache:
+    # Keeps rarely-changing config nodes in memory across invocations of a warm container.
+    # Bumping the `config_version` node invalidates every cached node at the next version check.
+    def __init__(
+        self,
+        ttl: int = CONFIG_CACHE_TTL_SEC,
+        max_size: int = CONFIG_CACHE_MAX_SIZE,
+        version_check_interval: int = CONFIG_VERSION_CHECK_SEC,
+        version_path: str = DB_CONFIG_VERSION,
+    ) -> None:
+        self.version_check_interval = version_check_interval
+        self.version_path = version_path
+
+        self._cache = TTLCache(maxsize=max_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = None
+
+    def _check_version(self, root_ref: Any) -> None:
+        now = time.monotonic()
+        if self._version_checked_at is not None and now - self._version_checked_at < self.version_check_interval:
+            return
+
+        version = root_ref.child(self.version_path).get()
+        with self._lock:
+            self._version_checked_at = now
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+
+    def get(self, root_ref: Any, path: str) -> Any:
+        self._check_version(root_ref)
+
+        with self._lock:
+            if path in self._cache:
+                return self._cache[path]
+
+        value = root_ref.child(path).get()
+        with self._lock:
+            self._cache[path] = value
+        return value
+
+    def invalidate(self, path: str = None) -> None:
+        with self._lock:
+            if path is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(path, None)
+
+
+config_cache = ConfigCache()
@@ -0,0 +1,78 @@
+import json
+import os
+
+from typing import Any, Iterator
+
+from chalicelib.metrics import count_items
+
+
+RTDB_UPDATE_MAX_BYTES = int(os.getenv('RTDB_UPDATE_MAX_BYTES', str(1024 * 1024)))
+
+
+def _as_node(value: Any) -> Any:
+    # RTDB stores arrays as objects keyed by index, so both compare the same way
+    if isinstance(value, list):
+        return {str(index): item for index, item in enumerate(value) if item is not None}
+    return value
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == {} or value == []
+
+
+def diff_tree(original: Any, modified: Any, path: str = '') -> dict[str, Any]:
+    original = _as_node(original)
+    modified = _as_node(modified)
+
+    if isinstance(original, dict) and isinstance(modified, dict):
+        updates = {}
+        for key, value in modified.items():
+            child_path = f'{path}/{key}' if path else str(key)
+            if key not in original:
+                if not _is_empty(value):
+                    updates[child_path] = value
+            else:
+                updates.update(diff_tree(original[key], value, child_path))
+
+        for key in original:
+            if key not in modified:
+                updates[f'{path}/{key}' if path else str(key)] = None
+        return updates
+
+    if _is_empty(original) and _is_empty(modified):
+        return {}
+
+    # 1 and 1.0 are the same stored number, True and 1 are not
+    if original == modified and isinstance(original, bool) == isinstance(modified, bool):
+        return {}
+
+    if not path:
+        raise ValueError('The root of a diffed tree must stay an object')
+    return {path: modified}
+
+
+def iter_update_batches(updates: dict[str, Any], max_bytes: int = RTDB_UPDATE_MAX_BYTES) -> Iterator[dict[str, Any]]:
+    batch = {}
+    batch_bytes = 0
+
+    for path, value in updates.items():
+        entry_bytes = len(json.dumps({path: value}, ensure_ascii=False, separators=(',', ':')).encode())
+        if batch and batch_bytes + entry_bytes > max_bytes:
+            yield batch
+            batch = {}
+            batch_bytes = 0
+
+        batch[path] = value
+        batch_bytes += entry_bytes
+
+    if batch:
+        yield batch
+
+
+def update_tree_diff(ref: Any, original: Any, modified: Any, max_bytes: int = RTDB_UPDATE_MAX_BYTES) -> int:
+    # Batches are separate updates, so a failure part way through leaves the earlier batches written
+    updates = diff_tree(original, modified)
+    for batch in iter_update_batches(updates, max_bytes=max_bytes):
+        ref.update(batch)
+    count_items(changed=len(updates))
+    return len(updates)
@@ -4,12 +4,25 @@ import firebase_admin as admin
 from firebase_admin import credentials
 from firebase_admin import db
 
+from chalicelib.db.instrument import InstrumentedReference
 
-if not admin._apps:
-    db_url = os.getenv("DB_URL")
 
-    prod = os.getenv("SERVER_ENV") == "prod"
+# `local` serves every read and write from chalicelib/db/local.py instead of Firebase, for offline benchmarks
+RTDB_BACKEND = os.getenv('RTDB_BACKEND', 'firebase')
 
-    cred = credentials.Certificate('chalicelib/firebase/fiva_firebase_admin.json')
-    admin.initialize_app(cred, {"databaseURL": db_url % ("default" if prod else "develop")})
-root_ref = db.reference()
+if RTDB_BACKEND == 'local':
+    from chalicelib.db.local import create_local_root_ref
+
+    root_ref = create_local_root_ref()
+else:
+    if not admin._apps:
+        db_url = os.getenv("DB_URL")
+
+        prod = os.getenv("SERVER_ENV") == "prod"
+
+        cred = credentials.Certificate('chalicelib/firebase/fiva_firebase_admin.json')
+        admin.initialize_app(cred, {"databaseURL": db_url % ("default" if prod else "develop")})
+    root_ref = db.reference()
+
+# Reads and writes are timed and sized for whichever API request or scheduled job is running
+root_ref = InstrumentedReference(root_ref)
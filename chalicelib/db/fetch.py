@@ -0,0 +1,160 @@
+import asyncio
+import contextvars
+import functools
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from logging import getLogger
+from typing import Any, Iterable, Optional
+
+
+FETCH_MAX_WORKERS = int(os.getenv('FETCH_MAX_WORKERS', '8'))
+# Deadline for reads on a request path, jobs read whole trees and wait as long as a read takes.
+# A read past its deadline keeps its worker thread until RTDB answers, it only stops being waited for.
+API_FETCH_TIMEOUT_SEC = float(os.getenv('API_FETCH_TIMEOUT_SEC', '10'))
+
+logger = getLogger(__name__)
+
+
+def _normalize_path(path: str) -> str:
+    return '/'.join(segment for segment in path.split('/') if segment)
+
+
+def plan_fetch_paths(paths: Iterable[str]) -> dict[str, tuple[str, list[str]]]:
+    # Maps every requested path to the path that is actually fetched and the segments to slice out of it.
+    # A path under another requested path is served from that parent instead of a second read.
+    normalized_paths = {path: _normalize_path(path) for path in paths}
+
+    fetch_paths = set()
+    for path in sorted(set(normalized_paths.values()), key=lambda p: (p.count('/'), p)):
+        segments = path.split('/') if path else []
+        if not any('/'.join(segments[:depth]) in fetch_paths for depth in range(len(segments))):
+            fetch_paths.add(path)
+
+    plan = {}
+    for requested_path, path in normalized_paths.items():
+        segments = path.split('/') if path else []
+        for depth in range(len(segments) + 1):
+            fetch_path = '/'.join(segments[:depth])
+            if fetch_path in fetch_paths:
+                plan[requested_path] = (fetch_path, segments[depth:])
+                break
+    return plan
+
+
+def _slice_value(value: Any, segments: list[str]) -> Any:
+    for segment in segments:
+        if isinstance(value, dict):
+            value = value.get(segment)
+        elif isinstance(value, list) and segment.isdigit() and int(segment) < len(value):
+            value = value[int(segment)]
+        else:
+            return None
+    return deepcopy(value) if segments else value
+
+
+class FetchResult(dict):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.errors: dict[str, BaseException] = {}
+
+    @property
+    def failed_paths(self) -> list[str]:
+        return list(self.errors)
+
+    def raise_for_errors(self) -> None:
+        if self.errors:
+            raise next(iter(self.errors.values()))
+
+
+class FetchEngine:
+    # Lives as long as the warm Lambda container, so the worker threads are started once and reused.
+    def __init__(self, max_workers: int = FETCH_MAX_WORKERS, timeout: Optional[float] = None) -> None:
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='rtdb-fetch')
+        return self._executor
+
+    @staticmethod
+    def _plan(paths: Iterable[str]) -> tuple[dict[str, tuple[str, list[str]]], list[str]]:
+        plan = plan_fetch_paths(paths)
+        fetch_paths = list(dict.fromkeys(fetch_path for fetch_path, _ in plan.values()))
+
+        if len(fetch_paths) < len(plan):
+            merged_paths = {path: fetch_path for path, (fetch_path, segments) in plan.items() if segments}
+            logger.debug(
+                'Fetch plan: %d paths requested, %d fetched, merged %s', len(plan), len(fetch_paths), merged_paths
+            )
+        else:
+            logger.debug('Fetch plan: %d paths fetched', len(fetch_paths))
+        return plan, fetch_paths
+
+    @staticmethod
+    def _read(root_ref: Any, path: str) -> Any:
+        # Worker threads run the read in the caller's context, so it is recorded against the caller's invocation
+        get = (root_ref.child(path) if path else root_ref).get
+        return functools.partial(contextvars.copy_context().run, get)
+
+    @staticmethod
+    def _planned_result(plan: dict[str, tuple[str, list[str]]], fetched: FetchResult) -> FetchResult:
+        result = FetchResult()
+        for path, (fetch_path, segments) in plan.items():
+            if fetch_path in fetched.errors:
+                result.errors[path] = fetched.errors[fetch_path]
+            else:
+                result[path] = _slice_value(fetched[fetch_path], segments)
+        return result
+
+    @staticmethod
+    def _timeout_error(path: str, timeout: float) -> TimeoutError:
+        return TimeoutError(f'Fetching {path} timed out after {timeout}s')
+
+    def fetch(self, root_ref: Any, paths: Iterable[str], timeout: Optional[float] = None) -> FetchResult:
+        timeout = self.timeout if timeout is None else timeout
+        plan, paths = self._plan(paths)
+
+        futures = {path: self.executor.submit(self._read(root_ref, path)) for path in paths}
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        fetched = FetchResult()
+        for path, future in futures.items():
+            try:
+                fetched[path] = future.result(timeout=max(deadline - time.monotonic(), 0) if deadline else None)
+            except TimeoutError:
+                future.cancel()
+                fetched.errors[path] = self._timeout_error(path, timeout)
+            except Exception as e:
+                fetched.errors[path] = e
+
+        return self._planned_result(plan, fetched)
+
+    async def fetch_async(self, root_ref: Any, paths: Iterable[str], timeout: Optional[float] = None) -> FetchResult:
+        timeout = self.timeout if timeout is None else timeout
+        plan, paths = self._plan(paths)
+
+        loop = asyncio.get_running_loop()
+        tasks = [
+            asyncio.wait_for(loop.run_in_executor(self.executor, self._read(root_ref, path)), timeout) for path in paths
+        ]
+        responses = await asyncio.gather(*tasks, return_exceptions=True)
+
+        fetched = FetchResult()
+        for path, response in zip(paths, responses):
+            if isinstance(response, asyncio.TimeoutError):
+                fetched.errors[path] = self._timeout_error(path, timeout)
+            elif isinstance(response, Exception):
+                fetched.errors[path] = response
+            else:
+                fetched[path] = response
+
+        return self._planned_result(plan, fetched)
+
+
+fetch_engine = FetchEngine()
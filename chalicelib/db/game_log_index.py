@@ -0,0 +1,81 @@
+from datetime import datetime
+from typing import Any
+
+from chalicelib.constants.common import GAME_OVER_TIME_UTC, GAME_OVER_TIMESTAMP, USER_KEY
+from chalicelib.constants.db_ref_key import DB_BETA_USER_GAME_LOGS, DB_GAME_LOGS_BY_TIME
+from chalicelib.core import format_utc_timestamp_to_datetime
+from chalicelib.db.pagination import iter_child_pages
+from chalicelib.metrics import count_items
+
+
+GAME_LOG_INDEX_PAGE_SIZE = 500
+
+# game_logs_by_time/{game}/{push key} holds every game's plays in one list ordered by GameOverTimestamp,
+# so a week of plays is a single range query. Queries over REST need the index in the database rules:
+# "game_logs_by_time": {"$game": {".indexOn": ["GameOverTimestamp"]}}
+
+
+def to_game_over_timestamp(time_obj: datetime) -> int:
+    # Milliseconds since the epoch, GameOverTimeUtc strings do not sort by time (12-hour clock, AM/PM last)
+    return round(time_obj.timestamp() * 1000)
+
+
+def build_indexed_game_log(user_key: str, game_log: dict[str, Any]) -> dict[str, Any]:
+    return {
+        **game_log,
+        USER_KEY: user_key,
+        GAME_OVER_TIMESTAMP: to_game_over_timestamp(format_utc_timestamp_to_datetime(game_log[GAME_OVER_TIME_UTC])),
+    }
+
+
+def fetch_game_logs_since(root_ref: Any, game_name: str, since: datetime) -> dict[str, dict[str, Any]]:
+    return (
+        root_ref.child(DB_GAME_LOGS_BY_TIME)
+        .child(game_name)
+        .order_by_child(GAME_OVER_TIMESTAMP)
+        .start_at(to_game_over_timestamp(since))
+        .get()
+        or {}
+    )
+
+
+def prune_game_log_index(root_ref: Any, game_name: str, before: datetime) -> int:
+    game_log_index_ref = root_ref.child(DB_GAME_LOGS_BY_TIME).child(game_name)
+    stale_logs = (
+        game_log_index_ref.order_by_child(GAME_OVER_TIMESTAMP).end_at(to_game_over_timestamp(before) - 1).get() or {}
+    )
+    if stale_logs:
+        game_log_index_ref.update({push_key: None for push_key in stale_logs})
+    return len(stale_logs)
+
+
+def backfill_game_log_index(
+    root_ref: Any, since: datetime, page_size: int = GAME_LOG_INDEX_PAGE_SIZE
+) -> dict[str, list[dict[str, Any]]]:
+    # Plays the app wrote straight to beta_user_game_logs get their numeric timestamp and an index entry.
+    # Only plays since `since` are copied, older ones are never ranked again. A play that already has its
+    # timestamp was indexed by the ingest route or an earlier run, so each run writes only new plays.
+    indexed_logs = {}
+    for game_logs in iter_child_pages(root_ref.child(DB_BETA_USER_GAME_LOGS), page_size=page_size):
+        updates = {}
+        for user_key, user_game_logs in game_logs.items():
+            for game_name, logs in (user_game_logs or {}).items():
+                if not isinstance(logs, dict):
+                    continue
+                for push_key, log in logs.items():
+                    if not isinstance(log, dict) or GAME_OVER_TIMESTAMP in log:
+                        continue
+                    if format_utc_timestamp_to_datetime(log[GAME_OVER_TIME_UTC]) < since:
+                        continue
+                    indexed_log = build_indexed_game_log(user_key, log)
+                    indexed_logs.setdefault(game_name, []).append(indexed_log)
+                    updates[f'{DB_GAME_LOGS_BY_TIME}/{game_name}/{push_key}'] = indexed_log
+                    updates[
+                        f'{DB_BETA_USER_GAME_LOGS}/{user_key}/{game_name}/{push_key}/{GAME_OVER_TIMESTAMP}'
+                    ] = indexed_log[GAME_OVER_TIMESTAMP]
+
+        if updates:
+            root_ref.update(updates)
+            count_items(changed=len(updates))
+
+    return indexed_logs
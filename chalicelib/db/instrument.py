@@ -0,0 +1,127 @@
+import json
+import os
+
+from contextlib import nullcontext
+from typing import Any, Optional
+
+from chalicelib.metrics import RTDB, current_recorder, path_template
+
+
+RTDB_BYTES_ACCOUNTING = os.getenv('RTDB_BYTES_ACCOUNTING', 'true').lower() == 'true'
+
+
+def payload_bytes(value: Any) -> int:
+    # Size of the JSON that goes over the wire, which is what RTDB bills for
+    if value is None or not RTDB_BYTES_ACCOUNTING:
+        return 0
+    return len(json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str).encode())
+
+
+def top_level_node(path: str) -> str:
+    return path.strip('/').split('/', 1)[0] or '/'
+
+
+def _record(ref: Any, operation: str) -> Any:
+    recorder = current_recorder.get()
+    if recorder is None:
+        return nullcontext({})
+    return recorder.record(RTDB, operation, path_template(ref.path))
+
+
+class InstrumentedQuery:
+    def __init__(self, query: Any, ref: Any) -> None:
+        self._query = query
+        self._ref = ref
+
+    def __getattr__(self, name: str) -> Any:
+        # start_at, limit_to_first, ... return the same query object, so chaining keeps this wrapper
+        method = getattr(self._query, name)
+
+        def chained(*args, **kwargs):
+            method(*args, **kwargs)
+            return self
+
+        return chained
+
+    def get(self) -> Any:
+        with _record(self._ref, 'query') as fields:
+            value = self._query.get()
+            fields.update(Node=top_level_node(self._ref.path), BytesRead=payload_bytes(value))
+        return value
+
+
+class InstrumentedReference:
+    # Wraps the process-wide root reference. While an invocation has a recorder, every call is timed and
+    # the size of what it reads and writes is counted against the top-level node it touches.
+    def __init__(self, ref: Any) -> None:
+        self._ref = ref
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._ref, name)
+
+    @property
+    def key(self) -> Optional[str]:
+        return self._ref.key
+
+    @property
+    def path(self) -> str:
+        return self._ref.path
+
+    @property
+    def parent(self) -> Optional['InstrumentedReference']:
+        parent = self._ref.parent
+        return InstrumentedReference(parent) if parent is not None else None
+
+    def child(self, path: str) -> 'InstrumentedReference':
+        return InstrumentedReference(self._ref.child(path))
+
+    def get(self, etag: bool = False, shallow: bool = False) -> Any:
+        with _record(self, 'get') as fields:
+            value = self._ref.get(etag=etag, shallow=shallow)
+            fields.update(Node=top_level_node(self.path), BytesRead=payload_bytes(value[0] if etag else value))
+        return value
+
+    def set(self, value: Any) -> None:
+        with _record(self, 'set') as fields:
+            self._ref.set(value)
+            fields.update(Node=top_level_node(self.path), BytesWritten=payload_bytes(value))
+
+    def update(self, value: dict[str, Any]) -> None:
+        with _record(self, 'update') as fields:
+            self._ref.update(value)
+
+            # A multi-location update at the root touches several nodes, each is counted on its own
+            if current_recorder.get() is not None and self.path.strip('/') == '':
+                node_bytes: dict[str, int] = {}
+                for path, child in value.items():
+                    node = top_level_node(path)
+                    node_bytes[node] = node_bytes.get(node, 0) + payload_bytes({path: child})
+                fields.update(NodeBytesWritten=node_bytes, BytesWritten=sum(node_bytes.values()))
+            else:
+                fields.update(Node=top_level_node(self.path), BytesWritten=payload_bytes(value))
+
+    def delete(self) -> None:
+        with _record(self, 'delete') as fields:
+            self._ref.delete()
+            fields.update(Node=top_level_node(self.path))
+
+    def push(self, value: Any = '') -> 'InstrumentedReference':
+        with _record(self, 'push') as fields:
+            pushed_ref = self._ref.push(value)
+            fields.update(Node=top_level_node(self.path), BytesWritten=payload_bytes(value))
+        return InstrumentedReference(pushed_ref)
+
+    def transaction(self, transaction_update: Any) -> Any:
+        with _record(self, 'transaction') as fields:
+            value = self._ref.transaction(transaction_update)
+            fields.update(Node=top_level_node(self.path), BytesWritten=payload_bytes(value))
+        return value
+
+    def order_by_child(self, path: str) -> InstrumentedQuery:
+        return InstrumentedQuery(self._ref.order_by_child(path), self)
+
+    def order_by_key(self) -> InstrumentedQuery:
+        return InstrumentedQuery(self._ref.order_by_key(), self)
+
+    def order_by_value(self) -> InstrumentedQuery:
+        return InstrumentedQuery(self._ref.order_by_value(), self)
@@ -0,0 +1,339 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from collections import Counter, OrderedDict
+from copy import deepcopy
+from typing import Any, Callable, Optional
+
+from chalicelib.db.batch import generate_push_key
+
+
+LOCAL_RTDB_FIXTURE = os.getenv('LOCAL_RTDB_FIXTURE')
+LOCAL_RTDB_LATENCY_MS = float(os.getenv('LOCAL_RTDB_LATENCY_MS', '0'))
+
+
+def _split_path(path: str) -> list[str]:
+    return [segment for segment in path.split('/') if segment]
+
+
+def _payload_bytes(value: Any) -> int:
+    if value is None:
+        return 0
+    return len(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode())
+
+
+def _normalize(value: Any) -> Any:
+    # RTDB never stores nulls or empty objects, so they disappear on write like they do on the server
+    if isinstance(value, dict):
+        value = {str(key): _normalize(child) for key, child in value.items()}
+        value = {key: child for key, child in value.items() if child is not None}
+        return value or None
+    if isinstance(value, list):
+        value = [_normalize(child) for child in value]
+        return value if any(child is not None for child in value) else None
+    return value
+
+
+def _child_of(node: Any, segment: str) -> Any:
+    if isinstance(node, dict):
+        return node.get(segment)
+    if isinstance(node, list) and segment.isdigit() and int(segment) < len(node):
+        return node[int(segment)]
+    return None
+
+
+def _type_rank(value: Any) -> int:
+    if value is None:
+        return 0
+    if value is False:
+        return 1
+    if value is True:
+        return 2
+    if isinstance(value, (int, float)):
+        return 3
+    if isinstance(value, str):
+        return 4
+    return 5
+
+
+def _value_sort_key(value: Any) -> tuple:
+    rank = _type_rank(value)
+    return (rank, value if rank in (3, 4) else 0)
+
+
+def _key_sort_key(key: Any) -> tuple:
+    # Keys that look like 32-bit integers come first, in numeric order
+    key = str(key)
+    if key.lstrip('-').isdigit() and -(2**31) <= int(key) < 2**31:
+        return (0, int(key), '')
+    return (1, 0, key)
+
+
+class LocalDatabase:
+    # In-process stand-in for the Realtime Database, used to run handlers and jobs without Firebase.
+    # Every call waits `latency_ms` and is counted together with the bytes it would have moved.
+    def __init__(self, data: Optional[dict[str, Any]] = None, latency_ms: float = LOCAL_RTDB_LATENCY_MS) -> None:
+        self.data = _normalize(deepcopy(data)) or {}
+        self.latency_ms = latency_ms
+        self._lock = threading.RLock()
+
+        self.call_counts: Counter = Counter()
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    @classmethod
+    def from_fixture(cls, fixture_path: Optional[str], latency_ms: float = LOCAL_RTDB_LATENCY_MS) -> 'LocalDatabase':
+        data = {}
+        if fixture_path:
+            with open(fixture_path) as f:
+                data = json.load(f)
+        return cls(data, latency_ms=latency_ms)
+
+    def reference(self, path: str = '/') -> 'LocalReference':
+        return LocalReference(self, _split_path(path))
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.call_counts.clear()
+            self.bytes_read = 0
+            self.bytes_written = 0
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                'Calls': dict(self.call_counts),
+                'CallCount': sum(self.call_counts.values()),
+                'BytesRead': self.bytes_read,
+                'BytesWritten': self.bytes_written,
+            }
+
+    def _record(self, operation: str, bytes_read: int = 0, bytes_written: int = 0) -> None:
+        with self._lock:
+            self.call_counts[operation] += 1
+            self.bytes_read += bytes_read
+            self.bytes_written += bytes_written
+
+        # Sleeping outside the lock lets concurrent calls overlap like real round trips
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def _read(self, segments: list[str]) -> Any:
+        node = self.data
+        for segment in segments:
+            node = _child_of(node, segment)
+            if node is None:
+                return None
+        return node
+
+    def _write(self, segments: list[str], value: Any) -> None:
+        value = _normalize(deepcopy(value))
+        if not segments:
+            self.data = value or {}
+            return
+
+        parents = [self.data]
+        for segment in segments[:-1]:
+            node = parents[-1]
+            child = _child_of(node, segment)
+            if not isinstance(child, (dict, list)):
+                if value is None:
+                    return
+                child = {}
+                self._set_child(node, segment, child)
+            parents.append(child)
+
+        self._set_child(parents[-1], segments[-1], value)
+
+        # Removing the last child of a node removes the node as well
+        for depth in range(len(parents) - 1, 0, -1):
+            if _normalize(parents[depth]) is not None:
+                break
+            self._set_child(parents[depth - 1], segments[depth - 1], None)
+
+    @staticmethod
+    def _set_child(node: Any, segment: str, value: Any) -> None:
+        if isinstance(node, list) and segment.isdigit() and int(segment) < len(node):
+            node[int(segment)] = value
+            return
+        if isinstance(node, list):
+            raise ValueError('Writing a new key under an array node is not supported by the local database')
+        if value is None:
+            node.pop(segment, None)
+        else:
+            node[segment] = value
+
+
+class LocalQuery:
+    def __init__(self, ref: 'LocalReference', order_by: str, child_path: Optional[str] = None) -> None:
+        self._ref = ref
+        self._order_by = order_by
+        self._child_path = _split_path(child_path) if child_path else []
+        self._start_at: Optional[tuple] = None
+        self._end_at: Optional[tuple] = None
+        self._limit_to_first: Optional[int] = None
+        self._limit_to_last: Optional[int] = None
+
+    def start_at(self, start: Any) -> 'LocalQuery':
+        self._start_at = self._bound(start)
+        return self
+
+    def end_at(self, end: Any) -> 'LocalQuery':
+        self._end_at = self._bound(end)
+        return self
+
+    def equal_to(self, value: Any) -> 'LocalQuery':
+        self._start_at = self._end_at = self._bound(value)
+        return self
+
+    def limit_to_first(self, limit: int) -> 'LocalQuery':
+        self._limit_to_first = limit
+        return self
+
+    def limit_to_last(self, limit: int) -> 'LocalQuery':
+        self._limit_to_last = limit
+        return self
+
+    def _bound(self, value: Any) -> tuple:
+        if value is None:
+            raise ValueError('Query bound must not be None')
+        return _key_sort_key(value) if self._order_by == 'key' else _value_sort_key(value)
+
+    def _sort_key(self, key: str, value: Any) -> tuple:
+        if self._order_by == 'key':
+            return _key_sort_key(key)
+
+        if self._order_by == 'child':
+            for segment in self._child_path:
+                value = _child_of(value, segment)
+        return _value_sort_key(value)
+
+    def get(self) -> Optional[OrderedDict]:
+        database = self._ref.database
+        with database._lock:
+            node = database._read(self._ref.segments)
+            if isinstance(node, list):
+                node = {str(index): child for index, child in enumerate(node) if child is not None}
+            if not isinstance(node, dict):
+                result = None
+            else:
+                items = sorted(
+                    node.items(), key=lambda item: (self._sort_key(item[0], item[1]), _key_sort_key(item[0]))
+                )
+                items = [
+                    item
+                    for item in items
+                    if (self._start_at is None or self._sort_key(*item) >= self._start_at)
+                    and (self._end_at is None or self._sort_key(*item) <= self._end_at)
+                ]
+                if self._limit_to_first is not None:
+                    items = items[: self._limit_to_first]
+                if self._limit_to_last is not None:
+                    items = items[-self._limit_to_last :] if self._limit_to_last else []
+                result = OrderedDict(deepcopy(items)) if items else None
+
+        database._record('query', bytes_read=_payload_bytes(result))
+        return result
+
+
+class LocalReference:
+    def __init__(self, database: LocalDatabase, segments: list[str]) -> None:
+        self.database = database
+        self.segments = segments
+
+    @property
+    def key(self) -> Optional[str]:
+        return self.segments[-1] if self.segments else None
+
+    @property
+    def path(self) -> str:
+        return '/' + '/'.join(self.segments)
+
+    @property
+    def parent(self) -> Optional['LocalReference']:
+        return LocalReference(self.database, self.segments[:-1]) if self.segments else None
+
+    def child(self, path: str) -> 'LocalReference':
+        if not path or not isinstance(path, str):
+            raise ValueError(f'Invalid path argument: "{path}"')
+        return LocalReference(self.database, self.segments + _split_path(path))
+
+    def get(self, etag: bool = False, shallow: bool = False) -> Any:
+        with self.database._lock:
+            value = deepcopy(self.database._read(self.segments))
+
+        if shallow and isinstance(value, dict):
+            value = {key: True if isinstance(child, (dict, list)) else child for key, child in value.items()}
+        self.database._record('get', bytes_read=_payload_bytes(value))
+
+        if etag:
+            return value, hashlib.md5(json.dumps(value, sort_keys=True).encode()).hexdigest()
+        return value
+
+    def set(self, value: Any) -> None:
+        if value is None:
+            raise ValueError('Value must not be None.')
+        with self.database._lock:
+            self.database._write(self.segments, value)
+        self.database._record('set', bytes_written=_payload_bytes(value))
+
+    def update(self, value: dict[str, Any]) -> None:
+        if not value or not isinstance(value, dict):
+            raise ValueError('Value argument must be a non-empty dictionary.')
+        if None in value.keys():
+            raise ValueError('Dictionary must not contain None keys.')
+
+        with self.database._lock:
+            for path, child in value.items():
+                self.database._write(self.segments + _split_path(path), child)
+        self.database._record('update', bytes_written=_payload_bytes(value))
+
+    def push(self, value: Any = '') -> 'LocalReference':
+        if value is None:
+            raise ValueError('Value must not be None.')
+
+        pushed_ref = LocalReference(self.database, self.segments + [generate_push_key()])
+        with self.database._lock:
+            self.database._write(pushed_ref.segments, value)
+        self.database._record('push', bytes_written=_payload_bytes(value))
+        return pushed_ref
+
+    def delete(self) -> None:
+        with self.database._lock:
+            self.database._write(self.segments, None)
+        self.database._record('delete')
+
+    def transaction(self, transaction_update: Callable[[Any], Any]) -> Any:
+        # The lock stands in for the server's compare-and-set retries, so the update runs exactly once
+        with self.database._lock:
+            current = deepcopy(self.database._read(self.segments))
+            new_value = transaction_update(current)
+            self.database._write(self.segments, new_value)
+        self.database._record(
+            'transaction', bytes_read=_payload_bytes(current), bytes_written=_payload_bytes(new_value)
+        )
+        return deepcopy(new_value)
+
+    def order_by_child(self, path: str) -> LocalQuery:
+        if path in ('$key', '$value', '$priority'):
+            raise ValueError(f'Illegal child path: {path}')
+        return LocalQuery(self, 'child', path)
+
+    def order_by_key(self) -> LocalQuery:
+        return LocalQuery(self, 'key')
+
+    def order_by_value(self) -> LocalQuery:
+        return LocalQuery(self, 'value')
+
+
+local_database: Optional[LocalDatabase] = None
+
+
+def create_local_root_ref() -> LocalReference:
+    global local_database
+
+    local_database = LocalDatabase.from_fixture(LOCAL_RTDB_FIXTURE)
+    return local_database.reference()
@@ -0,0 +1,50 @@
+import os
+
+from typing import Any, Iterator, Optional
+
+from chalicelib.db.stream import iter_streamed_pages
+from chalicelib.metrics import count_items
+
+
+RTDB_PAGE_SIZE = int(os.getenv('RTDB_PAGE_SIZE', '1000'))
+RTDB_READ_MODE = os.getenv('RTDB_READ_MODE', 'paged')
+
+
+def iter_child_pages(
+    ref: Any, page_size: int = RTDB_PAGE_SIZE, read_mode: Optional[str] = None
+) -> Iterator[dict[str, Any]]:
+    # `stream` reads the node in a single REST response that is parsed child by child.
+    if (read_mode or RTDB_READ_MODE) == 'stream':
+        for page in iter_streamed_pages(ref.path, page_size):
+            count_items(scanned=len(page))
+            yield page
+        return
+
+    # start_at is inclusive, so every page after the first asks for one extra child and drops the last key seen.
+    last_key = None
+
+    while True:
+        query = ref.order_by_key()
+        if last_key is None:
+            page = query.limit_to_first(page_size).get()
+        else:
+            page = query.start_at(last_key).limit_to_first(page_size + 1).get()
+            if page:
+                page.pop(last_key, None)
+
+        if not page:
+            return
+
+        count_items(scanned=len(page))
+        yield page
+
+        if len(page) < page_size:
+            return
+        last_key = next(reversed(page))
+
+
+def iter_children(
+    ref: Any, page_size: int = RTDB_PAGE_SIZE, read_mode: Optional[str] = None
+) -> Iterator[tuple[str, Any]]:
+    for page in iter_child_pages(ref, page_size=page_size, read_mode=read_mode):
+        yield from page.items()
@@ -0,0 +1,127 @@
+from typing import Any, Optional
+
+from chalicelib.constants.common import COSTUME_LIST, DELETED, DEVICES, NICKNAME, TOKEN, TOKENS
+from chalicelib.constants.db_ref_key import DB_BETA_USER_DATA, DB_USER_PUBLIC_PROFILE
+from chalicelib.db.diff import update_tree_diff
+from chalicelib.db.fetch import fetch_engine
+from chalicelib.db.pagination import iter_child_pages
+
+
+PUBLIC_PROFILE_PAGE_SIZE = 500
+
+# Fields of beta_user_data the projection is built from
+PUBLIC_PROFILE_SOURCE_FIELDS = (NICKNAME, COSTUME_LIST, DELETED, DEVICES)
+
+
+def build_public_profile(user_profile: Optional[dict[str, Any]]) -> Optional[dict[str, Any]]:
+    if not isinstance(user_profile, dict):
+        return None
+
+    devices = user_profile.get(DEVICES)
+    tokens = []
+    if isinstance(devices, dict):
+        tokens = [device[TOKEN] for device in devices.values() if isinstance(device, dict) and device.get(TOKEN)]
+
+    return {
+        NICKNAME: user_profile.get(NICKNAME),
+        COSTUME_LIST: user_profile.get(COSTUME_LIST),
+        DELETED: user_profile.get(DELETED),
+        TOKENS: tokens or None,
+    }
+
+
+def sync_user_public_profile(root_ref: Any, user_id: str, user_profile: Optional[dict[str, Any]] = None) -> None:
+    if user_profile is None:
+        user_profile = root_ref.child(DB_BETA_USER_DATA).child(user_id).get()
+
+    public_profile = build_public_profile(user_profile)
+    if public_profile is None:
+        root_ref.child(DB_USER_PUBLIC_PROFILE).child(user_id).delete()
+    else:
+        root_ref.child(DB_USER_PUBLIC_PROFILE).child(user_id).set(public_profile)
+
+
+def get_public_profile_changes(updates: dict[str, Any]) -> set[str]:
+    # User keys whose projection a committed multi-location update made stale
+    user_keys = set()
+    for path in updates:
+        segments = path.strip('/').split('/')
+        if len(segments) < 2 or segments[0] != DB_BETA_USER_DATA:
+            continue
+        if len(segments) == 2 or segments[2] in PUBLIC_PROFILE_SOURCE_FIELDS:
+            user_keys.add(segments[1])
+    return user_keys
+
+
+def _fetch_public_profile_range(public_profile_ref: Any, after_key: Optional[str], last_key: Optional[str]) -> dict:
+    # Both trees are keyed by user, so a page of users lines up with a key range of the projection
+    query = public_profile_ref.order_by_key()
+    if after_key is not None:
+        query = query.start_at(after_key)
+    if last_key is not None:
+        query = query.end_at(last_key)
+
+    public_profiles = query.get() or {}
+    public_profiles.pop(after_key, None)
+    return public_profiles
+
+
+def sync_all_user_public_profiles(root_ref: Any, page_size: int = PUBLIC_PROFILE_PAGE_SIZE) -> int:
+    # Backstop for profile fields the app writes straight to beta_user_data, only entries that differ are written
+    public_profile_ref = root_ref.child(DB_USER_PUBLIC_PROFILE)
+
+    synced_user_count = 0
+    last_key = None
+    for user_data in iter_child_pages(root_ref.child(DB_BETA_USER_DATA), page_size=page_size):
+        page_last_key = next(reversed(user_data))
+        update_tree_diff(
+            public_profile_ref,
+            _fetch_public_profile_range(public_profile_ref, last_key, page_last_key),
+            {user_key: build_public_profile(user_profile) for user_key, user_profile in user_data.items()},
+        )
+        synced_user_count += len(user_data)
+        last_key = page_last_key
+
+    # Entries past the last user belong to users that no longer exist
+    update_tree_diff(public_profile_ref, _fetch_public_profile_range(public_profile_ref, last_key, None), {})
+    return synced_user_count
+
+
+def project_user_public_profiles(root_ref: Any, user_keys: list[str]) -> dict[str, Optional[dict[str, Any]]]:
+    # Reads only the source fields of each user and writes the projections the backstop has not made yet
+    result = fetch_engine.fetch(
+        root_ref,
+        [f'{DB_BETA_USER_DATA}/{user_key}/{field}' for user_key in user_keys for field in PUBLIC_PROFILE_SOURCE_FIELDS],
+    )
+    result.raise_for_errors()
+
+    user_profiles = {user_key: {} for user_key in user_keys}
+    for path, value in result.items():
+        if value is not None:
+            _, user_key, field = path.strip('/').split('/')
+            user_profiles[user_key][field] = value
+
+    public_profiles = {
+        user_key: build_public_profile(user_profile) if user_profile else None
+        for user_key, user_profile in user_profiles.items()
+    }
+    updates = {
+        f'{DB_USER_PUBLIC_PROFILE}/{user_key}': public_profile
+        for user_key, public_profile in public_profiles.items()
+        if public_profile is not None
+    }
+    if updates:
+        root_ref.update(updates)
+    return public_profiles
+
+
+def fetch_user_public_profiles(root_ref: Any, user_keys: list[str]) -> dict[str, Optional[dict[str, Any]]]:
+    result = fetch_engine.fetch(root_ref, [f'{DB_USER_PUBLIC_PROFILE}/{user_key}' for user_key in user_keys])
+    result.raise_for_errors()
+    public_profiles = {path.rsplit('/', 1)[-1]: public_profile for path, public_profile in result.items()}
+
+    # A user who signed up since the last backstop run has no projection yet
+    missing_user_keys = [user_key for user_key, public_profile in public_profiles.items() if public_profile is None]
+    if missing_user_keys:
+        public_profiles.update(project_user_public_profiles(root_ref, missing_user_keys))
+    return public_profiles
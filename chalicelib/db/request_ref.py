@@ -0,0 +1,151 @@
+import os
+import threading
+
+from copy import deepcopy
+from typing import Any, Optional
+
+
+# Nodes with more children than this in total are not cached, copying them costs more than reading them again
+REQUEST_CACHE_MAX_NODES = int(os.getenv('REQUEST_CACHE_MAX_NODES', '5000'))
+
+
+def _exceeds_node_count(value: Any, max_nodes: int) -> bool:
+    # Stops counting at the limit, so a large node costs no more to check than a small one
+    stack = [value]
+    count = 0
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            node = node.values()
+        elif not isinstance(node, list):
+            continue
+        for child in node:
+            count += 1
+            if count > max_nodes:
+                return True
+            stack.append(child)
+    return False
+
+
+def _is_same_or_nested(path: str, other: str) -> bool:
+    return not other or path == other or path.startswith(f'{other}/')
+
+
+class RequestReadCache:
+    # Values read during one API request, keyed by path. Handlers mutate what they read,
+    # so values are copied on the way in and on the way out, and large ones are not kept at all.
+    def __init__(self, max_nodes: int = REQUEST_CACHE_MAX_NODES) -> None:
+        self.max_nodes = max_nodes
+        self._values: dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def lookup(self, path: str) -> tuple[bool, Any]:
+        with self._lock:
+            for cached_path, value in self._values.items():
+                if not _is_same_or_nested(path, cached_path):
+                    continue
+
+                relative_path = path[len(cached_path) :].strip('/')
+                for segment in relative_path.split('/') if relative_path else []:
+                    if isinstance(value, list) and segment.isdigit() and int(segment) < len(value):
+                        value = value[int(segment)]
+                    elif isinstance(value, dict):
+                        value = value.get(segment)
+                    else:
+                        value = None
+                    if value is None:
+                        break
+
+                self.hit_count += 1
+                return True, deepcopy(value)
+
+            self.miss_count += 1
+            return False, None
+
+    def store(self, path: str, value: Any) -> None:
+        if _exceeds_node_count(value, self.max_nodes):
+            return
+
+        with self._lock:
+            self._values[path] = deepcopy(value)
+
+    def invalidate(self, path: str) -> None:
+        # A write makes the written path, everything under it and every cached ancestor stale
+        with self._lock:
+            for cached_path in list(self._values):
+                if _is_same_or_nested(path, cached_path) or _is_same_or_nested(cached_path, path):
+                    del self._values[cached_path]
+
+
+class RequestReference:
+    # Wraps a firebase Reference for the duration of one API request so repeated or overlapping reads hit RTDB once.
+    # Only writes made through this wrapper invalidate the cache, a route writing through the module-level root_ref
+    # (chalicelib.db.engine) would read its own stale value back.
+    def __init__(self, ref: Any, cache: Optional[RequestReadCache] = None) -> None:
+        self._ref = ref
+        self.cache = cache or RequestReadCache()
+
+    def __getattr__(self, name: str) -> Any:
+        # Anything not wrapped here goes straight to the wrapped reference
+        return getattr(self._ref, name)
+
+    def _wrap(self, ref: Any) -> 'RequestReference':
+        return RequestReference(ref, self.cache)
+
+    @property
+    def key(self) -> Optional[str]:
+        return self._ref.key
+
+    @property
+    def path(self) -> str:
+        return self._ref.path
+
+    @property
+    def parent(self) -> Optional['RequestReference']:
+        parent = self._ref.parent
+        return self._wrap(parent) if parent is not None else None
+
+    @property
+    def _cache_path(self) -> str:
+        return self._ref.path.strip('/')
+
+    def child(self, path: str) -> 'RequestReference':
+        return self._wrap(self._ref.child(path))
+
+    def get(self, etag: bool = False, shallow: bool = False) -> Any:
+        if etag or shallow:
+            return self._ref.get(etag=etag, shallow=shallow)
+
+        found, value = self.cache.lookup(self._cache_path)
+        if found:
+            return value
+
+        value = self._ref.get()
+        self.cache.store(self._cache_path, value)
+        return value
+
+    def set(self, value: Any) -> None:
+        self._ref.set(value)
+        self.cache.invalidate(self._cache_path)
+
+    def update(self, value: dict[str, Any]) -> None:
+        self._ref.update(value)
+        for key in value:
+            self.cache.invalidate(f'{self._cache_path}/{key.strip("/")}'.strip('/'))
+
+    def delete(self) -> None:
+        self._ref.delete()
+        self.cache.invalidate(self._cache_path)
+
+    def push(self, value: Any = '') -> 'RequestReference':
+        pushed_ref = self._ref.push(value)
+        self.cache.invalidate(self._cache_path)
+        return self._wrap(pushed_ref)
+
+    def transaction(self, transaction_update: Any) -> Any:
+        try:
+            return self._ref.transaction(transaction_update)
+        finally:
+            self.cache.invalidate(self._cache_path)
@@ -0,0 +1,221 @@
+import codecs
+import json
+import os
+
+from typing import Any, Iterable, Iterator, Optional
+
+import requests
+
+from chalicelib.db.instrument import top_level_node
+from chalicelib.metrics import RTDB, path_template, record_call
+
+
+RTDB_REST_URL = os.getenv('RTDB_REST_URL')
+RTDB_STREAM_CHUNK_SIZE = int(os.getenv('RTDB_STREAM_CHUNK_SIZE', str(64 * 1024)))
+RTDB_STREAM_TIMEOUT_SEC = float(os.getenv('RTDB_STREAM_TIMEOUT_SEC', '60'))
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '0123456789+-.eE'
+
+
+class IncrementalObjectParser:
+    # Parses the top-level JSON object of a streamed response and returns each member as soon as it is complete,
+    # so only one child value is held in memory at a time.
+    def __init__(self) -> None:
+        self._buffer = ''
+        self._pos = 0
+        self._state = 'start'
+        self._key = None
+
+        self._decoder = json.JSONDecoder()
+        self._value_start = 0
+        self._retry_at = 0
+        self._final = False
+
+    def feed(self, text: str) -> list[tuple[str, Any]]:
+        self._buffer += text
+
+        items = []
+        while self._step(items):
+            pass
+
+        cut = self._value_start if self._state == 'value' else self._pos
+        self._buffer = self._buffer[cut:]
+        self._pos -= cut
+        self._value_start -= cut
+        self._retry_at -= cut
+        return items
+
+    def close(self) -> list[tuple[str, Any]]:
+        self._final = True
+        self._retry_at = 0
+
+        items = []
+        while self._step(items):
+            pass
+
+        if self._state == 'value':
+            self._decoder.raw_decode(self._buffer, self._value_start)
+        if self._state != 'done':
+            raise ValueError('Truncated JSON object in the streamed response')
+        return items
+
+    def _skip_whitespace(self) -> bool:
+        while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+            self._pos += 1
+        return self._pos < len(self._buffer)
+
+    def _step(self, items: list[tuple[str, Any]]) -> bool:
+        if self._state == 'done':
+            return False
+
+        if self._state == 'value':
+            return self._scan_value(items)
+
+        if not self._skip_whitespace():
+            return False
+        char = self._buffer[self._pos]
+
+        if self._state == 'start':
+            if char == '{':
+                self._pos += 1
+                self._state = 'first_key'
+            elif self._buffer.startswith('null', self._pos):
+                self._pos += 4
+                self._state = 'done'
+            elif len(self._buffer) - self._pos < 4 and 'null'.startswith(self._buffer[self._pos :]):
+                return False
+            else:
+                raise ValueError('The streamed response is not a JSON object')
+            return True
+
+        if self._state == 'first_key' and char == '}':
+            self._pos += 1
+            self._state = 'done'
+            return True
+
+        if self._state in ('first_key', 'key'):
+            if char != '"':
+                raise ValueError(f'Expected an object key at offset {self._pos}')
+            try:
+                self._key, self._pos = json.decoder.scanstring(self._buffer, self._pos + 1)
+            except json.JSONDecodeError:
+                return False
+            self._state = 'colon'
+            return True
+
+        if self._state == 'colon':
+            if char != ':':
+                raise ValueError(f'Expected ":" at offset {self._pos}')
+            self._pos += 1
+            self._state = 'value_start'
+            return True
+
+        if self._state == 'value_start':
+            self._value_start = self._pos
+            self._retry_at = 0
+            self._state = 'value'
+            return True
+
+        if self._state == 'separator':
+            if char == ',':
+                self._state = 'key'
+            elif char == '}':
+                self._state = 'done'
+            else:
+                raise ValueError(f'Expected "," or "}}" at offset {self._pos}')
+            self._pos += 1
+            return True
+
+        return False
+
+    def _scan_value(self, items: list[tuple[str, Any]]) -> bool:
+        # A child that is still arriving is retried only once its buffered part has doubled,
+        # which keeps the total decoding work linear in the response size.
+        if len(self._buffer) < self._retry_at:
+            return False
+
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._value_start)
+        except json.JSONDecodeError:
+            self._retry_at = len(self._buffer) + max(len(self._buffer) - self._value_start, 1)
+            return False
+
+        # A number is only complete once the character after it has arrived, e.g. "-2." must not decode as -2.
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and not self._final:
+            if end == len(self._buffer) or self._buffer[end] in _NUMBER_CHARS:
+                self._retry_at = len(self._buffer) + 1
+                return False
+
+        items.append((self._key, value))
+        self._pos = end
+        self._state = 'separator'
+        return True
+
+
+def iter_object_items(chunks: Iterable[bytes]) -> Iterator[tuple[str, Any]]:
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    parser = IncrementalObjectParser()
+
+    for chunk in chunks:
+        yield from parser.feed(decoder.decode(chunk))
+    yield from parser.feed(decoder.decode(b'', final=True))
+    yield from parser.close()
+
+
+def _default_rest_url() -> str:
+    if RTDB_REST_URL:
+        return RTDB_REST_URL
+
+    import firebase_admin
+
+    return firebase_admin.get_app().options.get('databaseURL')
+
+
+def _default_access_token() -> Optional[str]:
+    if RTDB_REST_URL:
+        return None
+
+    import firebase_admin
+
+    return firebase_admin.get_app().credential.get_access_token().access_token
+
+
+def stream_children(
+    path: str,
+    base_url: Optional[str] = None,
+    access_token: Optional[str] = None,
+    chunk_size: int = RTDB_STREAM_CHUNK_SIZE,
+    timeout: float = RTDB_STREAM_TIMEOUT_SEC,
+) -> Iterator[tuple[str, Any]]:
+    base_url = base_url or _default_rest_url()
+    if access_token is None:
+        access_token = _default_access_token()
+
+    url = f'{base_url.rstrip("/")}/{path.strip("/")}.json'
+    headers = {'Authorization': f'Bearer {access_token}'} if access_token else {}
+
+    with record_call(RTDB, 'stream', path_template(path)) as fields, requests.get(
+        url, headers=headers, stream=True, timeout=timeout
+    ) as response:
+        response.raise_for_status()
+        fields.update(Node=top_level_node(path), BytesRead=0)
+
+        def counted_chunks() -> Iterator[bytes]:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                fields['BytesRead'] += len(chunk)
+                yield chunk
+
+        yield from iter_object_items(counted_chunks())
+
+
+def iter_streamed_pages(path: str, page_size: int, **kwargs) -> Iterator[dict[str, Any]]:
+    page = {}
+    for key, value in stream_children(path, **kwargs):
+        page[key] = value
+        if len(page) >= page_size:
+            yield page
+            page = {}
+
+    if page:
+        yield page
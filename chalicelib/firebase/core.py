@@ -5,6 +5,7 @@ from datetime import datetime
 from firebase_admin import messaging
 from firebase_admin._messaging_utils import UnregisteredError
 
+from chalicelib.metrics import FCM, record_call
 from chalicelib.slack_bot import post_slack_message
 
 
@@ -35,7 +36,8 @@ def send_fcm(token: str, title: str, body: str, user_id: str, category: str = No
             token=token,
         )
 
-        messaging.send(message)
+        with record_call(FCM, 'send'):
+            messaging.send(message)
 
     except UnregisteredError:
         return
@@ -57,7 +59,8 @@ def send_fcm_to_topic(topic: str, title: str, body: str) -> None:
             ),
             topic=topic,
         )
-        messaging.send(message)
+        with record_call(FCM, 'send_to_topic'):
+            messaging.send(message)
 
     except Exception as e:
         post_slack_message(
@@ -92,7 +95,8 @@ def send_fcm_multicast(
                 tokens=token_chunk,
             )
 
-            batch_response = messaging.send_each_for_multicast(message)
+            with record_call(FCM, 'send_each_for_multicast'):
+                batch_response = messaging.send_each_for_multicast(message)
 
             if batch_response.failure_count > 0:
                 responses = batch_response.responses
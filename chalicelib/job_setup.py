@@ -0,0 +1,139 @@
+import functools
+import os
+import resource
+
+from statistics import median
+from typing import Any
+
+from chalicelib.constants.db_ref_key import DB_JOB_RUN_LEDGER
+from chalicelib.core import format_utc_timestamp
+from chalicelib.db.engine import root_ref
+from chalicelib.metrics import (
+    RTDB_READ_BUDGET_BYTES,
+    RTDB_WRITE_BUDGET_BYTES,
+    CallRecorder,
+    current_recorder,
+    emit_metrics,
+)
+from chalicelib.profiling import profiled, should_profile
+from chalicelib.slack_bot import post_slack_message
+
+
+JOB_BASELINE_RUN_COUNT = int(os.getenv('JOB_BASELINE_RUN_COUNT', '10'))
+JOB_BASELINE_MIN_RUN_COUNT = int(os.getenv('JOB_BASELINE_MIN_RUN_COUNT', '3'))
+JOB_LEDGER_MAX_RUN_COUNT = int(os.getenv('JOB_LEDGER_MAX_RUN_COUNT', '100'))
+JOB_REGRESSION_FACTOR = float(os.getenv('JOB_REGRESSION_FACTOR', '1.5'))
+JOB_TIMEOUT_SEC = int(os.getenv('JOB_TIMEOUT_SEC', '900'))
+JOB_TIMEOUT_WARNING_RATIO = float(os.getenv('JOB_TIMEOUT_WARNING_RATIO', '0.5'))
+
+SUCCEEDED = 'Succeeded'
+FAILED = 'Failed'
+
+# Run values compared with the baseline, and the value below which a run is too small to alert on
+REGRESSION_FLOORS = {
+    'DurationMs': 10 * 1000,
+    'ItemsScanned': 1000,
+    'BytesRead': 1024 * 1024,
+    'BytesWritten': 256 * 1024,
+    'PeakMemoryMb': 128,
+}
+
+
+def build_run_record(recorder: CallRecorder, status: str) -> dict[str, Any]:
+    node_bytes = recorder.node_bytes().values()
+    return {
+        'FinishedTimeUtc': format_utc_timestamp(),
+        'Status': status,
+        'DurationMs': round(recorder.elapsed_ms),
+        'ItemsScanned': recorder.items_scanned,
+        'ItemsChanged': recorder.items_changed,
+        'BytesRead': sum(node['BytesRead'] for node in node_bytes),
+        'BytesWritten': sum(node['BytesWritten'] for node in node_bytes),
+        # Peak of the whole container, which warm starts carry over from earlier runs
+        'PeakMemoryMb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+    }
+
+
+def find_regressions(run: dict[str, Any], baseline_runs: list[dict[str, Any]]) -> list[str]:
+    regressions = []
+
+    if run['DurationMs'] > JOB_TIMEOUT_SEC * 1000 * JOB_TIMEOUT_WARNING_RATIO:
+        regressions.append(f'DurationMs {run["DurationMs"]} is over {JOB_TIMEOUT_WARNING_RATIO:.0%} of the timeout')
+
+    if len(baseline_runs) < JOB_BASELINE_MIN_RUN_COUNT:
+        return regressions
+
+    for metric, floor in REGRESSION_FLOORS.items():
+        baseline = median(baseline_run.get(metric, 0) for baseline_run in baseline_runs)
+        if run[metric] >= floor and run[metric] > baseline * JOB_REGRESSION_FACTOR:
+            regressions.append(
+                f'{metric} {run[metric]} vs baseline {baseline:.0f} (x{run[metric] / max(baseline, 1):.1f})'
+            )
+
+    return regressions
+
+
+def record_job_run(job_name: str, run: dict[str, Any]) -> None:
+    job_ledger_ref = root_ref.child(DB_JOB_RUN_LEDGER).child(job_name)
+
+    # Push keys sort by time, so the last keys are the most recent runs
+    recent_runs = job_ledger_ref.order_by_key().limit_to_last(JOB_BASELINE_RUN_COUNT).get() or {}
+    baseline_runs = [recent_run for recent_run in recent_runs.values() if recent_run.get('Status') == SUCCEEDED]
+
+    job_ledger_ref.push(run)
+
+    # Only the most recent runs are kept, the baseline never looks further back
+    run_keys = sorted(job_ledger_ref.get(shallow=True) or {})
+    if len(run_keys) > JOB_LEDGER_MAX_RUN_COUNT:
+        job_ledger_ref.update({run_key: None for run_key in run_keys[:-JOB_LEDGER_MAX_RUN_COUNT]})
+
+    # A failed run is recorded but neither compared nor used as a baseline
+    if run['Status'] != SUCCEEDED:
+        return
+
+    regressions = find_regressions(run, baseline_runs)
+    if regressions:
+        post_slack_message(
+            channel_id=os.getenv('SLACK_DEV_CHANNEL_ID'),
+            token=os.getenv('SLACK_TOKEN_SERVER'),
+            text=f'{job_name} Regression ⚠️\n\n```' + '\n'.join(regressions) + '```',
+        )
+
+
+def job_set_up(
+    read_budget_bytes: int = RTDB_READ_BUDGET_BYTES,
+    write_budget_bytes: int = RTDB_WRITE_BUDGET_BYTES,
+    ledger: bool = True,
+):
+    # Goes under @module.schedule / @module.lambda_function, so the registered handler keeps the function name
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = CallRecorder()
+            recorder_token = current_recorder.set(recorder)
+            status = FAILED
+
+            try:
+                with profiled(func.__name__, should_profile()):
+                    result = func(*args, **kwargs)
+                status = FAILED if recorder.errors else SUCCEEDED
+                return result
+            finally:
+                emit_metrics(
+                    recorder,
+                    func.__name__,
+                    read_budget_bytes=read_budget_bytes,
+                    write_budget_bytes=write_budget_bytes,
+                )
+                current_recorder.reset(recorder_token)
+
+                # The ledger must never fail the job it describes
+                if ledger:
+                    try:
+                        record_job_run(func.__name__, build_run_record(recorder, status))
+                    except Exception as e:
+                        print(e)
+
+        return wrapper
+
+    return decorator
@@ -17,12 +17,14 @@ from chalicelib.constants.common import (
 from chalicelib.constants.db_ref_key import DB_BETA_USER_DATA
 from chalicelib.db.engine import root_ref
 from chalicelib.firebase.core import send_fcm, send_fcm_multicast, send_fcm_to_topic
+from chalicelib.job_setup import job_set_up
 
 
 default_fcm_module = Blueprint(__name__)
 
 
 @default_fcm_module.lambda_function()
+@job_set_up(ledger=False)
 def send_fcm_msg_func(event, context) -> None:
     if FCM_METHOD not in event:
         return 'Invalid fcm method'
@@ -23,6 +23,8 @@ from chalicelib.constants.common import (
 from chalicelib.constants.db_ref_key import LIVE_SCHEDULE_INFO
 from chalicelib.db.engine import root_ref
 from chalicelib.firebase.core import create_fcm_datetime_topic, send_fcm_to_topic
+from chalicelib.job_setup import job_set_up
+from chalicelib.metrics import report_failure
 
 
 live_schedule_fcm_module = Blueprint(__name__)
@@ -240,6 +242,7 @@ class LiveScheduleFCMHandler:
 
 
 @live_schedule_fcm_module.schedule('cron(0 15 * * ? *)')
+@job_set_up()
 def schedule_fcm_msg(event) -> None:
     client = None
 
@@ -255,6 +258,7 @@ def schedule_fcm_msg(event) -> None:
 
     except Exception as e:
         print(e)
+        report_failure(e)
 
     finally:
         if client is not None:
@@ -262,9 +266,11 @@ def schedule_fcm_msg(event) -> None:
 
 
 @live_schedule_fcm_module.lambda_function()
+@job_set_up(ledger=False)
 def send_fcm_msg(event, context) -> None:
     try:
         send_fcm_to_topic(topic=event['topic'], title=event['title'], body=event['body'])
 
     except Exception as e:
         print(e)
+        report_failure(e)
@@ -7,6 +7,7 @@ from chalice import Blueprint
 from mixpanel import Mixpanel
 
 from chalicelib.db.engine import root_ref
+from chalicelib.db.pagination import iter_children
 from chalicelib.constants.common import (
     BIRTHDAY,
     DELETED,
@@ -29,8 +30,11 @@ from chalicelib.constants.db_ref_key import (
     DB_DELETED_USER_DATA,
     DB_BETA_USER_EVENT_DATA,
     DB_BETA_USER_FLOOR_DATA,
+    DB_INAPP_CHALLENGE_BATCH_DATA,
 )
-from chalicelib.core import check_subscribing_user, format_utc_timestamp_to_datetime
+from chalicelib.core import async_fetch_paths, check_subscribing_user, format_utc_timestamp_to_datetime
+from chalicelib.job_setup import job_set_up
+from chalicelib.metrics import MIXPANEL, record_call
 
 
 mixpanel_migration_module = Blueprint(__name__)
@@ -42,18 +46,13 @@ BMI = 'BMI'
 
 mp = Mixpanel(PROJECT_TOKEN)
 
-user_data = root_ref.child(DB_BETA_USER_DATA).get()
-deleted_user_data = root_ref.child(DB_DELETED_USER_DATA).get()
-challenge_data = root_ref.child(DB_BETA_USER_EVENT_DATA).get()
-inapp_challenge_info = root_ref.child('inapp_challenge_batch_data').get()
-user_floor_data = root_ref.child(DB_BETA_USER_FLOOR_DATA).get()
-
 
 def flush(payload):
     url = "https://api.mixpanel.com/engage#profile-batch-update"
     headers = {"accept": "text/plain", "content-type": "application/json"}
 
-    response = requests.post(url, json=payload, headers=headers)
+    with record_call(MIXPANEL, 'profile_batch_update'):
+        response = requests.post(url, json=payload, headers=headers)
 
     print(response.text)
     return response.text
@@ -77,14 +76,24 @@ def reformat_birthdate(date_str):
 
 
 @mixpanel_migration_module.schedule('cron(5 15 * * ? *)')
+@job_set_up()
 def schedule_user_profile_migration(event) -> None:
+    fetched_data = async_fetch_paths(
+        root_ref,
+        [DB_DELETED_USER_DATA, DB_BETA_USER_EVENT_DATA, DB_INAPP_CHALLENGE_BATCH_DATA, DB_BETA_USER_FLOOR_DATA],
+    )
+    deleted_user_data = fetched_data[DB_DELETED_USER_DATA] or {}
+    challenge_data = fetched_data[DB_BETA_USER_EVENT_DATA] or {}
+    inapp_challenge_info = fetched_data[DB_INAPP_CHALLENGE_BATCH_DATA] or {}
+    user_floor_data = fetched_data[DB_BETA_USER_FLOOR_DATA] or {}
+
     sent_count = 0
     payload = []
     active_user_count = 0
     subscribing_user_count = 0
     no_nickname_count = 0
 
-    for user_id, user_info in user_data.items():
+    for user_id, user_info in iter_children(root_ref.child(DB_BETA_USER_DATA)):
         if user_info.get(DELETED):
             user_info = deleted_user_data.get(user_id)
             if not user_info:
@@ -161,4 +170,5 @@ def schedule_user_profile_migration(event) -> None:
         print(sent_count)
 
     prop = {'ActiveUserCount': active_user_count, 'SubscribingUserCount': subscribing_user_count}
-    mp.track(distinct_id='FIVA-Data', event_name='FivaDailyData', properties=prop)
+    with record_call(MIXPANEL, 'track'):
+        mp.track(distinct_id='FIVA-Data', event_name='FivaDailyData', properties=prop)
@@ -1,10 +1,14 @@
 import os
+from copy import deepcopy
 
 from chalice import Blueprint
 
-from chalicelib.db.engine import root_ref
 from chalicelib.constants.common import CONTENT_KEY, NICKNAME
 from chalicelib.constants.db_ref_key import DB_CONTENT_FEEDBACK, DB_CONTENT_INFO
+from chalicelib.db.diff import update_tree_diff
+from chalicelib.db.engine import root_ref
+from chalicelib.job_setup import job_set_up
+from chalicelib.metrics import count_items
 from chalicelib.slack_bot import post_slack_message
 
 
@@ -14,11 +18,14 @@ SENT = 'Sent'
 
 
 @fiva_slack_module.schedule('cron(40 * * * ? *)')
+@job_set_up()
 def schedule_content_feedback_alert(event) -> None:
     content_feedback_ref = root_ref.child(DB_CONTENT_FEEDBACK)
     content_info = root_ref.child(DB_CONTENT_INFO).get()
     teacher_info = root_ref.child('teacher_info').get()
     content_feedback = content_feedback_ref.get()
+    original_content_feedback = deepcopy(content_feedback)
+    count_items(scanned=len(content_feedback))
 
     for feedback_info in content_feedback.values():
         nickname = feedback_info.get(NICKNAME)
@@ -73,4 +80,4 @@ def schedule_content_feedback_alert(event) -> None:
 
             feedback_info[SENT] = True
 
-    content_feedback_ref.update(content_feedback)
+    update_tree_diff(content_feedback_ref, original_content_feedback, content_feedback)
@@ -0,0 +1,39 @@
+import os
+
+from chalice import Blueprint, Rate
+
+from chalicelib.db.engine import root_ref
+from chalicelib.db.public_profile import sync_all_user_public_profiles
+from chalicelib.job_setup import job_set_up
+from chalicelib.metrics import report_failure
+from chalicelib.slack_bot import post_slack_message
+
+
+user_public_profile_module = Blueprint(__name__)
+
+# The app writes profile fields straight to beta_user_data, so nickname, costume, deletion and token changes
+# reach the projection on this run. Users without a projection yet are read from beta_user_data on demand.
+PUBLIC_PROFILE_SYNC_MINUTES = int(os.getenv('PUBLIC_PROFILE_SYNC_MINUTES', '15'))
+
+
+@user_public_profile_module.lambda_function()
+@job_set_up(ledger=False)
+def backfill_user_public_profile(event, context) -> dict:
+    synced_user_count = sync_all_user_public_profiles(root_ref)
+    return {'SyncedUserCount': synced_user_count}
+
+
+@user_public_profile_module.schedule(Rate(PUBLIC_PROFILE_SYNC_MINUTES, Rate.MINUTES))
+@job_set_up()
+def schedule_user_public_profile_sync(event) -> None:
+    try:
+        sync_all_user_public_profiles(root_ref)
+
+    except Exception as e:
+        post_slack_message(
+            channel_id=os.getenv('SLACK_DEV_CHANNEL_ID'),
+            token=os.getenv('SLACK_TOKEN_SERVER'),
+            text=f'User Public Profile Sync Failed 🚨\n\nError Message:\n```ERROR: {e}```',
+        )
+        print(e)
+        report_failure(e)
@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+
+from bisect import bisect_left
+from typing import Any, Optional
+
+from chalicelib.constants.common import (
+    FULL,
+    GAME_OVER_TIME_UTC,
+    HALF,
+    PAGE_COUNT,
+    PAGE_SIZE,
+    RANK,
+    UPDATED_TIME_UTC,
+    USER_COUNT,
+    USER_KEY,
+    USER_LIST,
+    WEEK_START_TIME_UTC,
+)
+from chalicelib.constants.db_ref_key import DB_GAME_RANkING_CURRENT_WEEK, DB_GAME_RANkING_CURRENT_WEEK_PAGES
+from chalicelib.core import format_utc_timestamp_to_datetime
+
+
+LEADERBOARD_CHECK_SEC = int(os.getenv('LEADERBOARD_CHECK_SEC', '30'))
+LEADERBOARD_HEAD_SIZE = int(os.getenv('LEADERBOARD_HEAD_SIZE', '20'))
+LEADERBOARD_PAGE_SIZE = int(os.getenv('LEADERBOARD_PAGE_SIZE', '100'))
+LEADERBOARD_READ_ATTEMPTS = 3
+
+
+def get_game_score(log: dict) -> float:
+    return log[FULL] + (log[HALF] * 0.5)
+
+
+def leaderboard_key(entry: dict) -> tuple:
+    # Ranking order: higher score first, then the earlier play, the user key only keeps equal plays apart
+    return (
+        -get_game_score(entry),
+        format_utc_timestamp_to_datetime(entry[GAME_OVER_TIME_UTC]),
+        entry[USER_KEY],
+    )
+
+
+def _as_list(value: Any) -> list:
+    # RTDB hands back a list with holes as a dict
+    if isinstance(value, dict):
+        return [value[key] for key in sorted(value, key=int)]
+    return value or []
+
+
+def split_ranking(ranking_data: dict[str, Any], head_size: int, page_size: int) -> tuple[dict, list[list[dict]]]:
+    # The head keeps the top `head_size` entries and the count, ranks after it go into pages of `page_size`.
+    # A client reads the head alone and fetches page (rank - len(head) - 1) // PageSize only when it scrolls there.
+    user_list = ranking_data.get(USER_LIST) or []
+    rest = user_list[head_size:]
+    pages = [rest[i : i + page_size] for i in range(0, len(rest), page_size)]
+
+    head = {
+        **ranking_data,
+        USER_LIST: user_list[:head_size],
+        USER_COUNT: len(user_list),
+        PAGE_SIZE: page_size,
+        PAGE_COUNT: len(pages),
+    }
+    return head, pages
+
+
+def join_ranking(head: dict[str, Any], pages: Any) -> dict[str, Any]:
+    user_list = list(_as_list(head.get(USER_LIST)))
+    for page in _as_list(pages):
+        user_list.extend(_as_list(page))
+
+    ranking_data = {key: value for key, value in head.items() if key not in (PAGE_COUNT, PAGE_SIZE)}
+    ranking_data[USER_LIST] = user_list
+    return ranking_data
+
+
+def load_ranking_data(root_ref: Any, game_name: str) -> dict[str, Any]:
+    ranking_ref = root_ref.child(DB_GAME_RANkING_CURRENT_WEEK).child(game_name)
+    pages_ref = root_ref.child(DB_GAME_RANkING_CURRENT_WEEK_PAGES).child(game_name)
+
+    # Head and pages are written in one update but read in two, a ranking written in between changes UpdatedTimeUtc
+    for _ in range(LEADERBOARD_READ_ATTEMPTS):
+        head = ranking_ref.get() or {}
+        if not head.get(PAGE_COUNT):
+            return join_ranking(head, None)
+
+        pages = pages_ref.get()
+        if ranking_ref.child(UPDATED_TIME_UTC).get() == head.get(UPDATED_TIME_UTC):
+            break
+    return join_ranking(head, pages)
+
+
+class Leaderboard:
+    # The current week's ranking as a sorted array, so a user's rank is one bisect instead of a list download
+    def __init__(self, ranking_data: dict[str, Any]) -> None:
+        self.updated_time_utc = ranking_data.get(UPDATED_TIME_UTC)
+        self.week_start_time_utc = ranking_data.get(WEEK_START_TIME_UTC)
+
+        user_list = _as_list(ranking_data.get(USER_LIST))
+        self._entries = sorted((entry for entry in user_list if entry), key=leaderboard_key)
+        self._keys = [leaderboard_key(entry) for entry in self._entries]
+        # Equal plays were ranked in scan order, the stored rank follows the order bisect sees
+        for index, entry in enumerate(self._entries):
+            entry[RANK] = index + 1
+        self._user_keys = {entry[USER_KEY]: key for entry, key in zip(self._entries, self._keys)}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rank(self, user_key: str) -> Optional[int]:
+        key = self._user_keys.get(user_key)
+        if key is None:
+            return None
+        return bisect_left(self._keys, key) + 1
+
+    def entry(self, user_key: str) -> Optional[dict]:
+        rank = self.rank(user_key)
+        return self._entries[rank - 1] if rank else None
+
+    def top(self, limit: int) -> list[dict]:
+        return self._entries[:limit]
+
+
+class LeaderboardCache:
+    # Keeps one leaderboard per game across invocations of a warm container.
+    # The ranking's UpdatedTimeUtc is checked at most every `check_interval` seconds and a change rebuilds it.
+    def __init__(self, check_interval: int = LEADERBOARD_CHECK_SEC) -> None:
+        self.check_interval = check_interval
+
+        self._leaderboards: dict[str, Leaderboard] = {}
+        self._checked_at: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, root_ref: Any, game_name: str) -> Leaderboard:
+        now = time.monotonic()
+        with self._lock:
+            leaderboard = self._leaderboards.get(game_name)
+            checked_at = self._checked_at.get(game_name)
+        if leaderboard is not None and now - checked_at < self.check_interval:
+            return leaderboard
+
+        updated_time_utc = root_ref.child(DB_GAME_RANkING_CURRENT_WEEK).child(game_name).child(UPDATED_TIME_UTC).get()
+        if leaderboard is None or updated_time_utc != leaderboard.updated_time_utc:
+            leaderboard = Leaderboard(load_ranking_data(root_ref, game_name))
+
+        with self._lock:
+            self._leaderboards[game_name] = leaderboard
+            self._checked_at[game_name] = now
+        return leaderboard
+
+    def invalidate(self, game_name: str = None) -> None:
+        with self._lock:
+            if game_name is None:
+                self._leaderboards.clear()
+                self._checked_at.clear()
+            else:
+                self._leaderboards.pop(game_name, None)
+                self._checked_at.pop(game_name, None)
+
+
+leaderboard_cache = LeaderboardCache()
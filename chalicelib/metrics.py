@@ -0,0 +1,215 @@
+import json
+import os
+import threading
+import time
+
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging import getLogger
+from typing import Any, Iterator, Optional
+
+from chalicelib.constants import common, db_ref_key
+
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_NAMESPACE = os.getenv('METRICS_NAMESPACE', 'FIVA')
+
+# Per-invocation budgets for RTDB traffic, 0 turns the warning off
+RTDB_READ_BUDGET_BYTES = int(os.getenv('RTDB_READ_BUDGET_BYTES', str(10 * 1024 * 1024)))
+RTDB_WRITE_BUDGET_BYTES = int(os.getenv('RTDB_WRITE_BUDGET_BYTES', str(1024 * 1024)))
+
+RTDB = 'RTDB'
+KAKAO = 'Kakao'
+SLACK = 'Slack'
+MIXPANEL = 'Mixpanel'
+EVENT_BRIDGE = 'EventBridge'
+FCM = 'FCM'
+
+logger = getLogger(__name__)
+
+# Node names that are part of the schema. Every other path segment is a user id, date or push key.
+_KNOWN_SEGMENTS = {
+    value
+    for module in (common, db_ref_key)
+    for name, value in vars(module).items()
+    if name.isupper() and isinstance(value, str) and value and '/' not in value
+}
+
+
+def path_template(path: str) -> str:
+    segments = [segment for segment in path.split('/') if segment]
+    if not segments:
+        return '/'
+
+    return '/'.join([segments[0]] + [segment if segment in _KNOWN_SEGMENTS else '{key}' for segment in segments[1:]])
+
+
+class CallRecorder:
+    # Collects the dependency calls of one invocation. RTDB reads can come from the fetch engine's worker threads.
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self.calls: list[dict[str, Any]] = []
+        self.items_scanned = 0
+        self.items_changed = 0
+        self.errors: list[BaseException] = []
+        self._lock = threading.Lock()
+
+    def add(self, dependency: str, operation: str, target: str, duration_ms: float, **fields: Any) -> None:
+        with self._lock:
+            self.calls.append(
+                {
+                    'Dependency': dependency,
+                    'Operation': operation,
+                    'Target': target,
+                    'DurationMs': duration_ms,
+                    **fields,
+                }
+            )
+
+    @contextmanager
+    def record(self, dependency: str, operation: str, target: str = '') -> Iterator[dict[str, Any]]:
+        fields: dict[str, Any] = {}
+        start = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            self.add(dependency, operation, target, (time.perf_counter() - start) * 1000, **fields)
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def breakdown(self) -> dict[tuple[str, str, str], dict[str, Any]]:
+        grouped: dict[tuple[str, str, str], dict[str, Any]] = defaultdict(lambda: {'DurationMs': [], 'Count': 0})
+        with self._lock:
+            for call in self.calls:
+                group = grouped[(call['Dependency'], call['Operation'], call['Target'])]
+                group['DurationMs'].append(round(call['DurationMs'], 2))
+                group['Count'] += 1
+        return dict(grouped)
+
+    def node_bytes(self) -> dict[str, dict[str, int]]:
+        nodes: dict[str, dict[str, int]] = defaultdict(lambda: {'BytesRead': 0, 'BytesWritten': 0})
+        with self._lock:
+            for call in self.calls:
+                if 'NodeBytesWritten' in call:
+                    for node, bytes_written in call['NodeBytesWritten'].items():
+                        nodes[node]['BytesWritten'] += bytes_written
+                elif 'Node' in call:
+                    nodes[call['Node']]['BytesRead'] += call.get('BytesRead', 0)
+                    nodes[call['Node']]['BytesWritten'] += call.get('BytesWritten', 0)
+        return dict(nodes)
+
+
+current_recorder: ContextVar[Optional[CallRecorder]] = ContextVar('current_recorder', default=None)
+
+
+@contextmanager
+def record_call(dependency: str, operation: str, target: str = '') -> Iterator[dict[str, Any]]:
+    # Times an external call for the invocation in progress, and does nothing outside of one
+    recorder = current_recorder.get()
+    if recorder is None:
+        yield {}
+        return
+
+    with recorder.record(dependency, operation, target) as fields:
+        yield fields
+
+
+def count_items(scanned: int = 0, changed: int = 0) -> None:
+    # Children a job walked through and paths it wrote, for the scheduled job run ledger
+    recorder = current_recorder.get()
+    if recorder is None:
+        return
+
+    with recorder._lock:
+        recorder.items_scanned += scanned
+        recorder.items_changed += changed
+
+
+def report_failure(error: BaseException) -> None:
+    # Jobs catch their errors to post them on Slack, this still marks the run as failed in the job run ledger
+    recorder = current_recorder.get()
+    if recorder is None:
+        return
+
+    with recorder._lock:
+        recorder.errors.append(error)
+
+
+def _emf_line(dimensions: dict[str, str], metrics: dict[str, tuple[Any, str]]) -> str:
+    return json.dumps(
+        {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [
+                    {
+                        'Namespace': METRICS_NAMESPACE,
+                        'Dimensions': [list(dimensions)],
+                        'Metrics': [{'Name': name, 'Unit': unit} for name, (_, unit) in metrics.items()],
+                    }
+                ],
+            },
+            **dimensions,
+            **{name: value for name, (value, _) in metrics.items()},
+        },
+        ensure_ascii=False,
+    )
+
+
+def check_byte_budget(
+    function_name: str,
+    node_bytes: dict[str, dict[str, int]],
+    read_budget_bytes: int = RTDB_READ_BUDGET_BYTES,
+    write_budget_bytes: int = RTDB_WRITE_BUDGET_BYTES,
+) -> None:
+    for metric, budget in (('BytesRead', read_budget_bytes), ('BytesWritten', write_budget_bytes)):
+        total = sum(node[metric] for node in node_bytes.values())
+        if not budget or total <= budget:
+            continue
+
+        largest_nodes = sorted(node_bytes.items(), key=lambda x: x[1][metric], reverse=True)[:3]
+        logger.warning(
+            'RTDB %s budget exceeded in %s: %d bytes (budget %d), largest nodes: %s',
+            metric,
+            function_name,
+            total,
+            budget,
+            ', '.join(f'{node} {values[metric]}' for node, values in largest_nodes),
+        )
+
+
+def emit_metrics(
+    recorder: CallRecorder,
+    function_name: str,
+    status_code: Optional[int] = None,
+    read_budget_bytes: int = RTDB_READ_BUDGET_BYTES,
+    write_budget_bytes: int = RTDB_WRITE_BUDGET_BYTES,
+) -> None:
+    # Lambda ships stdout to CloudWatch Logs, which turns Embedded Metric Format lines into metrics without an API call
+    node_bytes = recorder.node_bytes()
+    check_byte_budget(function_name, node_bytes, read_budget_bytes, write_budget_bytes)
+
+    if not METRICS_ENABLED:
+        return
+
+    total_dimensions = {'Function': function_name}
+    total_metrics = {
+        'Latency': (round(recorder.elapsed_ms, 2), 'Milliseconds'),
+        'BytesRead': (sum(node['BytesRead'] for node in node_bytes.values()), 'Bytes'),
+        'BytesWritten': (sum(node['BytesWritten'] for node in node_bytes.values()), 'Bytes'),
+    }
+    if status_code is not None:
+        total_dimensions['StatusCode'] = str(status_code)
+    print(_emf_line(total_dimensions, total_metrics))
+
+    for (dependency, operation, target), group in recorder.breakdown().items():
+        dimensions = {'Function': function_name, 'Dependency': dependency, 'Operation': operation, 'Target': target}
+        metrics = {'DependencyLatency': (group['DurationMs'], 'Milliseconds'), 'CallCount': (group['Count'], 'Count')}
+        print(_emf_line(dimensions, metrics))
+
+    for node, values in node_bytes.items():
+        dimensions = {'Function': function_name, 'Node': node}
+        metrics = {'BytesRead': (values['BytesRead'], 'Bytes'), 'BytesWritten': (values['BytesWritten'], 'Bytes')}
+        print(_emf_line(dimensions, metrics))
@@ -0,0 +1,58 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from chalice.app import Request
+
+
+# Share of invocations that run under cProfile, 0 leaves profiling off
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+# API requests can ask for a profile with this header, only where the header is allowed
+PROFILE_HEADER = os.getenv('PROFILE_HEADER', 'X-Fiva-Profile')
+PROFILE_HEADER_ENABLED = os.getenv('PROFILE_HEADER_ENABLED', 'false').lower() == 'true'
+PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', '30'))
+PROFILE_OUTPUT_DIR = os.getenv('PROFILE_OUTPUT_DIR', '/tmp')
+
+
+def should_profile(request: Optional[Request] = None) -> bool:
+    if PROFILE_HEADER_ENABLED and request is not None and request.headers.get(PROFILE_HEADER, '').lower() == 'true':
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _stats_path(function_name: str) -> str:
+    # One file per function, overwritten by its next profile, so a warm container's /tmp does not keep growing
+    file_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', function_name).strip('_')
+    return os.path.join(PROFILE_OUTPUT_DIR, f'profile-{file_name}.prof')
+
+
+def report_profile(profile: cProfile.Profile, function_name: str, top_n: int = PROFILE_TOP_N) -> str:
+    # The latest raw stats stay in /tmp for `python -m pstats` or snakeviz, the log gets the top cumulative functions
+    stats_path = _stats_path(function_name)
+    profile.dump_stats(stats_path)
+
+    stream = io.StringIO()
+    pstats.Stats(profile, stream=stream).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top_n)
+    print(f'[PROFILE] {function_name} ({stats_path})\n{stream.getvalue()}')
+    return stats_path
+
+
+@contextmanager
+def profiled(function_name: str, enabled: bool) -> Iterator[None]:
+    if not enabled:
+        yield
+        return
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        report_profile(profile, function_name)
@@ -2,11 +2,17 @@ import certifi
 import os
 import ssl
 
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
+from functools import lru_cache
+
+from chalicelib.metrics import SLACK, record_call
 
 ssl._create_default_https_context = ssl._create_unverified_context
-ssl_context = ssl.create_default_context(cafile=certifi.where())
+
+
+# slack_sdk and the CA bundle are only needed once a message is actually sent, so cold starts skip them
+@lru_cache(maxsize=1)
+def get_ssl_context() -> ssl.SSLContext:
+    return ssl.create_default_context(cafile=certifi.where())
 
 
 def post_slack_message(channel_id: str, token: str, text: str, blocks: list = None) -> None:
@@ -14,10 +20,15 @@ def post_slack_message(channel_id: str, token: str, text: str, blocks: list = No
     if server_env == 'dev':
         return
     msg_text = f'({server_env}) ' + text
-    client = WebClient(token=token, ssl=ssl_context)
+
+    from slack_sdk import WebClient
+    from slack_sdk.errors import SlackApiError
+
+    client = WebClient(token=token, ssl=get_ssl_context())
 
     try:
-        client.chat_postMessage(channel=channel_id, text=msg_text, blocks=blocks)
+        with record_call(SLACK, 'chat_postMessage'):
+            client.chat_postMessage(channel=channel_id, text=msg_text, blocks=blocks)
 
     except SlackApiError as e:
         print(e)
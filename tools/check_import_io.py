@@ -0,0 +1,71 @@
+import importlib
+import os
+import socket
+import sys
+import traceback
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# Import-time RTDB reads are counted by the local backend, anything else that opens a socket is refused below
+os.environ['RTDB_BACKEND'] = 'local'
+
+from chalicelib.db import local  # noqa: E402
+
+
+class ImportTimeNetworkError(RuntimeError):
+    pass
+
+
+def _refuse_network(*args, **kwargs):
+    raise ImportTimeNetworkError(f'Network access during import: {args[1:] or args}')
+
+
+def iter_module_names(package_name: str = 'chalicelib') -> list[str]:
+    # Sub-packages here are namespace packages, which pkgutil.walk_packages does not descend into
+    module_names = []
+    for directory, dir_names, file_names in os.walk(os.path.join(ROOT_DIR, package_name)):
+        dir_names[:] = sorted(name for name in dir_names if name != '__pycache__')
+        relative_dir = os.path.relpath(directory, ROOT_DIR).replace(os.sep, '.')
+        for file_name in sorted(file_names):
+            if file_name.endswith('.py'):
+                module_name = f'{relative_dir}.{file_name[:-3]}'.removesuffix('.__init__')
+                if module_name != f'{package_name}.db.local':
+                    module_names.append(module_name)
+    return module_names
+
+
+def main() -> int:
+    original_connect = socket.socket.connect
+    original_getaddrinfo = socket.getaddrinfo
+    socket.socket.connect = _refuse_network
+    socket.getaddrinfo = _refuse_network
+
+    failures = {}
+    try:
+        for module_name in iter_module_names():
+            before = local.local_database.stats['CallCount'] if local.local_database else 0
+            try:
+                importlib.import_module(module_name)
+            except Exception:
+                failures[module_name] = traceback.format_exc(limit=3)
+                continue
+
+            after = local.local_database.stats['CallCount'] if local.local_database else 0
+            if after != before:
+                failures[module_name] = f'{after - before} Realtime Database call(s) during import'
+    finally:
+        socket.socket.connect = original_connect
+        socket.getaddrinfo = original_getaddrinfo
+
+    for module_name, reason in failures.items():
+        print(f'FAIL {module_name}\n{reason}')
+    if failures:
+        return 1
+
+    print('No module under chalicelib performs network I/O at import time')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Every deployed Lambda imports exactly one of these: the API Lambda imports app.py, the others their blueprint module
+ENTRY_POINTS = [
+    'app',
+    'chalicelib.lambda_func.fcm.default_fcm',
+    'chalicelib.lambda_func.fcm.live_schedule_fcm',
+    'chalicelib.lambda_func.mixpanel_migration',
+    'chalicelib.lambda_func.slack',
+    'chalicelib.lambda_func.user_public_profile',
+    'chalicelib.api.stair_climbing_api',
+    'chalicelib.api.game_api',
+]
+
+
+def run_importtime(code: str, env: dict[str, str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT_DIR, env=env, capture_output=True, text=True
+    )
+
+
+def startup_modules(env: dict[str, str]) -> set[str]:
+    # Modules the interpreter imports before running any code (site, .pth hooks) are the same for every entry point
+    completed = run_importtime('pass', env)
+    return {line.split('|')[2].strip() for line in completed.stderr.splitlines() if line.startswith('import time:')}
+
+
+def profile_entry_point(module_name: str, env: dict[str, str], excluded_modules: set[str]) -> dict:
+    completed = run_importtime(f'import {module_name}', env)
+
+    modules = {}
+    error_lines = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:'):
+            error_lines.append(line)
+            continue
+
+        fields = line[len('import time:') :].split('|')
+        if not fields[0].strip().isdigit():
+            continue
+
+        name = fields[2].strip()
+        if name in excluded_modules:
+            continue
+        modules[name] = {'SelfMs': int(fields[0]) / 1000, 'CumulativeMs': int(fields[1]) / 1000}
+
+    return {
+        'TotalMs': sum(module['SelfMs'] for module in modules.values()),
+        'ModuleCount': len(modules),
+        'Modules': modules,
+        'Error': error_lines[-1] if completed.returncode else None,
+    }
+
+
+def top_level_packages(modules: dict[str, dict]) -> dict[str, float]:
+    packages = {}
+    for name, module in modules.items():
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + module['SelfMs']
+    return dict(sorted(packages.items(), key=lambda x: x[1], reverse=True))
+
+
+def print_report(report: dict[str, dict], top: int, baseline: dict[str, dict]) -> None:
+    for module_name, result in report.items():
+        line = f'{module_name}: {result["TotalMs"]:.1f}ms, {result["ModuleCount"]} modules'
+        if module_name in baseline:
+            line += f' ({result["TotalMs"] - baseline[module_name]["TotalMs"]:+.1f}ms vs baseline)'
+        print(line)
+        if result['Error']:
+            print(f'    import failed: {result["Error"]}')
+
+        baseline_modules = baseline.get(module_name, {}).get('Modules', {})
+        slowest = sorted(result['Modules'].items(), key=lambda x: x[1]['CumulativeMs'], reverse=True)[:top]
+        for name, module in slowest:
+            line = f'    {module["CumulativeMs"]:9.1f}ms cumulative {module["SelfMs"]:8.1f}ms self  {name}'
+            if baseline_modules and name not in baseline_modules:
+                line += '  (new)'
+            print(line)
+
+        packages = top_level_packages(result['Modules'])
+        print('    by package: ' + ', '.join(f'{name} {ms:.0f}ms' for name, ms in list(packages.items())[:top]))
+        print()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Report import time per module for every Lambda entry point.')
+    parser.add_argument('entry_points', nargs='*', default=ENTRY_POINTS)
+    parser.add_argument('--top', type=int, default=10, help='Slowest modules to list per entry point')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per entry point, the fastest one is reported')
+    parser.add_argument('--output', help='Write the full report as JSON, to compare against a later release')
+    parser.add_argument('--baseline', help='JSON report of an earlier release to diff against')
+    parser.add_argument(
+        '--firebase', action='store_true', help='Import against Firebase instead of the local database backend'
+    )
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if not args.firebase:
+        env['RTDB_BACKEND'] = 'local'
+
+    excluded_modules = startup_modules(env)
+
+    report = {}
+    for module_name in args.entry_points:
+        runs = [profile_entry_point(module_name, env, excluded_modules) for _ in range(args.repeat)]
+        report[module_name] = min(runs, key=lambda run: run['TotalMs'])
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print_report(report, args.top, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()